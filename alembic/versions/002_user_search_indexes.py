@@ -0,0 +1,75 @@
+"""User search indexes
+
+Revision ID: 002_user_search_indexes
+Revises: 001_initial_migration
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "002_user_search_indexes"
+down_revision = "001_initial_migration"
+branch_labels = None
+depends_on = None
+
+SQLITE_UPGRADE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "full_name, content='users', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users "
+    "BEGIN "
+    "INSERT INTO users_fts(rowid, full_name) VALUES (new.id, new.full_name); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users "
+    "BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, full_name) "
+    "VALUES ('delete', old.id, old.full_name); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_update "
+    "AFTER UPDATE OF full_name ON users "
+    "BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, full_name) "
+    "VALUES ('delete', old.id, old.full_name); "
+    "INSERT INTO users_fts(rowid, full_name) VALUES (new.id, new.full_name); "
+    "END",
+    "INSERT INTO users_fts(users_fts) VALUES ('rebuild')",
+)
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        # Trigram GIN index for name search (ILIKE '%word%' and
+        # word_similarity), and a pattern index for email LIKE 'prefix%'
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.create_index(
+            "ix_users_full_name_trgm",
+            "users",
+            ["full_name"],
+            postgresql_using="gin",
+            postgresql_ops={"full_name": "gin_trgm_ops"},
+        )
+        op.create_index(
+            "ix_users_email_pattern",
+            "users",
+            ["email"],
+            postgresql_ops={"email": "text_pattern_ops"},
+        )
+    elif dialect == "sqlite":
+        # FTS5 index over full_name, kept in sync by triggers. Email
+        # prefixes use a range scan on the existing ix_users_email.
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.drop_index("ix_users_email_pattern", table_name="users")
+        op.drop_index("ix_users_full_name_trgm", table_name="users")
+    elif dialect == "sqlite":
+        for trigger in ("insert", "delete", "update"):
+            op.execute(f"DROP TRIGGER IF EXISTS users_fts_{trigger}")
+        op.execute("DROP TABLE IF EXISTS users_fts")
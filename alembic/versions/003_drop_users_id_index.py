@@ -0,0 +1,35 @@
+"""Drop the redundant index on users.id
+
+The primary key already has an index, so ix_users_id only made every
+insert write a second index entry. Dropped and rebuilt concurrently, so
+the migration does not block traffic on a large table.
+
+Revision ID: 003_drop_users_id_index
+Revises: 002_user_search_indexes
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+
+from alembic import op
+from app.core.migrations import (
+    create_index_concurrently,
+    drop_index_concurrently,
+)
+
+# revision identifiers, used by Alembic.
+revision = "003_drop_users_id_index"
+down_revision = "002_user_search_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    with op.get_context().autocommit_block():
+        drop_index_concurrently(connection, "ix_users_id")
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    with op.get_context().autocommit_block():
+        create_index_concurrently(connection, "ix_users_id", "users", ["id"])
@@ -0,0 +1,50 @@
+"""Index lower(email) for case-insensitive email prefix search
+
+Emails are stored as typed, so search matches lower(email) against the
+lowercased query. The index replaces ix_users_email_pattern, which only
+served case-sensitive prefixes. Built concurrently, so the migration
+does not block writes on a large table.
+
+Revision ID: 004_users_email_lower_index
+Revises: 003_drop_users_id_index
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+
+from alembic import op
+from app.core.migrations import (
+    create_index_concurrently,
+    drop_index_concurrently,
+)
+
+# revision identifiers, used by Alembic.
+revision = "004_users_email_lower_index"
+down_revision = "003_drop_users_id_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    postgresql = connection.dialect.name == "postgresql"
+    # text_pattern_ops lets LIKE 'prefix%' use the index on Postgres
+    lower = "lower(email) text_pattern_ops" if postgresql else "lower(email)"
+    with op.get_context().autocommit_block():
+        create_index_concurrently(
+            connection, "ix_users_email_lower", "users", [lower, "email"]
+        )
+        if postgresql:
+            drop_index_concurrently(connection, "ix_users_email_pattern")
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    with op.get_context().autocommit_block():
+        if connection.dialect.name == "postgresql":
+            create_index_concurrently(
+                connection,
+                "ix_users_email_pattern",
+                "users",
+                ["email text_pattern_ops"],
+            )
+        drop_index_concurrently(connection, "ix_users_email_lower")
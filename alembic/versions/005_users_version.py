@@ -0,0 +1,34 @@
+"""Add users.version for ETags
+
+updated_at has one-second resolution on SQLite and is the transaction
+start time on Postgres, so two writes can leave it unchanged. The
+version counter is bumped on every write instead. Adding a column with
+a constant default does not rewrite the table on Postgres 11+.
+
+Revision ID: 005_users_version
+Revises: 004_users_email_lower_index
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "005_users_version"
+down_revision = "004_users_email_lower_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("version")
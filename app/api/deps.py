@@ -0,0 +1,50 @@
+# Shared API dependencies
+from fastapi import Depends, HTTPException
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.schemas.user import TokenData
+from app.services.auth_service import InvalidTokenError, decode_access_token
+from app.services.user_service import get_user_by_email
+
+oauth2_scheme = OAuth2PasswordBearer(
+    tokenUrl=f"{settings.API_V1_STR}/auth/token"
+)
+
+credentials_exception = HTTPException(
+    status_code=401,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
+) -> TokenData:
+    """Resolve the bearer token to the authenticated user.
+
+    Tokens issued at login carry the user's id and name, so those are
+    answered from the (cached) claims alone. Older tokens that only
+    carry the email fall back to a user lookup.
+    """
+    try:
+        claims = await decode_access_token(token)
+    except InvalidTokenError:
+        raise credentials_exception
+
+    email = claims.get("sub")
+    if not email:
+        raise credentials_exception
+    if claims.get("uid") is not None:
+        return TokenData(
+            email=email, user_id=claims["uid"], full_name=claims.get("name")
+        )
+
+    user = await get_user_by_email(db, email)
+    if user is None:
+        raise credentials_exception
+    return TokenData(
+        email=email, user_id=int(user.id), full_name=str(user.full_name)
+    )
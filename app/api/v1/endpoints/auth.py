@@ -1,15 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.deps import get_current_user
 from app.core.database import get_db
-from app.schemas.user import Token
+from app.schemas.user import Token, TokenData
 from app.services.auth_service import authenticate_user, create_access_token
 
 router = APIRouter()
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-
 
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
@@ -25,5 +24,15 @@ async def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    access_token = create_access_token(data={"sub": user.email})
+    access_token = create_access_token(
+        data={"sub": user.email, "uid": user.id, "name": user.full_name}
+    )
     return Token(access_token=access_token, token_type="bearer")
+
+
+@router.get("/me", response_model=TokenData)
+async def read_current_user(
+    current_user: TokenData = Depends(get_current_user),
+) -> TokenData:
+    """Get the authenticated user"""
+    return current_user
@@ -1,65 +1,396 @@
-from typing import Sequence
+import json
+from typing import Any, Literal, Optional, Sequence, Union
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
-from app.schemas.user import UserCreate, UserResponse, UserUpdate
+from app.core.config import settings
+from app.core.database import get_db, get_read_db
+from app.core.http_cache import (
+    cache_headers,
+    etag_matches,
+    is_not_modified,
+    make_etag,
+    not_modified,
+)
+from app.core.pagination import InvalidCursorError
+from app.core.responses import orm_list_json_response
+from app.schemas.user import (
+    BulkUserCreateResponse,
+    BulkUserResult,
+    UserCreate,
+    UserResponse,
+    UserUpdate,
+)
+from app.services.count_service import user_counter
+from app.services.user_search import search_users
 from app.services.user_service import (
+    UserAlreadyExistsError,
+    UserVersion,
     create_user,
+    create_users_bulk,
     delete_user,
     get_user,
-    get_users,
+    get_user_version,
+    get_users_by_ids,
+    get_users_page,
+    get_users_page_versions,
+    invalidate_user,
     update_user,
+    user_version,
 )
 
 router = APIRouter()
 
+ResponseDocs = dict[Union[int, str], dict[str, Any]]
+NOT_MODIFIED: ResponseDocs = {304: {"description": "Not modified"}}
+PRECONDITION_FAILED: ResponseDocs = {
+    412: {"description": "Precondition failed"}
+}
+
+
+def _version_headers(*versions: UserVersion) -> dict:
+    """ETag and Last-Modified headers for a user or a page of users"""
+    modified = [
+        stamp
+        for _, _, created_at, updated_at in versions
+        if (stamp := updated_at or created_at) is not None
+    ]
+    etag = make_etag(*(version[:2] for version in versions))
+    return cache_headers(etag, max(modified) if modified else None)
+
+
+def _next_page_headers(request: Request, next_cursor: str) -> dict[str, str]:
+    """Link and X-Next-Cursor headers pointing at the next page"""
+    next_url = request.url.remove_query_params("skip")
+    next_url = next_url.include_query_params(cursor=next_cursor)
+    return {"Link": f'<{next_url}>; rel="next"', "X-Next-Cursor": next_cursor}
+
+
+def _parse_ids(ids: str) -> list[int]:
+    """User ids from a comma-separated query parameter"""
+    try:
+        user_ids = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid ids")
+    if len(user_ids) > settings.USER_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.USER_BATCH_MAX_IDS} ids per request",
+        )
+    return user_ids
+
+
+async def _check_if_match(
+    request: Request, db: AsyncSession, user_id: int
+) -> None:
+    """Reject a write whose If-Match does not name the current version"""
+    if_match = request.headers.get("if-match")
+    if if_match is None:
+        return
+    version = await get_user_version(db, user_id, for_update=True)
+    if version is None or not etag_matches(
+        if_match, _version_headers(version)["ETag"]
+    ):
+        raise HTTPException(status_code=412, detail="Precondition failed")
+
 
 @router.post("/", response_model=UserResponse)
 async def create_new_user(
     user: UserCreate, db: AsyncSession = Depends(get_db)
 ) -> UserResponse:
     """Create a new user"""
-    return await create_user(db=db, user=user)
+    try:
+        return await create_user(db=db, user=user)
+    except UserAlreadyExistsError:
+        raise HTTPException(status_code=409, detail="Email already registered")
+
+
+BULK_CREATE_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {
+                    "type": "array",
+                    "items": {"$ref": "#/components/schemas/UserCreate"},
+                }
+            },
+            "application/x-ndjson": {
+                "schema": {"$ref": "#/components/schemas/UserCreate"}
+            },
+        },
+    }
+}
+
+
+async def _read_bulk_body(request: Request) -> bytes:
+    """The request body, refused with 413 once it passes the byte limit"""
+    limit = settings.USER_BULK_MAX_BYTES
+    too_large = HTTPException(
+        status_code=413, detail=f"Request body over {limit} bytes"
+    )
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > limit:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise too_large
+    return bytes(body)
+
+
+def _parse_bulk_body(
+    body: bytes, content_type: str
+) -> list[Union[UserCreate, str]]:
+    """Parse a JSON array or NDJSON body into users or per-row errors"""
+    items: list[Any] = []
+    if content_type.startswith("application/x-ndjson"):
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                items.append(ValueError("Invalid JSON"))
+    else:
+        try:
+            items = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
+        if not isinstance(items, list):
+            raise HTTPException(
+                status_code=422, detail="Expected a JSON array of users"
+            )
+
+    if len(items) > settings.USER_BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.USER_BULK_MAX_ROWS} users per request",
+        )
 
+    parsed: list[Union[UserCreate, str]] = []
+    for item in items:
+        if isinstance(item, ValueError):
+            parsed.append(str(item))
+            continue
+        try:
+            parsed.append(UserCreate.model_validate(item))
+        except ValidationError as exc:
+            error = exc.errors()[0]
+            location = ".".join(str(part) for part in error["loc"])
+            parsed.append(
+                f"{location}: {error['msg']}" if location else error["msg"]
+            )
+    return parsed
 
-@router.get("/", response_model=list[UserResponse])
+
+@router.post(
+    "/bulk",
+    response_model=BulkUserCreateResponse,
+    openapi_extra=BULK_CREATE_REQUEST_BODY,
+)
+async def create_users_in_bulk(
+    request: Request, db: AsyncSession = Depends(get_db)
+) -> BulkUserCreateResponse:
+    """Create many users from a JSON array or NDJSON body"""
+    parsed = _parse_bulk_body(
+        await _read_bulk_body(request),
+        request.headers.get("content-type", ""),
+    )
+    valid = [item for item in parsed if isinstance(item, UserCreate)]
+    created = iter(await create_users_bulk(db, valid))
+
+    results = []
+    for index, item in enumerate(parsed):
+        if isinstance(item, str):
+            results.append(
+                BulkUserResult(index=index, status="invalid", error=item)
+            )
+            continue
+        db_user = next(created)
+        if db_user is None:
+            results.append(
+                BulkUserResult(
+                    index=index,
+                    status="conflict",
+                    error="Email already registered",
+                )
+            )
+        else:
+            results.append(
+                BulkUserResult(
+                    index=index,
+                    status="created",
+                    user=UserResponse.model_validate(db_user),
+                )
+            )
+
+    return BulkUserCreateResponse(
+        created=sum(result.status == "created" for result in results),
+        conflicts=sum(result.status == "conflict" for result in results),
+        invalid=sum(result.status == "invalid" for result in results),
+        results=results,
+    )
+
+
+@router.get("/", response_model=list[UserResponse], responses=NOT_MODIFIED)
 async def read_users(
-    skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    order_by: Literal["id", "created_at"] = "id",
+    count: Optional[Literal["exact", "estimated"]] = None,
+    ids: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+) -> Union[Sequence[UserResponse], Response]:
+    """Get all users.
+
+    With ``count``, the total number of users is returned in
+    X-Total-Count: ``exact`` (cached for a few seconds) or ``estimated``
+    (from planner statistics where available, cheaper on large tables).
+
+    With ``ids`` (comma-separated), only those users are returned, in
+    the order given; paging parameters are ignored.
+    """
+    next_cursor = None
+    try:
+        if ids is not None:
+            users = await get_users_by_ids(db, _parse_ids(ids))
+        elif request.headers.get("if-none-match") is not None:
+            # Revalidate from the page's version columns alone. Deleting a
+            # user does not move the newest timestamp, so only the ETag
+            # (which covers every id) can validate a page.
+            versions = await get_users_page_versions(
+                db, limit=limit, cursor=cursor, order_by=order_by, skip=skip
+            )
+            headers = _version_headers(*versions)
+            if is_not_modified(request, headers["ETag"], None):
+                return not_modified(headers)
+        if ids is None:
+            users, next_cursor = await get_users_page(
+                db, limit=limit, cursor=cursor, order_by=order_by, skip=skip
+            )
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    headers = _version_headers(*(user_version(user) for user in users))
+    if ids is not None and is_not_modified(request, headers["ETag"], None):
+        return not_modified(headers)
+    if next_cursor:
+        headers.update(_next_page_headers(request, next_cursor))
+    if count is not None:
+        headers["X-Total-Count"] = str(await user_counter.count(db, count))
+
+    if settings.FAST_JSON_RESPONSES:
+        return orm_list_json_response(UserResponse, users, headers=headers)
+    response.headers.update(headers)
+    return users
+
+
+# Declared before /{user_id} so "search" is not taken for an id
+@router.get("/search", response_model=list[UserResponse])
+async def search_for_users(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=254),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
 ) -> Sequence[UserResponse]:
-    """Get all users"""
-    users = await get_users(db, skip=skip, limit=limit)
+    """Find users by email prefix or full-name words"""
+    try:
+        users, next_cursor = await search_users(
+            db, q, limit=limit, cursor=cursor
+        )
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        response.headers.update(_next_page_headers(request, next_cursor))
     return users
 
 
-@router.get("/{user_id}", response_model=UserResponse)
+@router.get("/{user_id}", response_model=UserResponse, responses=NOT_MODIFIED)
 async def read_user(
-    user_id: int, db: AsyncSession = Depends(get_db)
-) -> UserResponse:
+    user_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+) -> Union[UserResponse, Response]:
     """Get a specific user"""
+    conditional = (
+        "if-none-match" in request.headers
+        or "if-modified-since" in request.headers
+    )
+    if not conditional:
+        # Served from the user cache where possible; the validators come
+        # from the object returned
+        db_user = await get_user(db, user_id=user_id)
+        if db_user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        response.headers.update(_version_headers(user_version(db_user)))
+        return db_user
+
+    version = await get_user_version(db, user_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    headers = _version_headers(version)
+    _, _, created_at, updated_at = version
+    if is_not_modified(request, headers["ETag"], updated_at or created_at):
+        return not_modified(headers)
+
     db_user = await get_user(db, user_id=user_id)
+    if db_user is not None and user_version(db_user) != version:
+        # A cached copy older than the row would contradict the ETag
+        await invalidate_user(user_id)
+        db_user = await get_user(db, user_id=user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
+    response.headers.update(_version_headers(user_version(db_user)))
     return db_user
 
 
-@router.put("/{user_id}", response_model=UserResponse)
+@router.put(
+    "/{user_id}", response_model=UserResponse, responses=PRECONDITION_FAILED
+)
 async def update_existing_user(
-    user_id: int, user_update: UserUpdate, db: AsyncSession = Depends(get_db)
+    user_id: int,
+    user_update: UserUpdate,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
 ) -> UserResponse:
     """Update a user"""
-    db_user = await update_user(db, user_id=user_id, user_update=user_update)
+    await _check_if_match(request, db, user_id)
+    try:
+        db_user = await update_user(
+            db, user_id=user_id, user_update=user_update
+        )
+    except UserAlreadyExistsError:
+        raise HTTPException(status_code=409, detail="Email already registered")
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
+    response.headers.update(_version_headers(user_version(db_user)))
     return db_user
 
 
-@router.delete("/{user_id}")
+@router.delete("/{user_id}", responses=PRECONDITION_FAILED)
 async def delete_existing_user(
-    user_id: int, db: AsyncSession = Depends(get_db)
+    user_id: int, request: Request, db: AsyncSession = Depends(get_db)
 ) -> dict[str, str]:
     """Delete a user"""
+    await _check_if_match(request, db, user_id)
     success = await delete_user(db, user_id=user_id)
     if not success:
         raise HTTPException(status_code=404, detail="User not found")
@@ -0,0 +1,197 @@
+# Cache backends
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Optional, Protocol, Sequence
+
+
+class CacheBackend(ABC):
+    """Async key/value cache with hit and miss counters"""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = await self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def get_many(self, keys: Sequence[str]) -> list[Optional[Any]]:
+        """Values for ``keys`` in order, None where missing"""
+        values = await self._get_many(keys) if keys else []
+        found = sum(value is not None for value in values)
+        self.hits += found
+        self.misses += len(values) - found
+        return values
+
+    @abstractmethod
+    async def _get(self, key: str) -> Optional[Any]: ...
+
+    async def _get_many(self, keys: Sequence[str]) -> list[Optional[Any]]:
+        return [await self._get(key) for key in keys]
+
+    @abstractmethod
+    async def set(
+        self, key: str, value: Any, ttl: Optional[float] = None
+    ) -> None: ...
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None: ...
+
+    @abstractmethod
+    async def clear(self) -> None: ...
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class NullCache(CacheBackend):
+    """Cache that stores nothing, for disabling caching"""
+
+    async def _get(self, key: str) -> Optional[Any]:
+        return None
+
+    async def set(
+        self, key: str, value: Any, ttl: Optional[float] = None
+    ) -> None:
+        pass
+
+    async def delete(self, *keys: str) -> None:
+        pass
+
+    async def clear(self) -> None:
+        pass
+
+
+class InMemoryCache(CacheBackend):
+    """Per-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60) -> None:
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    async def _get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(
+        self, key: str, value: Any, ttl: Optional[float] = None
+    ) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            **super().stats(),
+            "evictions": self.evictions,
+            "size": len(self._entries),
+        }
+
+
+class KeyValueClient(Protocol):
+    """The subset of an async Redis-style client used by KeyValueCache"""
+
+    async def get(self, key: str) -> Optional[Any]: ...
+
+    async def mget(self, keys: Sequence[str]) -> list[Optional[Any]]: ...
+
+    async def set(
+        self, key: str, value: str, ex: Optional[int] = None
+    ) -> Any: ...
+
+    async def delete(self, *keys: str) -> Any: ...
+
+    def scan_iter(self, match: Optional[str] = None) -> AsyncIterator[Any]: ...
+
+
+class KeyValueCache(CacheBackend):
+    """Cache stored in an external key/value server, shared by all workers.
+
+    Values are stored as JSON. Size bounds and eviction are left to the
+    server's own memory policy.
+    """
+
+    def __init__(
+        self, client: KeyValueClient, ttl: float = 60, prefix: str = "cache:"
+    ) -> None:
+        super().__init__()
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def _get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        return json.loads(raw)
+
+    async def _get_many(self, keys: Sequence[str]) -> list[Optional[Any]]:
+        raws = await self.client.mget([self.prefix + key for key in keys])
+        return [None if raw is None else json.loads(raw) for raw in raws]
+
+    async def set(
+        self, key: str, value: Any, ttl: Optional[float] = None
+    ) -> None:
+        expires = max(1, int(self.ttl if ttl is None else ttl))
+        await self.client.set(
+            self.prefix + key, json.dumps(value, default=str), ex=expires
+        )
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
+
+    async def clear(self) -> None:
+        keys = [key async for key in self.client.scan_iter(self.prefix + "*")]
+        if keys:
+            await self.client.delete(*keys)
+
+
+def build_cache(
+    backend: str,
+    url: Optional[str] = None,
+    max_size: int = 10000,
+    ttl: float = 60,
+    prefix: str = "cache:",
+) -> CacheBackend:
+    """Create the cache backend named in settings"""
+    if backend == "none":
+        return NullCache()
+    if backend == "memory":
+        return InMemoryCache(max_size=max_size, ttl=ttl)
+    if backend == "redis":
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as exc:
+            raise RuntimeError(
+                "The redis cache backend requires the 'redis' package"
+            ) from exc
+        client = redis_asyncio.from_url(url or "redis://localhost:6379/0")
+        return KeyValueCache(client, ttl=ttl, prefix=prefix)
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -32,16 +32,154 @@ class Settings(BaseSettings):
             )
         return "sqlite+aiosqlite:///./app.db"
 
+    # Read replicas for GET endpoints. A replica that fails to connect is
+    # skipped for DB_REPLICA_EJECT_SECONDS; clients that wrote read from
+    # the primary for DB_READ_YOUR_WRITES_SECONDS.
+    DATABASE_REPLICA_URLS: List[str] = []
+    DB_REPLICA_EJECT_SECONDS: float = 30.0
+    DB_READ_YOUR_WRITES_SECONDS: int = 5
+
+    # Database engine. Options left unset follow the ENVIRONMENT profile
+    # (see app.core.database.engine_options).
+    DB_ECHO: Optional[bool] = None
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: Optional[bool] = None
+    DB_STATEMENT_CACHE_SIZE: int = 100  # asyncpg; 0 behind pgbouncer
+    # Return connections to the pool after each read instead of at the
+    # end of the request (see app.core.database.EagerReleaseSession)
+    DB_EAGER_RELEASE: bool = True
+    SQLITE_CACHE_SIZE_KB: int = 16384
+    SQLITE_MMAP_SIZE: int = 268435456
+
+    # Online migrations (app.core.migrations): DDL gives up waiting for a
+    # lock after MIGRATION_LOCK_TIMEOUT_MS and is retried; backfills
+    # update MIGRATION_BATCH_SIZE rows at a time, pausing in between
+    MIGRATION_LOCK_TIMEOUT_MS: int = 2000
+    MIGRATION_LOCK_RETRIES: int = 5
+    MIGRATION_BATCH_SIZE: int = 1000
+    MIGRATION_BATCH_PAUSE: float = 0.05
+
+    # SQL instrumentation
+    SQL_SLOW_QUERY_MS: float = 200.0
+    SQL_N_PLUS_ONE_THRESHOLD: int = 10  # same statement repeats per request
+    SERVER_TIMING_ENABLED: bool = True
+
     # Security
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+
+    # Password hashing
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # "thread" or "process"
+    PASSWORD_HASH_WORKERS: int = 0  # 0 means one per CPU
+    PASSWORD_HASH_QUEUE_SIZE: int = 64
+
+    # Upgrade outdated password hashes in the background after login
+    PASSWORD_REHASH_ENABLED: bool = True
+    PASSWORD_REHASH_QUEUE_SIZE: int = 1000
+    PASSWORD_REHASH_BATCH_SIZE: int = 100
+    PASSWORD_REHASH_FLUSH_SECONDS: float = 1.0
+    PASSWORD_REHASH_CONCURRENCY: int = 1
+
+    # User cache ("memory", "redis" or "none"). The memory backend is
+    # per process, so other workers may serve a stale user for up to the
+    # TTL after a write.
+    USER_CACHE_BACKEND: str = "memory"
+    USER_CACHE_URL: Optional[str] = None
+    USER_CACHE_MAX_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: int = 60
+    # Exact user totals (X-Total-Count) are cached per process and
+    # adjusted on create/delete; other workers catch up within the TTL
+    USER_COUNT_TTL_SECONDS: float = 10.0
+
+    # Encode list responses with pydantic-core directly
+    FAST_JSON_RESPONSES: bool = False
+
+    # Bulk user creation
+    USER_BULK_MAX_ROWS: int = 5000
+    USER_BULK_CHUNK_SIZE: int = 500
+    USER_BULK_MAX_BYTES: int = 5 * 1024 * 1024  # checked while reading
+
+    # Batched user lookups: ids per GET /users?ids= request, and ids per
+    # IN (...) query when concurrent lookups are combined
+    USER_BATCH_MAX_IDS: int = 100
+    USER_LOADER_MAX_BATCH: int = 500
+
+    # Response compression, codings in order of preference. "br" and
+    # "zstd" are used when the brotli / zstandard packages are installed.
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # bytes
+    COMPRESSION_ENCODINGS: List[str] = ["zstd", "br", "gzip"]
+    COMPRESSION_GZIP_LEVEL: int = 5
+    COMPRESSION_BROTLI_LEVEL: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+
+    # Load shedding: adaptive concurrency limits per route class
+    LOAD_SHEDDING_ENABLED: bool = True
+    LOAD_SHEDDING_INITIAL_LIMIT: int = 20
+    LOAD_SHEDDING_MIN_LIMIT: int = 2
+    LOAD_SHEDDING_MAX_LIMIT: int = 200
+    LOAD_SHEDDING_MAX_QUEUE: int = 50
+    LOAD_SHEDDING_QUEUE_TIMEOUT: float = 1.0
+    LOAD_SHEDDING_TOLERANCE: float = 2.0  # allowed slowdown vs baseline
 
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = ["*"]
 
-    # Logging
+    # Server (python -m app.server). SERVER_WORKERS=0 runs one worker per
+    # CPU allowed by the affinity mask and cgroup quota, up to
+    # SERVER_MAX_WORKERS.
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    SERVER_WORKERS: int = 0
+    SERVER_MAX_WORKERS: int = 8
+    SERVER_LOOP: str = "auto"  # uvloop when installed
+    SERVER_HTTP: str = "auto"  # httptools when installed
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEPALIVE_TIMEOUT: int = 65  # longer than the proxy's idle timeout
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    SERVER_MAX_REQUESTS: int = 10000  # recycle workers; 0 disables
+    SERVER_MAX_REQUESTS_JITTER: int = 1000
+    SERVER_PRELOAD: bool = True  # with gunicorn installed
+
+    # Logging: JSON lines written by a background thread to LOG_FILE (or
+    # stderr), rotated at LOG_MAX_BYTES. When the queue is full, "drop"
+    # discards records and "block" waits up to LOG_BLOCK_TIMEOUT first.
+    # LOG_FILE_PER_PROCESS adds the pid to the file name (app.<pid>.log);
+    # app.server turns it on when several workers share a LOG_FILE.
     LOG_LEVEL: str = "INFO"
+    LOG_FILE: Optional[str] = None
+    LOG_FILE_PER_PROCESS: bool = False
+    LOG_MAX_BYTES: int = 100 * 1024 * 1024
+    LOG_BACKUP_COUNT: int = 5
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_QUEUE_POLICY: str = "drop"
+    LOG_BLOCK_TIMEOUT: float = 0.1
+    LOG_BATCH_SIZE: int = 256
+    LOG_ACCESS: bool = True
+
+    # Pre-generated OpenAPI schema (see scripts/generate_openapi.py)
+    OPENAPI_SCHEMA_FILE: Optional[str] = None
+
+    # Metrics. With METRICS_MULTIPROC_DIR set, workers share their samples
+    # through files there (every METRICS_WRITE_INTERVAL seconds) and any
+    # worker's /metrics returns them all, labelled by pid. app.server
+    # sets it to a temporary directory when it runs several workers.
+    METRICS_ENABLED: bool = True
+    METRICS_MULTIPROC_DIR: Optional[str] = None
+    METRICS_WRITE_INTERVAL: float = 5.0
+
+    # Sampling profiler: every PROFILER_SAMPLE_EVERY-th request (0 = none)
+    # and any request sending X-Profile-Token: PROFILER_TOKEN is sampled.
+    # /admin/profile exports the stacks to holders of the same token.
+    PROFILER_SAMPLE_EVERY: int = 0
+    PROFILER_TOKEN: Optional[str] = None
+    PROFILER_INTERVAL_MS: float = 5.0
+    PROFILER_MAX_STACKS: int = 5000
 
     # Environment
     ENVIRONMENT: str = "development"
@@ -1,26 +1,303 @@
+import logging
+import time
 from collections.abc import AsyncGenerator
+from typing import Any, Optional
 
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import (
+    ORMExecuteState,
+    Session,
+    SessionTransaction,
+    SessionTransactionOrigin,
+)
+from sqlalchemy.pool import NullPool
 
 from app.core.config import settings
+from app.core.metrics import Gauge
+from app.core.request_context import get_request_context
+
+logger = logging.getLogger(__name__)
+
+
+def engine_options(url: str, environment: Optional[str] = None) -> dict:
+    """Engine keyword arguments for a database URL and environment.
+
+    Profiles:
+    - production: pre-ping and recycle pooled connections
+    - development: no pre-ping
+    - test: no pooling, so each test sees a fresh connection
+
+    Explicit DB_* settings override the profile defaults.
+    """
+    environment = environment or settings.ENVIRONMENT
+    db_url = make_url(url)
+    in_memory = db_url.get_backend_name() == "sqlite" and (
+        db_url.database in (None, "", ":memory:")
+    )
+
+    options: dict[str, Any] = {
+        "echo": bool(settings.DB_ECHO),
+        "future": True,
+    }
+
+    # In-memory SQLite uses a single shared connection, so pool sizing
+    # does not apply to it.
+    if environment == "test":
+        options["poolclass"] = NullPool
+    elif not in_memory:
+        pre_ping = settings.DB_POOL_PRE_PING
+        if pre_ping is None:
+            pre_ping = environment == "production"
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=pre_ping,
+        )
+
+    if db_url.get_driver_name() == "asyncpg":
+        options["connect_args"] = {
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers proceed while a write is in progress; it is
+    # ignored (and harmless) for in-memory databases.
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+    cursor.close()
+
+
+def _redact(parameters: Any, executemany: bool) -> str:
+    if executemany:
+        return f"<{len(parameters)} parameter sets redacted>"
+    if isinstance(parameters, dict):
+        return repr({key: "?" for key in parameters})
+    return repr(["?"] * len(parameters or ()))
+
+
+def _before_cursor_execute(
+    conn: Any,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    context.query_start = time.perf_counter()
+
+
+def _after_cursor_execute(
+    conn: Any,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    elapsed = time.perf_counter() - context.query_start
+    if elapsed * 1000 >= settings.SQL_SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query (%.1f ms): %s %s",
+            elapsed * 1000,
+            statement,
+            _redact(parameters, executemany),
+        )
+
+    request = get_request_context()
+    if request is None:
+        return
+    request.query_count += 1
+    request.db_seconds += elapsed
+    # Statements are parameterised, so the text is the statement's shape
+    request.statement_counts[statement] += 1
+    repeats = request.statement_counts[statement]
+    if repeats == settings.SQL_N_PLUS_ONE_THRESHOLD:
+        logger.warning(
+            "Possible N+1: statement ran %d times in one request: %s",
+            repeats,
+            statement,
+        )
+
+
+def instrument_engine(db_engine: AsyncEngine) -> None:
+    """Count and time every statement run through ``db_engine``"""
+    sync_engine = db_engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def create_engine(url: str, environment: Optional[str] = None) -> AsyncEngine:
+    """Create an async engine using the profile for ``environment``"""
+    db_engine = create_async_engine(url, **engine_options(url, environment))
+    if db_engine.dialect.name == "sqlite":
+        event.listen(db_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    instrument_engine(db_engine)
+    return db_engine
+
 
 # Create async engine
-engine = create_async_engine(
-    settings.database_url,
-    echo=True,  # Set to False in production
-    future=True,
+engine = create_engine(settings.database_url)
+
+
+def _pool_stats(db_engine: AsyncEngine) -> dict[tuple[str, ...], float]:
+    pool = db_engine.pool
+    stats: dict[tuple[str, ...], float] = {}
+    for state in ("size", "checkedout", "overflow", "checkedin"):
+        value = getattr(pool, state, None)
+        if callable(value):
+            stats[(state,)] = value()
+    return stats
+
+
+Gauge(
+    "db_pool_connections",
+    "Database connection pool state",
+    labelnames=("state",),
+    callback=lambda: _pool_stats(engine),
 )
 
+
+def _is_plain_select(statement: Any) -> bool:
+    return (
+        getattr(statement, "is_select", False)
+        and getattr(statement, "_for_update_arg", None) is None
+    )
+
+
+class RoutingSession(AsyncSession):
+    """Session that can pick a read replica on its first statement.
+
+    After ``use_replicas`` the session holds nothing until it first
+    needs a connection, so requests answered without a query (304s,
+    cache hits, early rejections) never check one out. It then binds to
+    the first replica that accepts a connection, ejecting the ones that
+    fail, and stays on its own bind (the primary) if none does.
+    """
+
+    _replicas: Optional["ReplicaSet"] = None
+
+    def use_replicas(self, replicas: "ReplicaSet") -> None:
+        self._replicas = replicas
+        # The bind to fall back to, also read by the user loader
+        self.info["replica_fallback"] = self.bind
+
+    def _bind_to(self, bind: AsyncEngine) -> None:
+        self.bind = bind
+        self.sync_session.bind = bind.sync_engine
+
+    async def _route(self) -> None:
+        replicas, self._replicas = self._replicas, None
+        if replicas is None:
+            return
+        primary = self.info["replica_fallback"]
+        for replica in replicas.candidates():
+            self._bind_to(replica)
+            try:
+                await super().connection()
+            except (DBAPIError, OSError):
+                await self.close()
+                replicas.eject(replica)
+                continue
+            return
+        self._bind_to(primary)
+
+    async def execute(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        await self._route()
+        return await super().execute(statement, *args, **kwargs)
+
+    async def scalar(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        await self._route()
+        return await super().scalar(statement, *args, **kwargs)
+
+    async def get(self, *args: Any, **kwargs: Any) -> Any:
+        await self._route()
+        return await super().get(*args, **kwargs)
+
+    async def stream(self, *args: Any, **kwargs: Any) -> Any:
+        await self._route()
+        return await super().stream(*args, **kwargs)
+
+    async def connection(self, *args: Any, **kwargs: Any) -> Any:
+        await self._route()
+        return await super().connection(*args, **kwargs)
+
+
+class EagerReleaseSession(RoutingSession):
+    """Session that returns its connection to the pool between reads.
+
+    A session checks out a connection on its first statement and holds
+    it until commit, rollback or close, which for a read-only endpoint
+    is after the response has been serialised. This session instead
+    commits an autobegun transaction right after a plain SELECT, so the
+    connection goes back to the pool as soon as the rows are buffered;
+    the next statement checks one out again.
+
+    Transactions that must stay open are left alone: ones begun with
+    ``begin()``, and ones that have flushed, written or locked rows.
+    """
+
+    _pinned: Optional[SessionTransaction] = None
+
+    async def execute(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        result = await super().execute(statement, *args, **kwargs)
+        await self._release_after(_is_plain_select(statement))
+        return result
+
+    async def scalar(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        result = await super().scalar(statement, *args, **kwargs)
+        await self._release_after(_is_plain_select(statement))
+        return result
+
+    async def get(self, *args: Any, **kwargs: Any) -> Any:
+        result = await super().get(*args, **kwargs)
+        await self._release_after(not kwargs.get("with_for_update"))
+        return result
+
+    async def _release_after(self, plain_select: bool) -> None:
+        sync_session = self.sync_session
+        transaction = sync_session.get_transaction()
+        if (
+            transaction is None
+            or transaction.origin is not SessionTransactionOrigin.AUTOBEGIN
+        ):
+            return
+        if not plain_select:
+            self._pinned = transaction
+            return
+        if (
+            transaction is self._pinned
+            or sync_session.info.get("wrote")
+            or sync_session.new
+            or sync_session.dirty
+            or sync_session.deleted
+        ):
+            return
+        await self.commit()
+
+
 # Create async session factory
+session_class = (
+    EagerReleaseSession if settings.DB_EAGER_RELEASE else RoutingSession
+)
 AsyncSessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
+    engine, class_=session_class, expire_on_commit=False
 )
 
 Base = declarative_base()
@@ -35,6 +312,124 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+class ReplicaSet:
+    """Read replicas served round-robin, skipping unhealthy ones.
+
+    A replica that fails is ejected for ``eject_seconds``; after that it
+    is offered again and the next connection attempt decides whether it
+    is back.
+    """
+
+    def __init__(
+        self, engines: list[AsyncEngine], eject_seconds: float = 30.0
+    ) -> None:
+        self.engines = engines
+        self.eject_seconds = eject_seconds
+        self._next = 0
+        self._ejected_until: dict[int, float] = {}
+
+    def candidates(self) -> list[AsyncEngine]:
+        """Healthy replicas, starting from the next one in turn"""
+        count = len(self.engines)
+        if not count:
+            return []
+        start = self._next
+        self._next = (start + 1) % count
+        now = time.monotonic()
+        return [
+            self.engines[index % count]
+            for index in range(start, start + count)
+            if self._ejected_until.get(index % count, 0.0) <= now
+        ]
+
+    def eject(self, replica: AsyncEngine) -> None:
+        index = self.engines.index(replica)
+        self._ejected_until[index] = time.monotonic() + self.eject_seconds
+        logger.warning(
+            "Ejected read replica %d for %.0f s", index, self.eject_seconds
+        )
+
+    def healthy(self) -> dict[tuple[str, ...], float]:
+        now = time.monotonic()
+        return {
+            (str(index),): float(self._ejected_until.get(index, 0.0) <= now)
+            for index in range(len(self.engines))
+        }
+
+
+read_replicas = ReplicaSet(
+    [create_engine(url) for url in settings.DATABASE_REPLICA_URLS],
+    eject_seconds=settings.DB_REPLICA_EJECT_SECONDS,
+)
+
+Gauge(
+    "db_replica_healthy",
+    "Whether each read replica is in rotation (1) or ejected (0)",
+    labelnames=("replica",),
+    callback=lambda: read_replicas.healthy(),
+)
+
+
+def _track_writes(state: ORMExecuteState) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info["wrote"] = True
+
+
+def _track_flush(session: Session, flush_context: Any) -> None:
+    session.info["wrote"] = True
+
+
+def _after_commit(session: Session) -> None:
+    request = get_request_context()
+    if session.info.pop("wrote", False) and request is not None:
+        request.wrote = True
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop("wrote", None)
+
+
+# Note committed writes on the request, so its later reads (and the
+# client's next ones) go to the primary
+event.listen(Session, "do_orm_execute", _track_writes)
+event.listen(Session, "after_flush", _track_flush)
+event.listen(Session, "after_commit", _after_commit)
+event.listen(Session, "after_rollback", _after_rollback)
+
+
+# Dependency for read-only endpoints
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """A session on a read replica, or on the primary.
+
+    The primary is used when no replica is configured or healthy, and
+    for requests that should see their own recent writes. The replica
+    is chosen on the session's first statement (see RoutingSession).
+    """
+    request = get_request_context()
+    session = AsyncSessionLocal()
+    if (
+        read_replicas.engines
+        and isinstance(session, RoutingSession)
+        and not (request and (request.wrote or request.read_primary))
+    ):
+        session.use_replicas(read_replicas)
+
+    async with session:
+        try:
+            yield session
+        except DBAPIError as exc:
+            replica = session.bind
+            if (
+                exc.connection_invalidated
+                and isinstance(replica, AsyncEngine)
+                and replica in read_replicas.engines
+            ):
+                read_replicas.eject(replica)
+            raise
+        finally:
+            await session.close()
+
+
 async def init_db() -> None:
     """Initialize database tables"""
     async with engine.begin() as conn:
@@ -0,0 +1,132 @@
+# Bounded executors for CPU-bound work
+import asyncio
+import os
+import time
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import Any, Callable, Iterable, Optional, TypeVar
+
+from app.core.metrics import Histogram
+
+T = TypeVar("T")
+
+
+class ExecutorSaturatedError(RuntimeError):
+    """Raised when a bounded executor has no free slot for new work"""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(f"Executor '{name}' is saturated")
+        self.name = name
+
+
+class CallStats:
+    """Running timing statistics for one kind of executor call"""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+
+    def as_dict(self) -> dict[str, float]:
+        mean = self.total_seconds / self.count if self.count else 0.0
+        return {
+            "count": self.count,
+            "total_seconds": self.total_seconds,
+            "mean_seconds": mean,
+            "max_seconds": self.max_seconds,
+        }
+
+
+class BoundedExecutor:
+    """Run blocking callables off the event loop with admission control.
+
+    At most ``max_workers`` calls run at once and at most ``max_queue``
+    more may wait for a worker. Anything beyond that is rejected
+    immediately with ``ExecutorSaturatedError`` instead of queueing
+    without bound. Admission bookkeeping happens on the event loop
+    thread, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        kind: str = "thread",
+        max_workers: int = 0,
+        max_queue: int = 0,
+        duration_histogram: Optional[Histogram] = None,
+    ) -> None:
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.duration_histogram = duration_histogram
+        self.in_flight = 0
+        self.rejected = 0
+        self.stats: dict[str, CallStats] = {}
+        self._executor: Optional[Executor] = None
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=self.name,
+                )
+        return self._executor
+
+    async def run(self, operation: str, fn: Callable[..., T], *args: Any) -> T:
+        """Run ``fn(*args)`` in the pool, timing it under ``operation``"""
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            raise ExecutorSaturatedError(self.name)
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.in_flight -= 1
+            stats = self.stats.get(operation)
+            if stats is None:
+                stats = self.stats[operation] = CallStats()
+            elapsed = time.perf_counter() - start
+            stats.record(elapsed)
+            if self.duration_histogram is not None:
+                self.duration_histogram.observe(elapsed, labels=(operation,))
+
+    async def map(
+        self, operation: str, fn: Callable[[Any], T], items: Iterable[Any]
+    ) -> list[T]:
+        """Run ``fn`` over ``items``, at most one call per worker at a time"""
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def call(item: Any) -> T:
+            async with semaphore:
+                return await self.run(operation, fn, item)
+
+        return list(await asyncio.gather(*(call(item) for item in items)))
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -0,0 +1,73 @@
+# HTTP conditional request helpers
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts: Any) -> str:
+    """A weak ETag derived from the given version parts"""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive timestamps; the database clock is UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(_as_utc(value), usegmt=True)
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Whether an If-Match/If-None-Match header lists ``etag``.
+
+    Tags are compared weakly (ignoring ``W/``), which is what
+    If-None-Match requires. If-Match strictly calls for strong
+    comparison, but our tags only change with the row version, so a
+    weak match is the right signal for optimistic concurrency here.
+    """
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == opaque for tag in header.split(",")
+    )
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime]
+) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have one-second resolution
+        modified = _as_utc(last_modified).replace(microsecond=0)
+        return modified <= _as_utc(since)
+    return False
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,132 @@
+# Adaptive concurrency limits
+import asyncio
+import math
+from collections import deque
+from typing import Optional
+
+
+class LimitExceededError(RuntimeError):
+    """Raised when a limiter can neither admit nor queue a request"""
+
+    def __init__(self, name: str, reason: str) -> None:
+        super().__init__(f"Limiter '{name}' rejected a request: {reason}")
+        self.name = name
+        self.reason = reason
+
+
+class GradientLimiter:
+    """Concurrency limit that follows observed latency.
+
+    The limit is adjusted after every request by the gradient between a
+    slow moving baseline latency and the latest sample: while latency
+    stays within ``tolerance`` times the baseline the limit grows by
+    about ``sqrt(limit)``, and once requests slow down (for example
+    while waiting for pool connections) it shrinks in proportion, down
+    to ``min_limit``. Requests over the limit wait in a FIFO queue of at
+    most ``max_queue`` entries for up to ``queue_timeout`` seconds and
+    are rejected after that, so overload turns into fast failures
+    instead of a growing backlog.
+
+    All bookkeeping runs on the event loop thread, so no locking is
+    needed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: float = 20,
+        min_limit: float = 1,
+        max_limit: float = 200,
+        max_queue: int = 0,
+        queue_timeout: float = 1.0,
+        tolerance: float = 2.0,
+        smoothing: float = 0.2,
+        baseline_window: int = 600,
+    ) -> None:
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.baseline_window = baseline_window
+        self.baseline_rtt: Optional[float] = None
+        self.in_flight = 0
+        self.shed: dict[str, int] = {"queue_full": 0, "timeout": 0}
+        self._waiters: deque[asyncio.Future[None]] = deque()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < max(1, math.floor(self.limit))
+
+    async def acquire(self) -> None:
+        """Take a slot, waiting in the queue if there is room in it"""
+        if self._has_capacity() and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.shed["queue_full"] += 1
+            raise LimitExceededError(self.name, "queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except BaseException as exc:
+            if waiter.done() and not waiter.cancelled():
+                # A slot was handed over just as we gave up on it
+                if isinstance(exc, asyncio.TimeoutError):
+                    return
+                self.release()
+                raise
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(exc, asyncio.TimeoutError):
+                self.shed["timeout"] += 1
+                raise LimitExceededError(self.name, "timeout")
+            raise
+        # Otherwise the releasing request handed its slot over (see _wake)
+
+    def release(self, rtt: Optional[float] = None) -> None:
+        """Free a slot, updating the limit from ``rtt`` if given"""
+        if rtt is not None:
+            self.update(rtt)
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def update(self, rtt: float) -> None:
+        """Adjust the limit for one observed request latency"""
+        if self.baseline_rtt is None:
+            self.baseline_rtt = rtt
+        else:
+            self.baseline_rtt += (
+                rtt - self.baseline_rtt
+            ) / self.baseline_window
+            # Let the baseline recover quickly after a long slow period,
+            # otherwise the limit stays high when latency returns to normal
+            if self.baseline_rtt > 2 * rtt:
+                self.baseline_rtt *= 0.95
+
+        gradient = max(
+            0.5, min(1.0, self.tolerance * self.baseline_rtt / max(rtt, 1e-9))
+        )
+        # Only grow while the limit is actually being used; an idle
+        # service would otherwise drift to max_limit
+        headroom = 0.0
+        if self.in_flight * 2 >= self.limit:
+            headroom = math.sqrt(self.limit)
+        target = self.limit * gradient + headroom
+        limit = self.limit * (1 - self.smoothing) + target * self.smoothing
+        self.limit = max(self.min_limit, min(self.max_limit, limit))
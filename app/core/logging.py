@@ -0,0 +1,316 @@
+# Structured logging through a background writer thread
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from contextlib import suppress
+from datetime import datetime, timezone
+from typing import IO, Any, Optional
+
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.core.request_context import get_request_context
+
+# Attributes every LogRecord has; anything else was passed in ``extra``
+_RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord("", 0, "", 0, "", (), None).__dict__
+) | {"message", "asctime", "request_id"}
+
+_STOP = object()
+
+
+class JsonFormatter(logging.Formatter):
+    """One compact JSON object per record.
+
+    Fields passed in ``extra`` are included as they are; the request id
+    is included when the record was made while serving a request.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        created = datetime.fromtimestamp(record.created, timezone.utc)
+        data: dict[str, Any] = {
+            "time": created.isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id is not None:
+            data["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, separators=(",", ":"), default=str)
+
+
+class RotatingWriter:
+    """Append text to a file, rotating it once it exceeds ``max_bytes``.
+
+    Rotation renames ``path`` to ``path.1`` (shifting older backups up to
+    ``backup_count``), like ``RotatingFileHandler``, but is checked once
+    per batch rather than per record. Without a path, writes go to
+    stderr.
+
+    Only one process may write a given path, since another one would
+    rename the file from under it. With ``per_process``, the pid is
+    added to the file name (``app.log`` becomes ``app.<pid>.log``).
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_bytes: int = 0,
+        backup_count: int = 0,
+        per_process: bool = False,
+    ) -> None:
+        if path is not None and per_process:
+            root, ext = os.path.splitext(path)
+            path = f"{root}.{os.getpid()}{ext}"
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._stream: Optional[IO[str]] = None
+        self._size = 0
+
+    def _open(self) -> IO[str]:
+        if self.path is None:
+            # Looked up on every write, as sys.stderr may be replaced
+            return sys.stderr
+        if self._stream is None:
+            self._stream = open(self.path, "a", encoding="utf-8")
+            self._size = self._stream.tell()
+        return self._stream
+
+    def _rotate(self) -> None:
+        assert self.path is not None
+        self.close()
+        if self.backup_count > 0:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.truncate(self.path, 0)
+
+    def write(self, text: str) -> None:
+        stream = self._open()
+        size = len(text.encode("utf-8"))
+        if (
+            self.path is not None
+            and self.max_bytes > 0
+            and self._size > 0
+            and self._size + size > self.max_bytes
+        ):
+            self._rotate()
+            stream = self._open()
+        stream.write(text)
+        stream.flush()
+        self._size += size
+
+    def close(self) -> None:
+        stream, self._stream = self._stream, None
+        self._size = 0
+        if stream is not None:
+            stream.close()
+
+
+class BackgroundHandler(logging.Handler):
+    """Hand records to a writer thread through a bounded queue.
+
+    ``emit`` only resolves the message (and traceback) and enqueues the
+    record, so the event loop never waits on disk. When the queue is
+    full, the ``"drop"`` policy discards the record at once, while
+    ``"block"`` waits up to ``block_timeout`` seconds for space before
+    discarding it. Dropped records are counted and reported in the log
+    once the writer catches up.
+
+    The writer drains up to ``batch_size`` records at a time, formats
+    them and writes them in one call.
+    """
+
+    def __init__(
+        self,
+        writer: RotatingWriter,
+        max_queue: int = 10000,
+        policy: str = "drop",
+        block_timeout: float = 0.1,
+        batch_size: int = 256,
+    ) -> None:
+        if policy not in ("drop", "block"):
+            raise ValueError(f"Unknown log queue policy: {policy}")
+        super().__init__()
+        self.writer = writer
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.batch_size = batch_size
+        self.counts = {"written": 0, "dropped": 0}
+        self._queue: queue.Queue[Any] = queue.Queue(maxsize=max_queue)
+        self._reported_drops = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="log-writer", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Write the queued records and stop the writer thread"""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+        self.writer.close()
+
+    def close(self) -> None:
+        self.stop()
+        super().close()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Resolve everything that must be read on the logging thread"""
+        record = copy.copy(record)
+        if getattr(record, "request_id", None) is None:
+            context = get_request_context()
+            if context is not None:
+                record.request_id = context.request_id
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self.format_exception(record)
+            record.exc_info = None
+        return record
+
+    def format_exception(self, record: logging.LogRecord) -> str:
+        formatter = self.formatter or logging.Formatter()
+        assert record.exc_info is not None
+        return formatter.formatException(record.exc_info)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            item = self.prepare(record)
+            if self.policy == "block":
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            self.counts["dropped"] += 1
+        except Exception:
+            self.handleError(record)
+
+    def _run(self) -> None:
+        formatter = self.formatter or JsonFormatter()
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is _STOP for item in batch)
+            records = [item for item in batch if item is not _STOP]
+            dropped = self.counts["dropped"] - self._reported_drops
+            if dropped:
+                self._reported_drops += dropped
+                records.append(_dropped_record(dropped))
+            lines = []
+            for record in records:
+                try:
+                    lines.append(formatter.format(record) + "\n")
+                except Exception:
+                    self.handleError(record)
+            try:
+                self.writer.write("".join(lines))
+                self.counts["written"] += len(lines)
+            except Exception:
+                # Any failure must not end the thread, or every later
+                # record would pile up in the queue; the file is
+                # reopened on the next write
+                self.counts["dropped"] += len(lines)
+                with suppress(Exception):
+                    self.writer.close()
+            if stop:
+                return
+
+
+def _dropped_record(count: int) -> logging.LogRecord:
+    return logging.LogRecord(
+        "app.core.logging",
+        logging.WARNING,
+        __file__,
+        0,
+        "Dropped %d log records: the log queue was full or a write failed",
+        (count,),
+        None,
+    )
+
+
+_handler: Optional[BackgroundHandler] = None
+
+
+def configure_logging() -> BackgroundHandler:
+    """Send all logging through a JSON background handler on the root.
+
+    Handlers installed by others (test capture, for example) are kept.
+    SQLAlchemy's echo output, which otherwise gets a blocking stdout
+    handler of its own, is routed through this handler too.
+    """
+    global _handler
+    shutdown_logging()
+    handler = BackgroundHandler(
+        RotatingWriter(
+            settings.LOG_FILE,
+            max_bytes=settings.LOG_MAX_BYTES,
+            backup_count=settings.LOG_BACKUP_COUNT,
+            per_process=settings.LOG_FILE_PER_PROCESS,
+        ),
+        max_queue=settings.LOG_QUEUE_SIZE,
+        policy=settings.LOG_QUEUE_POLICY,
+        block_timeout=settings.LOG_BLOCK_TIMEOUT,
+        batch_size=settings.LOG_BATCH_SIZE,
+    )
+    handler.setFormatter(JsonFormatter())
+    handler.start()
+
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    # A handler present stops SQLAlchemy from adding its own; records
+    # still propagate to the root
+    engine_logger = logging.getLogger("sqlalchemy.engine.Engine")
+    for existing in list(engine_logger.handlers):
+        engine_logger.removeHandler(existing)
+    engine_logger.addHandler(logging.NullHandler())
+
+    _handler = handler
+    return handler
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and remove the background handler"""
+    global _handler
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler.close()
+        _handler = None
+
+
+Counter(
+    "log_records_total",
+    "Log records written and dropped by the background log writer",
+    labelnames=("result",),
+    callback=lambda: (
+        {(result,): value for result, value in _handler.counts.items()}
+        if _handler is not None
+        else {}
+    ),
+)
@@ -0,0 +1,305 @@
+# Prometheus-compatible metrics
+import asyncio
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import suppress
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+Labels = tuple[str, ...]
+Sample = tuple[str, dict[str, str], float]
+# (name, type, documentation, samples) of one metric
+Family = tuple[str, str, str, list[Sample]]
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+class Metric(ABC):
+    """Base class for metrics.
+
+    Values are plain dicts and lists updated without locks. That is safe
+    because every update happens on the event loop thread; code running
+    in worker threads must report back to the loop rather than record
+    directly.
+    """
+
+    type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        registry: Optional["Registry"] = None,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        (registry or default_registry).register(self)
+
+    def _labels(self, values: Labels) -> dict[str, str]:
+        return dict(zip(self.labelnames, values))
+
+    @abstractmethod
+    def samples(self) -> Iterable[Sample]: ...
+
+
+class Counter(Metric):
+    """Counter incremented directly, or read from ``callback``.
+
+    As with ``Gauge``, a callback returns label values mapped to the
+    current value. It must only ever grow (until the process restarts),
+    so that ``rate()`` works on it.
+    """
+
+    type = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        registry: Optional["Registry"] = None,
+        callback: Optional[Callable[[], dict[Labels, float]]] = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames, registry)
+        self.callback = callback
+        # Without labels there is one series, exported from zero
+        self._values: dict[Labels, float] = {} if self.labelnames else {(): 0}
+
+    def inc(self, amount: float = 1.0, labels: Labels = ()) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> Iterable[Sample]:
+        values = self.callback() if self.callback else self._values
+        for labels, value in values.items():
+            yield self.name, self._labels(labels), value
+
+
+class Gauge(Metric):
+    """Gauge set directly, or read from ``callback`` at scrape time.
+
+    A callback returns a mapping of label values to the current value,
+    which suits numbers that already live elsewhere (pool sizes, cache
+    counters) and would otherwise have to be copied on every change.
+    """
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        registry: Optional["Registry"] = None,
+        callback: Optional[Callable[[], dict[Labels, float]]] = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames, registry)
+        self.callback = callback
+        self._values: dict[Labels, float] = {}
+
+    def set(self, value: float, labels: Labels = ()) -> None:
+        self._values[labels] = value
+
+    def inc(self, amount: float = 1.0, labels: Labels = ()) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, labels: Labels = ()) -> None:
+        self.inc(-amount, labels)
+
+    def samples(self) -> Iterable[Sample]:
+        values = self.callback() if self.callback else self._values
+        for labels, value in values.items():
+            yield self.name, self._labels(labels), value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        registry: Optional["Registry"] = None,
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., count above last, sum]
+        self._values: dict[Labels, list[float]] = {}
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        counts = self._values.get(labels)
+        if counts is None:
+            counts = self._values[labels] = [0.0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, counts in self._values.items():
+            base = self._labels(labels)
+            cumulative = 0.0
+            bounds = (*self.buckets, float("inf"))
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    {**base, "le": _format_value(bound)},
+                    cumulative,
+                )
+            yield f"{self.name}_sum", base, counts[-1]
+            yield f"{self.name}_count", base, cumulative
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def collect(self) -> list[Family]:
+        return [
+            (m.name, m.type, m.documentation, list(m.samples()))
+            for m in self._metrics.values()
+        ]
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        return render_families(self.collect())
+
+
+def render_families(families: Iterable[Family]) -> str:
+    lines = []
+    for metric_name, metric_type, documentation, samples in families:
+        lines.append(f"# HELP {metric_name} {documentation}")
+        lines.append(f"# TYPE {metric_name} {metric_type}")
+        for name, labels, value in samples:
+            if labels:
+                label_text = ",".join(
+                    f'{key}="{_escape(str(val))}"'
+                    for key, val in labels.items()
+                )
+                name = f"{name}{{{label_text}}}"
+            lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class SharedMetrics:
+    """Metrics of all the workers of a server, shared through a directory.
+
+    Each worker writes its samples to ``<directory>/<pid>.json`` every
+    ``interval`` seconds and on every scrape it answers, and a scrape
+    returns the samples of every worker, labelled with its ``pid``.
+    Series stay per worker rather than being summed, so a recycled
+    worker starts new series instead of making totals go backwards;
+    aggregate with ``sum without (pid)`` in queries. Other workers'
+    samples are up to ``interval`` old, and files not written for three
+    intervals (workers that exited) are removed.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        interval: float = 5.0,
+        registry: Optional[Registry] = None,
+    ) -> None:
+        self.directory = Path(directory)
+        self.interval = interval
+        self.registry = registry or default_registry
+        self._task: Optional[asyncio.Task[None]] = None
+
+    @property
+    def path(self) -> Path:
+        return self.directory / f"{os.getpid()}.json"
+
+    def start(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        with suppress(OSError):
+            self.path.unlink()
+
+    async def _run(self) -> None:
+        while True:
+            await self.write()
+            await asyncio.sleep(self.interval)
+
+    async def write(self) -> None:
+        # Collected on the loop thread, where the metrics are updated
+        families = self.registry.collect()
+        await asyncio.to_thread(self._write, families)
+
+    def _write(self, families: list[Family]) -> None:
+        path = self.path
+        temporary = path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(families))
+        os.replace(temporary, path)
+
+    async def render(self) -> str:
+        """Render every worker's metrics, this one's up to date"""
+        await self.write()
+        return await asyncio.to_thread(self._render)
+
+    def _render(self) -> str:
+        families: dict[str, Family] = {}
+        stale = time.time() - 3 * self.interval
+        for path in sorted(self.directory.glob("*.json")):
+            try:
+                if path.stat().st_mtime < stale:
+                    path.unlink()
+                    continue
+                worker = json.loads(path.read_text())
+            except (OSError, ValueError):
+                # Removed or replaced while being read
+                continue
+            pid = path.stem
+            for name, metric_type, documentation, samples in worker:
+                family = families.setdefault(
+                    name, (name, metric_type, documentation, [])
+                )
+                family[3].extend(
+                    (sample, {**labels, "pid": pid}, value)
+                    for sample, labels, value in samples
+                )
+        return render_families(families.values())
+
+
+default_registry = Registry()
@@ -0,0 +1,319 @@
+# Online schema changes and backfills for Alembic migrations
+import functools
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, Sequence, TypeVar
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# SQLSTATE lock_not_available: lock_timeout expired
+_LOCK_NOT_AVAILABLE = "55P03"
+
+PROGRESS_TABLE = "migration_backfills"
+_PROGRESS_DDL = (
+    f"CREATE TABLE IF NOT EXISTS {PROGRESS_TABLE} ("
+    "name VARCHAR(255) PRIMARY KEY, "
+    "last_key BIGINT NOT NULL, "
+    "rows_updated BIGINT NOT NULL)"
+)
+
+
+def _autocommit(connection: Connection) -> bool:
+    options = connection.get_execution_options()
+    return bool(options.get("isolation_level") == "AUTOCOMMIT")
+
+
+def _require_autocommit(connection: Connection, operation: str) -> None:
+    if connection.dialect.name == "postgresql" and not _autocommit(connection):
+        raise RuntimeError(
+            f"{operation} cannot run in a transaction; "
+            "call it inside op.get_context().autocommit_block()"
+        )
+
+
+def is_lock_timeout(exc: BaseException) -> bool:
+    """Whether ``exc`` means a lock could not be taken in time"""
+    orig = getattr(exc, "orig", exc)
+    code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    return code == _LOCK_NOT_AVAILABLE or "database is locked" in str(orig)
+
+
+@contextmanager
+def lock_timeout(
+    connection: Connection, milliseconds: Optional[int] = None
+) -> Iterator[None]:
+    """Fail statements that wait longer than ``milliseconds`` for a lock.
+
+    A DDL statement queued behind a long transaction blocks every later
+    query on the table while it waits, so it is better to give up
+    quickly and retry (see ``retry_on_lock_timeout``). Postgres only.
+    """
+    if connection.dialect.name != "postgresql":
+        yield
+        return
+    if milliseconds is None:
+        milliseconds = settings.MIGRATION_LOCK_TIMEOUT_MS
+    if not _autocommit(connection):
+        # Reset with the transaction, whether it commits or fails
+        connection.exec_driver_sql(f"SET LOCAL lock_timeout = {milliseconds}")
+        yield
+        return
+    connection.exec_driver_sql(f"SET lock_timeout = {milliseconds}")
+    try:
+        yield
+    finally:
+        connection.exec_driver_sql("RESET lock_timeout")
+
+
+def retry_on_lock_timeout(
+    operation: Callable[[], T],
+    retries: Optional[int] = None,
+    delay: float = 1.0,
+) -> T:
+    """Call ``operation``, retrying with backoff when it hits a lock timeout.
+
+    Only useful outside a transaction: a failed statement aborts the
+    transaction it ran in.
+    """
+    if retries is None:
+        retries = settings.MIGRATION_LOCK_RETRIES
+    attempt = 0
+    while True:
+        try:
+            return operation()
+        except DBAPIError as exc:
+            if attempt >= retries or not is_lock_timeout(exc):
+                raise
+            attempt += 1
+            wait = delay * 2 ** (attempt - 1)
+            logger.warning(
+                "Lock timeout, retrying in %.1f s (%d of %d)",
+                wait,
+                attempt,
+                retries,
+            )
+            time.sleep(wait)
+
+
+def _index_state(
+    connection: Connection, name: str, table: str
+) -> Optional[bool]:
+    """True if the index is usable, False if a failed concurrent build
+    left it invalid, None if it does not exist"""
+    if connection.dialect.name == "postgresql":
+        valid = connection.scalar(
+            text(
+                "SELECT indisvalid FROM pg_index "
+                "WHERE indexrelid = to_regclass(:name)"
+            ),
+            {"name": name},
+        )
+        return None if valid is None else bool(valid)
+    if connection.dialect.name == "sqlite":
+        # Reflection skips expression indexes, so look the name up
+        exists = connection.scalar(
+            text(
+                "SELECT 1 FROM sqlite_master "
+                "WHERE type = 'index' AND name = :name"
+            ),
+            {"name": name},
+        )
+        return True if exists else None
+    indexes = inspect(connection).get_indexes(table)
+    return True if any(i["name"] == name for i in indexes) else None
+
+
+def create_index_concurrently(
+    connection: Connection,
+    name: str,
+    table: str,
+    columns: Sequence[str],
+    unique: bool = False,
+    using: Optional[str] = None,
+) -> None:
+    """Build an index without blocking writes to the table.
+
+    On Postgres this is ``CREATE INDEX CONCURRENTLY``, which must run
+    outside a transaction. It is safe to re-run: an existing index is
+    kept, and an invalid one left by an interrupted build is dropped
+    and built again. ``columns`` are SQL, so they may include
+    expressions and operator classes.
+    """
+    _require_autocommit(connection, "CREATE INDEX CONCURRENTLY")
+    preparer = connection.dialect.identifier_preparer
+    concurrently = connection.dialect.name == "postgresql"
+    statement = (
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX "
+        f"{'CONCURRENTLY ' if concurrently else ''}{preparer.quote(name)} "
+        f"ON {preparer.quote(table)}"
+        f"{f' USING {using}' if using else ''} ({', '.join(columns)})"
+    )
+
+    def create() -> None:
+        state = _index_state(connection, name, table)
+        if state:
+            logger.info("Index %s already exists", name)
+            return
+        if state is False:
+            logger.warning("Dropping invalid index %s to rebuild it", name)
+            _drop_index(connection, name)
+        logger.info("Creating index %s on %s", name, table)
+        connection.exec_driver_sql(statement)
+
+    with lock_timeout(connection):
+        retry_on_lock_timeout(create)
+
+
+def _drop_index(connection: Connection, name: str) -> None:
+    quoted = connection.dialect.identifier_preparer.quote(name)
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(
+            f"DROP INDEX CONCURRENTLY IF EXISTS {quoted}"
+        )
+    else:
+        connection.exec_driver_sql(f"DROP INDEX IF EXISTS {quoted}")
+
+
+def drop_index_concurrently(connection: Connection, name: str) -> None:
+    """Drop an index without blocking queries on its table.
+
+    On Postgres this is ``DROP INDEX CONCURRENTLY``, which must run
+    outside a transaction. Dropping a missing index does nothing.
+    """
+    _require_autocommit(connection, "DROP INDEX CONCURRENTLY")
+    logger.info("Dropping index %s", name)
+    with lock_timeout(connection):
+        retry_on_lock_timeout(functools.partial(_drop_index, connection, name))
+
+
+def log_progress(name: str, rows: int, last_key: int, max_key: int) -> None:
+    done = 100.0 if max_key <= 0 else min(last_key / max_key * 100, 100.0)
+    logger.info(
+        "Backfill %s: %d rows updated, %.1f%% (key %d of %d)",
+        name,
+        rows,
+        done,
+        last_key,
+        max_key,
+    )
+
+
+def _load_progress(connection: Connection, name: str) -> tuple[int, int]:
+    connection.exec_driver_sql(_PROGRESS_DDL)
+    row = connection.execute(
+        text(
+            f"SELECT last_key, rows_updated FROM {PROGRESS_TABLE} "
+            "WHERE name = :name"
+        ),
+        {"name": name},
+    ).first()
+    return (int(row[0]), int(row[1])) if row is not None else (0, 0)
+
+
+def _save_progress(
+    connection: Connection, name: str, last_key: int, rows: int
+) -> None:
+    values = {"name": name, "last_key": last_key, "rows": rows}
+    updated = connection.execute(
+        text(
+            f"UPDATE {PROGRESS_TABLE} "
+            "SET last_key = :last_key, rows_updated = :rows "
+            "WHERE name = :name"
+        ),
+        values,
+    )
+    if not updated.rowcount:
+        connection.execute(
+            text(
+                f"INSERT INTO {PROGRESS_TABLE} (name, last_key, rows_updated) "
+                "VALUES (:name, :last_key, :rows)"
+            ),
+            values,
+        )
+
+
+def backfill(
+    connection: Connection,
+    name: str,
+    table: str,
+    set_clause: str,
+    where: Optional[str] = None,
+    key: str = "id",
+    batch_size: Optional[int] = None,
+    pause: Optional[float] = None,
+    report: Callable[[str, int, int, int], None] = log_progress,
+) -> int:
+    """``UPDATE table SET set_clause WHERE where``, in batches of keys.
+
+    Each batch updates the rows among the next ``batch_size`` values of
+    ``key`` (an integer column, normally the primary key), so locks are
+    held for one short statement, and is followed by ``pause`` seconds
+    of sleep to leave room for other traffic and for replicas to catch
+    up. Call it inside ``op.get_context().autocommit_block()`` so each
+    batch commits on its own.
+
+    The last key done is saved in ``migration_backfills`` after every
+    batch and running a backfill of the same ``name`` again resumes
+    from there. A batch may be repeated after a crash, so ``where``
+    should exclude rows already done (e.g. ``email_lower IS NULL``).
+    Rows with keys beyond the maximum at the start are left to the
+    application. Returns the number of rows updated.
+    """
+    if batch_size is None:
+        batch_size = settings.MIGRATION_BATCH_SIZE
+    if pause is None:
+        pause = settings.MIGRATION_BATCH_PAUSE
+
+    last_key, rows = _load_progress(connection, name)
+    max_key = connection.scalar(text(f"SELECT max({key}) FROM {table}"))
+    max_key = int(max_key or 0)
+    if last_key:
+        logger.info("Backfill %s: resuming after key %d", name, last_key)
+
+    next_batch = text(
+        f"SELECT max({key}) FROM (SELECT {key} FROM {table} "
+        f"WHERE {key} > :low AND {key} <= :max_key "
+        f"ORDER BY {key} LIMIT :size) AS batch"
+    )
+    condition = f" AND ({where})" if where else ""
+    update = text(
+        f"UPDATE {table} SET {set_clause} "
+        f"WHERE {key} > :low AND {key} <= :high{condition}"
+    )
+
+    def run_batch(low: int, high: int) -> Any:
+        return connection.execute(update, {"low": low, "high": high})
+
+    with lock_timeout(connection):
+        while last_key < max_key:
+            high = connection.scalar(
+                next_batch,
+                {"low": last_key, "max_key": max_key, "size": batch_size},
+            )
+            if high is None:
+                break
+            result = retry_on_lock_timeout(
+                functools.partial(run_batch, last_key, int(high))
+            )
+            rows += max(result.rowcount, 0)
+            last_key = int(high)
+            _save_progress(connection, name, last_key, rows)
+            report(name, rows, last_key, max_key)
+            if pause:
+                time.sleep(pause)
+
+    connection.execute(
+        text(f"DELETE FROM {PROGRESS_TABLE} WHERE name = :name"),
+        {"name": name},
+    )
+    logger.info("Backfill %s: done, %d rows updated", name, rows)
+    return rows
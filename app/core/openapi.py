@@ -0,0 +1,29 @@
+# Pre-generated OpenAPI schema
+import json
+import logging
+from pathlib import Path
+from typing import Union
+
+from fastapi import FastAPI
+
+logger = logging.getLogger(__name__)
+
+
+def write_openapi_schema(app: FastAPI, path: Union[str, Path]) -> None:
+    """Build the app's OpenAPI schema and write it to ``path``"""
+    Path(path).write_text(json.dumps(app.openapi(), separators=(",", ":")))
+
+
+def load_openapi_schema(app: FastAPI, path: Union[str, Path]) -> bool:
+    """Serve the schema in ``path`` instead of building it on first use.
+
+    The file must come from ``write_openapi_schema`` for the same code
+    (the Docker image generates it at build time). If it is missing or
+    unreadable, the schema is built on the first request as usual.
+    """
+    try:
+        app.openapi_schema = json.loads(Path(path).read_text())
+    except (OSError, ValueError) as exc:
+        logger.warning("Could not load OpenAPI schema from %s: %s", path, exc)
+        return False
+    return True
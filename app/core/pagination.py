@@ -0,0 +1,27 @@
+# Cursor pagination helpers
+import base64
+import binascii
+import json
+from typing import Any
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def encode_cursor(values: dict[str, Any]) -> str:
+    """Encode cursor values into an opaque, URL-safe token"""
+    raw = json.dumps(values, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> dict[str, Any]:
+    """Decode a token produced by ``encode_cursor``"""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursorError("Invalid cursor") from exc
+    if not isinstance(values, dict):
+        raise InvalidCursorError("Invalid cursor")
+    return values
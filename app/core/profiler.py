@@ -0,0 +1,219 @@
+# Sampling profiler for individual requests
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Any, Optional
+
+from app.core.config import settings
+
+Stack = tuple[str, ...]
+
+# Leaf frame added to samples taken while the request was suspended
+WAITING = "(waiting)"
+
+
+class StackProfile:
+    """Sample counts per call stack, aggregated over many requests.
+
+    At most ``max_stacks`` distinct stacks are kept; samples of further
+    new stacks are counted under a single ``(truncated)`` stack, so a
+    long-running profile cannot grow without bound.
+    """
+
+    def __init__(self, max_stacks: int = 5000) -> None:
+        self.max_stacks = max_stacks
+        self.requests = 0
+        self.stacks: Counter[Stack] = Counter()
+        # Frame name -> (file, first line), for speedscope output
+        self.frames: dict[str, tuple[str, int]] = {}
+
+    def add(self, samples: Counter[Stack]) -> None:
+        self.requests += 1
+        for stack, count in samples.items():
+            full = len(self.stacks) >= self.max_stacks
+            if full and stack not in self.stacks:
+                stack = stack[:1] + ("(truncated)",)
+            self.stacks[stack] += count
+
+    def clear(self) -> None:
+        self.requests = 0
+        self.stacks.clear()
+        self.frames.clear()
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed format: ``root;child;leaf count``"""
+        lines = [
+            f"{';'.join(stack)} {count}"
+            for stack, count in sorted(self.stacks.items())
+        ]
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def speedscope(self, interval: float) -> dict[str, Any]:
+        """A speedscope "sampled" profile, weighted in milliseconds"""
+        # Copied, since the sampler thread may add frames meanwhile
+        locations = dict(self.frames)
+        index: dict[str, int] = {}
+        frames: list[dict[str, Any]] = []
+        samples = []
+        weights = []
+        for stack, count in self.stacks.items():
+            sample = []
+            for name in stack:
+                if name not in index:
+                    index[name] = len(frames)
+                    frame: dict[str, Any] = {"name": name}
+                    if name in locations:
+                        frame["file"], frame["line"] = locations[name]
+                    frames.append(frame)
+                sample.append(index[name])
+            samples.append(sample)
+            weights.append(count * interval * 1000)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": f"{self.requests} requests",
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+            "name": "fastapi-production-app",
+            "exporter": "app.core.profiler",
+        }
+
+
+class _Tracked:
+    """A request being profiled: its task and the samples taken so far"""
+
+    def __init__(self, task: asyncio.Task, loop: asyncio.AbstractEventLoop):
+        self.task = task
+        self.loop = loop
+        self.thread_id = threading.get_ident()
+        self.root = task.get_coro()
+        self.samples: Counter[Stack] = Counter()
+
+
+class SamplingProfiler:
+    """Wall-clock sampling of selected requests from a background thread.
+
+    Every ``interval`` seconds while at least one request is tracked,
+    the thread records where each tracked request is: the event loop
+    thread's stack (from ``sys._current_frames``) when the request's
+    task is the one running, otherwise the chain of coroutines it is
+    suspended in, ending in ``(waiting)``. Only tracked requests are
+    sampled, and the thread sleeps while there are none.
+    """
+
+    def __init__(self, interval: float = 0.005, max_stacks: int = 5000):
+        self.interval = interval
+        self.profile = StackProfile(max_stacks)
+        self._active: dict[int, _Tracked] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> Optional[_Tracked]:
+        """Start sampling the current task"""
+        task = asyncio.current_task()
+        if task is None:
+            return None
+        tracked = _Tracked(task, asyncio.get_running_loop())
+        with self._lock:
+            self._active[id(tracked)] = tracked
+            self._wakeup.set()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="profiler", daemon=True
+                )
+                self._thread.start()
+        return tracked
+
+    def stop(self, tracked: Optional[_Tracked], label: str) -> int:
+        """Stop sampling and add the samples under ``label``"""
+        if tracked is None:
+            return 0
+        with self._lock:
+            self._active.pop(id(tracked), None)
+        samples: Counter[Stack] = Counter()
+        for stack, count in tracked.samples.items():
+            samples[(label,) + stack] += count
+        self.profile.add(samples)
+        return sum(samples.values())
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                if not self._active:
+                    self._wakeup.clear()
+                    continue
+                thread_frames = sys._current_frames()
+                for tracked in self._active.values():
+                    stack = self._stack(tracked, thread_frames)
+                    if stack:
+                        tracked.samples[stack] += 1
+                del thread_frames
+            time.sleep(self.interval)
+
+    def _stack(
+        self, tracked: _Tracked, thread_frames: dict[int, FrameType]
+    ) -> Stack:
+        if asyncio.current_task(tracked.loop) is tracked.task:
+            frames = _thread_stack(thread_frames.get(tracked.thread_id))
+            root_code = getattr(tracked.root, "cr_code", None)
+            for position, frame in enumerate(frames):
+                if frame.f_code is root_code:
+                    frames = frames[position:]
+                    break
+            leaf: tuple[str, ...] = ()
+        else:
+            frames = _await_stack(tracked.root)
+            leaf = (WAITING,)
+        return tuple(self._name(frame) for frame in frames) + leaf
+
+    def _name(self, frame: FrameType) -> str:
+        code = frame.f_code
+        qualname = getattr(code, "co_qualname", code.co_name)
+        name = f"{frame.f_globals.get('__name__', '?')}:{qualname}"
+        if name not in self.profile.frames:
+            self.profile.frames[name] = (code.co_filename, code.co_firstlineno)
+        return name
+
+
+def _thread_stack(frame: Optional[FrameType]) -> list[FrameType]:
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+def _await_stack(awaitable: Any) -> list[FrameType]:
+    """Frames of a suspended coroutine and the coroutines it awaits"""
+    frames = []
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(
+            awaitable, "gi_frame", None
+        )
+        if frame is None:
+            break
+        frames.append(frame)
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(
+            awaitable, "gi_yieldfrom", None
+        )
+    return frames
+
+
+profiler = SamplingProfiler(
+    interval=settings.PROFILER_INTERVAL_MS / 1000,
+    max_stacks=settings.PROFILER_MAX_STACKS,
+)
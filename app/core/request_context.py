@@ -0,0 +1,28 @@
+# Per-request context
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+
+class RequestContext:
+    """State collected while serving one request"""
+
+    def __init__(self, request_id: Optional[str] = None) -> None:
+        self.request_id = request_id
+        self.query_count = 0
+        self.db_seconds = 0.0
+        self.statement_counts: Counter[str] = Counter()
+        # Read-your-writes: set when this request committed a write, or
+        # when the client recently did (see ReadYourWritesMiddleware)
+        self.wrote = False
+        self.read_primary = False
+
+
+request_context: ContextVar[Optional[RequestContext]] = ContextVar(
+    "request_context", default=None
+)
+
+
+def get_request_context() -> Optional[RequestContext]:
+    """The context of the request being served, if any"""
+    return request_context.get()
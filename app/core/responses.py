@@ -0,0 +1,40 @@
+# Response helpers
+from functools import lru_cache
+from typing import Any, Iterable, Mapping, Optional
+
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(list[model])  # type: ignore[valid-type]
+
+
+def orm_list_json_response(
+    model: type[BaseModel],
+    rows: Iterable[Any],
+    status_code: int = 200,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    """Encode ORM rows as a JSON array of ``model`` in a single pass.
+
+    The rows come from our own database and were validated on the way
+    in, so they are copied into ``model`` with ``model_construct``
+    instead of being validated again (``EmailStr`` alone costs more than
+    the rest of the encoding). pydantic-core then writes the JSON bytes
+    directly, skipping ``jsonable_encoder`` and the stdlib encoder. The
+    output matches FastAPI's encoding of ``response_model=list[model]``
+    for flat models.
+    """
+    fields = tuple(model.model_fields)
+    items = [
+        model.model_construct(**{name: getattr(row, name) for name in fields})
+        for row in rows
+    ]
+    return Response(
+        content=_list_adapter(model).dump_json(items),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
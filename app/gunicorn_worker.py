@@ -0,0 +1,18 @@
+# Gunicorn worker class for app.server
+try:
+    import uvicorn_worker as workers
+except ImportError:
+    # The worker bundled with uvicorn, deprecated in favour of the above
+    from uvicorn import workers  # type: ignore[no-redef]
+
+from app.core.config import settings
+
+
+class UvicornWorker(workers.UvicornWorker):
+    """Uvicorn worker using the event loop and HTTP parser in settings"""
+
+    CONFIG_KWARGS = {
+        **workers.UvicornWorker.CONFIG_KWARGS,
+        "loop": settings.SERVER_LOOP,
+        "http": settings.SERVER_HTTP,
+    }
@@ -1,8 +1,57 @@
-from fastapi import FastAPI
+import hmac
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Literal, Union
+
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from app.api.v1.api import api_router
 from app.core.config import settings
+from app.core.database import read_replicas
+from app.core.executor import ExecutorSaturatedError
+from app.core.logging import configure_logging, shutdown_logging
+from app.core.metrics import SharedMetrics, default_registry
+from app.core.openapi import load_openapi_schema
+from app.core.profiler import profiler
+from app.middleware.access_log import AccessLogMiddleware
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.load_shedding import LoadSheddingMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.middleware.query_stats import QueryStatsMiddleware
+from app.middleware.read_your_writes import ReadYourWritesMiddleware
+from app.services.auth_service import password_hasher
+from app.services.password_rehash import password_rehasher
+
+# Set by app.server when it runs several workers
+shared_metrics = (
+    SharedMetrics(
+        settings.METRICS_MULTIPROC_DIR, settings.METRICS_WRITE_INTERVAL
+    )
+    if settings.METRICS_ENABLED and settings.METRICS_MULTIPROC_DIR
+    else None
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Started per worker, since the writer thread does not survive a fork
+    configure_logging()
+    if settings.PASSWORD_REHASH_ENABLED:
+        password_rehasher.start()
+    if shared_metrics is not None:
+        shared_metrics.start()
+    yield
+    if shared_metrics is not None:
+        await shared_metrics.stop()
+    await password_rehasher.stop()
+    password_hasher.shutdown()
+    for replica in read_replicas.engines:
+        await replica.dispose()
+    shutdown_logging()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -11,21 +60,97 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
-# Set up CORS
+app.add_middleware(
+    ReadYourWritesMiddleware,
+    replicas=read_replicas,
+    max_age=settings.DB_READ_YOUR_WRITES_SECONDS,
+)
+
+app.add_middleware(
+    QueryStatsMiddleware, server_timing=settings.SERVER_TIMING_ENABLED
+)
+
+if settings.COMPRESSION_ENABLED:
+    compression_levels = {
+        "gzip": settings.COMPRESSION_GZIP_LEVEL,
+        "br": settings.COMPRESSION_BROTLI_LEVEL,
+        "zstd": settings.COMPRESSION_ZSTD_LEVEL,
+    }
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        levels={
+            coding: compression_levels[coding]
+            for coding in settings.COMPRESSION_ENCODINGS
+        },
+        cache_paths=(f"{settings.API_V1_STR}/openapi.json",),
+    )
+
+if settings.LOAD_SHEDDING_ENABLED:
+    app.add_middleware(
+        LoadSheddingMiddleware,
+        exempt_paths=(
+            "/health",
+            "/metrics",
+            "/docs",
+            "/redoc",
+            "/admin/profile",
+            f"{settings.API_V1_STR}/openapi.json",
+        ),
+        limiter_options={
+            "initial_limit": settings.LOAD_SHEDDING_INITIAL_LIMIT,
+            "min_limit": settings.LOAD_SHEDDING_MIN_LIMIT,
+            "max_limit": settings.LOAD_SHEDDING_MAX_LIMIT,
+            "max_queue": settings.LOAD_SHEDDING_MAX_QUEUE,
+            "queue_timeout": settings.LOAD_SHEDDING_QUEUE_TIMEOUT,
+            "tolerance": settings.LOAD_SHEDDING_TOLERANCE,
+        },
+    )
+
+# Set up CORS outside load shedding, so 503s carry CORS headers and
+# preflights are answered without using up the read budget
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.BACKEND_CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "X-Request-ID"],
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+if settings.LOG_ACCESS:
+    app.add_middleware(AccessLogMiddleware)
+
+# Outermost, so profiles include the time spent in other middleware
+if settings.PROFILER_SAMPLE_EVERY or settings.PROFILER_TOKEN:
+    app.add_middleware(
+        ProfilingMiddleware,
+        profiler=profiler,
+        sample_every=settings.PROFILER_SAMPLE_EVERY,
+        token=settings.PROFILER_TOKEN,
+    )
+
 # Include API routes
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 
+@app.exception_handler(ExecutorSaturatedError)
+async def executor_saturated_handler(
+    request: Request, exc: ExecutorSaturatedError
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+
 @app.get("/")
 async def root() -> dict[str, str]:
     return {"message": "Welcome to FastAPI Production App"}
@@ -36,13 +161,47 @@ async def health_check() -> dict[str, str]:
     return {"status": "healthy"}
 
 
+if settings.METRICS_ENABLED:
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics() -> PlainTextResponse:
+        if shared_metrics is not None:
+            text = await shared_metrics.render()
+        else:
+            text = default_registry.render()
+        return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+
+@app.get("/admin/profile", include_in_schema=False, response_model=None)
+async def profile_export(
+    request: Request,
+    format: Literal["collapsed", "speedscope"] = "collapsed",
+    reset: bool = False,
+) -> Union[PlainTextResponse, JSONResponse]:
+    """Sampled stacks, for flamegraph.pl / speedscope.app"""
+    token = request.headers.get("x-profile-token", "")
+    if not settings.PROFILER_TOKEN or not hmac.compare_digest(
+        token.encode(), settings.PROFILER_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    profile = profiler.profile
+    response: Union[PlainTextResponse, JSONResponse]
+    if format == "speedscope":
+        response = JSONResponse(profile.speedscope(profiler.interval))
+    else:
+        response = PlainTextResponse(profile.collapsed())
+    response.headers["X-Profiled-Requests"] = str(profile.requests)
+    if reset:
+        profile.clear()
+    return response
+
+
+if settings.OPENAPI_SCHEMA_FILE:
+    load_openapi_schema(app, settings.OPENAPI_SCHEMA_FILE)
+
+
 if __name__ == "__main__":
-    import uvicorn
-
-    uvicorn.run(
-        "app.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info",
-    )
+    from app.server import main
+
+    main()
@@ -0,0 +1,86 @@
+import logging
+import re
+import time
+import uuid
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.request_context import RequestContext, request_context
+from app.middleware.metrics import route_template
+
+logger = logging.getLogger("app.access")
+
+REQUEST_ID_HEADER = b"x-request-id"
+# Incoming ids are kept only if they look like ids, so clients cannot
+# inject arbitrary text into the logs
+_VALID_REQUEST_ID = re.compile(rb"[A-Za-z0-9._-]{1,128}")
+
+
+def request_id_from(scope: Scope) -> str:
+    """The client's X-Request-ID if it is well formed, else a new one"""
+    value: bytes
+    for name, value in scope["headers"]:
+        if name == REQUEST_ID_HEADER:
+            if _VALID_REQUEST_ID.fullmatch(value):
+                return value.decode("ascii")
+            break
+    return uuid.uuid4().hex
+
+
+class AccessLogMiddleware:
+    """Log one structured record per request and tag it with an id.
+
+    The request id (taken from ``X-Request-ID`` or generated) is put on
+    the request context, so every record logged while serving the
+    request carries it, and is echoed in the response. The access record
+    holds the route, status, duration and database time.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        context = RequestContext(request_id=request_id_from(scope))
+        token = request_context.set(context)
+        status = 500
+        response_bytes = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-ID"] = str(context.request_id)
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "%s %s %d",
+                    scope["method"],
+                    scope["path"],
+                    status,
+                    extra={
+                        "method": scope["method"],
+                        "route": route_template(scope),
+                        "status": status,
+                        "duration_ms": round(duration * 1000, 3),
+                        "db_ms": round(context.db_seconds * 1000, 3),
+                        "db_queries": context.query_count,
+                        "bytes": response_bytes,
+                    },
+                )
+            request_context.reset(token)
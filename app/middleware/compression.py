@@ -0,0 +1,285 @@
+import hashlib
+import zlib
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Callable, Optional, Protocol, Sequence
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import Counter
+
+compression_bytes = Counter(
+    "http_compression_bytes_total",
+    "Response bytes before and after compression",
+    labelnames=("encoding", "stage"),
+)
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+class Encoder(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+    def finish(self) -> bytes: ...
+
+
+class GzipEncoder:
+    def __init__(self, level: int) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, level: int) -> None:
+        import brotli
+
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return bytes(self._compressor.process(data))
+
+    def flush(self) -> bytes:
+        return bytes(self._compressor.flush())
+
+    def finish(self) -> bytes:
+        return bytes(self._compressor.finish())
+
+
+class ZstdEncoder:
+    def __init__(self, level: int) -> None:
+        import zstandard
+
+        self._flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return bytes(self._compressor.compress(data))
+
+    def flush(self) -> bytes:
+        return bytes(self._compressor.flush(self._flush_block))
+
+    def finish(self) -> bytes:
+        return bytes(self._compressor.flush())
+
+
+def available_encoders(
+    levels: dict[str, int],
+) -> dict[str, Callable[[], Encoder]]:
+    """Encoders for ``levels`` whose libraries are installed.
+
+    ``levels`` maps a content coding to its level and lists codings in
+    order of preference; ``br`` and ``zstd`` need the optional
+    ``brotli`` and ``zstandard`` packages and are skipped without them.
+    """
+    classes: dict[str, Any] = {
+        "gzip": GzipEncoder,
+        "br": BrotliEncoder,
+        "zstd": ZstdEncoder,
+    }
+    encoders: dict[str, Callable[[], Encoder]] = {}
+    for coding, level in levels.items():
+        encoder_class = classes[coding]
+        try:
+            encoder_class(level)
+        except ImportError:
+            continue
+        encoders[coding] = partial(encoder_class, level)
+    return encoders
+
+
+def choose_encoding(
+    accept_encoding: str, available: Sequence[str]
+) -> Optional[str]:
+    """The preferred coding in ``available`` the client accepts, if any.
+
+    Codings are ranked by the client's q-value, then by their order in
+    ``available``. ``*`` covers codings the header does not name.
+    """
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+
+    best: Optional[str] = None
+    best_weight = 0.0
+    for coding in available:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+class CompressionMiddleware:
+    """Compress responses in the best coding the client accepts.
+
+    Bodies smaller than ``minimum_size`` and content types that do not
+    compress well are sent as they are. Streaming responses are
+    compressed chunk by chunk, flushing after each chunk so the client
+    still receives data as it is produced.
+
+    Complete bodies for ``cache_paths`` (static documents such as the
+    OpenAPI schema) are compressed once per coding and served from a
+    small cache afterwards, keyed by a digest of the uncompressed body.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        levels: Optional[dict[str, int]] = None,
+        cache_paths: Sequence[str] = (),
+        cache_size: int = 32,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoders = available_encoders(levels or {"gzip": 6})
+        self.cache_paths = frozenset(cache_paths)
+        self.cache_size = cache_size
+        self.cache: OrderedDict[tuple[str, str, bytes], bytes] = OrderedDict()
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        coding = choose_encoding(
+            Headers(scope=scope).get("accept-encoding", ""),
+            list(self.encoders),
+        )
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, scope, send, coding)
+        await self.app(scope, receive, responder.send)
+
+    def cached(self, path: str, coding: str, body: bytes) -> bytes:
+        """Compress ``body``, reusing the result for cacheable paths"""
+        if path not in self.cache_paths:
+            return self.compress(coding, body)
+        key = (path, coding, hashlib.blake2b(body, digest_size=16).digest())
+        compressed = self.cache.get(key)
+        if compressed is None:
+            compressed = self.cache[key] = self.compress(coding, body)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(key)
+        return compressed
+
+    def compress(self, coding: str, body: bytes) -> bytes:
+        encoder = self.encoders[coding]()
+        return encoder.compress(body) + encoder.finish()
+
+
+class _CompressionResponder:
+    def __init__(
+        self,
+        middleware: CompressionMiddleware,
+        scope: Scope,
+        send: Send,
+        coding: str,
+    ) -> None:
+        self.middleware = middleware
+        self.path: str = scope["path"]
+        self.downstream = send
+        self.coding = coding
+        self.start: Optional[Message] = None
+        self.encoder: Optional[Encoder] = None
+        self.passthrough = False
+
+    def _compressible(self, headers: MutableHeaders) -> bool:
+        content_type = headers.get("content-type", "")
+        return (
+            "content-encoding" not in headers
+            and self.start is not None
+            and self.start["status"] not in (204, 304)
+            and content_type.startswith(COMPRESSIBLE_TYPES)
+        )
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            headers = MutableHeaders(scope=message)
+            if self._compressible(headers):
+                headers.add_vary_header("Accept-Encoding")
+            else:
+                self.passthrough = True
+                await self.downstream(message)
+            return
+
+        if self.passthrough or message["type"] != "http.response.body":
+            await self.downstream(message)
+            return
+
+        assert self.start is not None
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+        headers = MutableHeaders(scope=self.start)
+
+        if self.encoder is None and not more_body:
+            # The whole body is here: compress it in one go, if worth it
+            if len(body) >= self.middleware.minimum_size:
+                compressed = self.middleware.cached(
+                    self.path, self.coding, body
+                )
+                self._count(len(body), len(compressed))
+                body = compressed
+                headers["Content-Encoding"] = self.coding
+                headers["Content-Length"] = str(len(body))
+            await self.downstream(self.start)
+            await self.downstream({**message, "body": body})
+            return
+
+        if self.encoder is None:
+            # First chunk of a streaming body
+            self.encoder = self.middleware.encoders[self.coding]()
+            headers["Content-Encoding"] = self.coding
+            if "content-length" in headers:
+                del headers["content-length"]
+            await self.downstream(self.start)
+
+        chunk = self.encoder.compress(body)
+        chunk += self.encoder.flush() if more_body else self.encoder.finish()
+        self._count(len(body), len(chunk))
+        await self.downstream(
+            {
+                "type": "http.response.body",
+                "body": chunk,
+                "more_body": more_body,
+            }
+        )
+
+    def _count(self, raw: int, compressed: int) -> None:
+        compression_bytes.inc(raw, labels=(self.coding, "in"))
+        compression_bytes.inc(compressed, labels=(self.coding, "out"))
@@ -0,0 +1,123 @@
+import time
+import weakref
+from typing import Any, Callable, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.limiter import GradientLimiter, LimitExceededError
+from app.core.metrics import Counter, Gauge
+
+requests_shed = Counter(
+    "load_shedding_rejected_total",
+    "Requests rejected by the adaptive concurrency limiter",
+    labelnames=("route_class", "reason"),
+)
+
+# Starlette builds middleware lazily; track instances so their limiters
+# can be reported at scrape time
+_middlewares: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+
+def route_class(scope: Scope) -> str:
+    """Budget a request counts against: token issuing, reads or writes"""
+    if scope["path"].endswith("/auth/token"):
+        return "auth"
+    if scope["method"] in ("GET", "HEAD", "OPTIONS"):
+        return "read"
+    return "write"
+
+
+class LoadSheddingMiddleware:
+    """Apply an adaptive concurrency limit per route class.
+
+    Each class (see ``route_class``) gets its own ``GradientLimiter``
+    built from ``limiter_options``, so slow password hashing cannot use
+    up the budget of cheap reads.
+    Requests the limiter rejects get an immediate 503 with
+    ``Retry-After`` instead of waiting for a database connection.
+    Paths in ``exempt_paths`` (health checks, metrics, docs) always
+    pass through.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        exempt_paths: tuple[str, ...] = (),
+        classify: Callable[[Scope], str] = route_class,
+        retry_after: int = 1,
+        limiter_options: Optional[dict[str, Any]] = None,
+    ) -> None:
+        self.app = app
+        self.limiter_options = limiter_options or {}
+        self.exempt_paths = exempt_paths
+        self.classify = classify
+        self.retry_after = retry_after
+        self.limiters: dict[str, GradientLimiter] = {}
+        _middlewares.add(self)
+
+    def limiter(self, name: str) -> GradientLimiter:
+        limiter = self.limiters.get(name)
+        if limiter is None:
+            limiter = self.limiters[name] = GradientLimiter(
+                name, **self.limiter_options
+            )
+        return limiter
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        name = self.classify(scope)
+        limiter = self.limiter(name)
+        try:
+            await limiter.acquire()
+        except LimitExceededError as exc:
+            requests_shed.inc(labels=(name, exc.reason))
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server is busy, please retry"},
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        rtt: Optional[float] = None
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+            rtt = time.perf_counter() - start
+        finally:
+            # Failed requests free their slot without moving the limit
+            limiter.release(rtt)
+
+
+def _limiter_stats(attribute: str) -> dict[tuple[str, ...], float]:
+    return {
+        (name,): float(getattr(limiter, attribute))
+        for middleware in _middlewares
+        for name, limiter in middleware.limiters.items()
+    }
+
+
+Gauge(
+    "load_shedding_limit",
+    "Current adaptive concurrency limit",
+    labelnames=("route_class",),
+    callback=lambda: _limiter_stats("limit"),
+)
+Gauge(
+    "load_shedding_in_flight",
+    "Requests holding a concurrency slot",
+    labelnames=("route_class",),
+    callback=lambda: _limiter_stats("in_flight"),
+)
+Gauge(
+    "load_shedding_queue_depth",
+    "Requests waiting for a concurrency slot",
+    labelnames=("route_class",),
+    callback=lambda: _limiter_stats("queue_depth"),
+)
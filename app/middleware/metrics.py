@@ -0,0 +1,75 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import Gauge, Histogram
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request duration by route template",
+    labelnames=("method", "route", "status"),
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+)
+
+
+def route_template(scope: Scope) -> str:
+    """The route template that served a request, e.g. ``/users/{user_id}``.
+
+    Routes of an included router may only know their own path, without
+    the router's prefix, so the prefix is recovered from the raw path.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path_format", None) or getattr(
+        route, "path", None
+    )
+    if template is None:
+        return "<unmatched>"
+    template = str(template)
+    try:
+        concrete = template.format(**scope.get("path_params", {}))
+    except (KeyError, IndexError, ValueError):
+        return template
+    path: str = scope["path"]
+    if path.endswith(concrete):
+        return path[: len(path) - len(concrete)] + template
+    return template
+
+
+class MetricsMiddleware:
+    """Record request durations keyed by route template.
+
+    Labels use the matched route's path (``/api/v1/users/{user_id}``)
+    rather than the raw URL, so the number of series stays bounded.
+    Requests that match no route share the ``<unmatched>`` label.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            http_request_duration.observe(
+                time.perf_counter() - start,
+                labels=(scope["method"], route_template(scope), str(status)),
+            )
@@ -0,0 +1,58 @@
+import hmac
+from typing import Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.profiler import SamplingProfiler
+from app.middleware.metrics import route_template
+
+PROFILE_TOKEN_HEADER = b"x-profile-token"
+
+
+class ProfilingMiddleware:
+    """Profile every ``sample_every``-th request, or on request.
+
+    A request carrying ``X-Profile-Token`` equal to ``token`` is always
+    profiled. Samples are aggregated under the method and route template
+    and can be exported from the profiler. Requests that are not
+    profiled cost one counter increment and a header scan.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        profiler: SamplingProfiler,
+        sample_every: int = 0,
+        token: Optional[str] = None,
+    ) -> None:
+        self.app = app
+        self.profiler = profiler
+        self.sample_every = sample_every
+        self.token = token.encode() if token else None
+        self._seen = 0
+
+    def _should_profile(self, scope: Scope) -> bool:
+        if self.token is not None:
+            for name, value in scope["headers"]:
+                if name == PROFILE_TOKEN_HEADER:
+                    if hmac.compare_digest(value, self.token):
+                        return True
+                    break
+        if self.sample_every:
+            self._seen += 1
+            return self._seen % self.sample_every == 0
+        return False
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        tracked = self.profiler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            label = f"{scope['method']} {route_template(scope)}"
+            self.profiler.stop(tracked, label)
@@ -0,0 +1,48 @@
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.request_context import RequestContext, request_context
+
+
+class QueryStatsMiddleware:
+    """Collect per-request SQL statistics and report them to the client.
+
+    With ``server_timing`` enabled, the statement count and database time
+    are sent in a ``Server-Timing`` header, which browser dev tools show
+    alongside the request. Statements run after the response has started
+    (for example while streaming) are not included.
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool = True) -> None:
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Reuse the context of an outer middleware (the access log)
+        context = request_context.get()
+        token = None
+        if context is None:
+            context = RequestContext()
+            token = request_context.set(context)
+
+        async def send_wrapper(message: Message) -> None:
+            if self.server_timing and message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f"db;dur={context.db_seconds * 1000:.2f};"
+                    f'desc="{context.query_count} queries"',
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if token is not None:
+                request_context.reset(token)
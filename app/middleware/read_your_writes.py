@@ -0,0 +1,60 @@
+from starlette.datastructures import MutableHeaders
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.database import ReplicaSet
+from app.core.request_context import get_request_context
+
+
+class ReadYourWritesMiddleware:
+    """Keep a client on the primary database for a while after it writes.
+
+    A response to a request that committed a write sets a short-lived
+    cookie. While the client sends it back, ``get_read_db`` uses the
+    primary rather than a replica that may not have caught up yet. Does
+    nothing unless replicas are configured.
+
+    Must run inside ``QueryStatsMiddleware``, which sets up the request
+    context.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        replicas: ReplicaSet,
+        max_age: int = 5,
+        cookie_name: str = "read_primary",
+    ) -> None:
+        self.app = app
+        self.replicas = replicas
+        self.max_age = max_age
+        self.cookie_name = cookie_name
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        context = get_request_context()
+        if (
+            scope["type"] != "http"
+            or context is None
+            or not self.replicas.engines
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        cookies = cookie_parser(
+            dict(scope["headers"]).get(b"cookie", b"").decode("latin-1")
+        )
+        if self.cookie_name in cookies:
+            context.read_primary = True
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and context.wrote:
+                MutableHeaders(scope=message).append(
+                    "Set-Cookie",
+                    f"{self.cookie_name}=1; Max-Age={self.max_age}; "
+                    "Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy import Column, DateTime, Index, Integer, String
 from sqlalchemy.sql import func
 
 from app.core.database import Base
@@ -7,12 +7,26 @@ from app.core.database import Base
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     full_name = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Bumped on every write; updated_at may repeat within a second (or
+    # a transaction), so ETags are derived from this instead
+    version = Column(Integer, nullable=False, server_default="1")
+
+    __table_args__ = (
+        # Case-insensitive email prefix search, in search order
+        Index(
+            "ix_users_email_lower",
+            func.lower(email).label("email_lower"),
+            email,
+            postgresql_ops={"email_lower": "text_pattern_ops"},
+        ),
+    )
+    __mapper_args__ = {"version_id_col": version}
 
     def __repr__(self) -> str:
         return f"<User(id={self.id}, email='{self.email}')>"
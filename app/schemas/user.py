@@ -1,7 +1,7 @@
 from datetime import datetime
-from typing import Optional
+from typing import Any, Literal, Optional
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, field_validator
 
 
 class UserBase(BaseModel):
@@ -17,6 +17,14 @@ class UserUpdate(BaseModel):
     email: Optional[EmailStr] = None
     full_name: Optional[str] = None
 
+    @field_validator("email", "full_name")
+    @classmethod
+    def not_null(cls, value: Any) -> Any:
+        # Fields may be left out, but the columns cannot be set to NULL
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
 
 class UserInDB(UserBase):
     id: int
@@ -31,6 +39,20 @@ class UserResponse(UserInDB):
     pass
 
 
+class BulkUserResult(BaseModel):
+    index: int
+    status: Literal["created", "conflict", "invalid"]
+    user: Optional[UserResponse] = None
+    error: Optional[str] = None
+
+
+class BulkUserCreateResponse(BaseModel):
+    created: int
+    conflicts: int
+    invalid: int
+    results: list[BulkUserResult]
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -38,3 +60,5 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+    user_id: Optional[int] = None
+    full_name: Optional[str] = None
@@ -0,0 +1,187 @@
+# Production server entry point
+import importlib.util
+import math
+import os
+import random
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+
+from app.core.config import settings
+
+APP = "app.main:app"
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+
+def _read(path: Path) -> Optional[str]:
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit(root: Path = CGROUP_ROOT) -> Optional[float]:
+    """CPUs allowed by the container's CFS quota, if it sets one"""
+    # cgroup v2: "<quota> <period>" or "max <period>"
+    cpu_max = _read(root / "cpu.max")
+    if cpu_max is not None:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+
+    # cgroup v1: a quota of -1 means unlimited
+    v1_quota = _read(root / "cpu" / "cpu.cfs_quota_us")
+    v1_period = _read(root / "cpu" / "cpu.cfs_period_us")
+    if v1_quota and v1_period and int(v1_quota) > 0:
+        return int(v1_quota) / int(v1_period)
+    return None
+
+
+def available_cpus(root: Path = CGROUP_ROOT) -> int:
+    """CPUs this process may use: affinity mask capped by cgroup quota"""
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    quota = cgroup_cpu_limit(root)
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+def worker_count(
+    configured: int = 0, cpus: Optional[int] = None, maximum: int = 0
+) -> int:
+    """Workers to run: ``configured``, else one per available CPU.
+
+    Workers are async, so one per CPU keeps every core busy; more would
+    only add connection pools (each worker has its own).
+    """
+    if configured > 0:
+        return configured
+    workers = cpus or available_cpus()
+    if maximum > 0:
+        workers = min(workers, maximum)
+    return max(1, workers)
+
+
+def uvicorn_options() -> dict[str, Any]:
+    """Keyword arguments for ``uvicorn.run`` from settings"""
+    workers = worker_count(
+        settings.SERVER_WORKERS, maximum=settings.SERVER_MAX_WORKERS
+    )
+    return {
+        "host": settings.HOST,
+        "port": settings.PORT,
+        "workers": workers,
+        # "auto" picks uvloop and httptools when installed
+        "loop": settings.SERVER_LOOP,
+        "http": settings.SERVER_HTTP,
+        "backlog": settings.SERVER_BACKLOG,
+        "timeout_keep_alive": settings.SERVER_KEEPALIVE_TIMEOUT,
+        "timeout_graceful_shutdown": settings.SERVER_GRACEFUL_TIMEOUT,
+        # A single uvicorn process exits at the limit instead of being
+        # replaced, so only recycle under the multi-worker supervisor
+        # (which replaces exited workers from uvicorn 0.30)
+        "limit_max_requests": _max_requests() if workers > 1 else None,
+        "proxy_headers": True,
+        "log_level": settings.LOG_LEVEL.lower(),
+        # The app installs its own JSON logging and access log, so
+        # uvicorn's loggers just propagate to it
+        "log_config": None,
+        "access_log": not settings.LOG_ACCESS,
+    }
+
+
+def _max_requests() -> Optional[int]:
+    if settings.SERVER_MAX_REQUESTS <= 0:
+        return None
+    # Jitter keeps workers started together from restarting together
+    jitter = random.randint(0, max(settings.SERVER_MAX_REQUESTS_JITTER, 0))
+    return settings.SERVER_MAX_REQUESTS + jitter
+
+
+def gunicorn_options() -> dict[str, Any]:
+    """Gunicorn settings equivalent to ``uvicorn_options``"""
+    options = uvicorn_options()
+    return {
+        "bind": f"{options['host']}:{options['port']}",
+        "workers": options["workers"],
+        # Applies SERVER_LOOP and SERVER_HTTP, like uvicorn_options
+        "worker_class": "app.gunicorn_worker.UvicornWorker",
+        "backlog": options["backlog"],
+        "keepalive": options["timeout_keep_alive"],
+        "graceful_timeout": options["timeout_graceful_shutdown"],
+        "max_requests": max(settings.SERVER_MAX_REQUESTS, 0),
+        "max_requests_jitter": max(settings.SERVER_MAX_REQUESTS_JITTER, 0),
+        "preload_app": settings.SERVER_PRELOAD,
+        "loglevel": options["log_level"],
+    }
+
+
+def _log_per_process(workers: int) -> None:
+    # Workers rotating one LOG_FILE would rename it from under each
+    # other, so each writes a file of its own
+    if workers > 1 and settings.LOG_FILE:
+        settings.LOG_FILE_PER_PROCESS = True
+        # Workers spawned by uvicorn load settings from the environment
+        os.environ["LOG_FILE_PER_PROCESS"] = "true"
+
+
+def _share_metrics(workers: int) -> None:
+    # Each worker has its own registry, so with several of them /metrics
+    # collects every worker's samples from a shared directory
+    if workers > 1 and settings.METRICS_ENABLED:
+        if not settings.METRICS_MULTIPROC_DIR:
+            directory = tempfile.mkdtemp(prefix="app-metrics-")
+            settings.METRICS_MULTIPROC_DIR = directory
+            os.environ["METRICS_MULTIPROC_DIR"] = directory
+
+
+def _post_fork(server: Any, worker: Any) -> None:
+    # Connections opened before the fork belong to the parent
+    from app.core.database import engine, read_replicas
+
+    for db_engine in (engine, *read_replicas.engines):
+        db_engine.sync_engine.dispose(close=False)
+
+
+def run_gunicorn() -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self) -> None:
+            for key, value in gunicorn_options().items():
+                self.cfg.set(key, value)
+            self.cfg.set("post_fork", _post_fork)
+
+        def load(self) -> Any:
+            from app.main import app
+
+            return app
+
+    Application().run()
+
+
+def main() -> None:
+    """Serve the app in production.
+
+    With SERVER_PRELOAD and gunicorn installed, gunicorn imports the app
+    once and forks the workers from it; otherwise uvicorn starts and
+    supervises the workers itself.
+    """
+    options = uvicorn_options()
+    _log_per_process(options["workers"])
+    _share_metrics(options["workers"])
+    if settings.SERVER_PRELOAD and importlib.util.find_spec("gunicorn"):
+        run_gunicorn()
+        return
+
+    import uvicorn
+
+    uvicorn.run(APP, **options)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,113 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Optional
 
-from jose import jwt
-from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 
+from app.core.cache import InMemoryCache
 from app.core.config import settings
+from app.core.executor import BoundedExecutor, CallStats
+from app.core.metrics import Counter, Gauge, Histogram
 from app.models.user import User
 
-pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+# passlib and jose are imported on first use rather than at startup; new
+# instances are started under load and should serve health checks first.
+
+
+class InvalidTokenError(ValueError):
+    """Raised when an access token fails verification"""
+
+
+@lru_cache(maxsize=None)
+def get_pwd_context() -> "CryptContext":
+    from passlib.context import CryptContext
+    from passlib.hash import argon2
+
+    return CryptContext(
+        schemes=["argon2", "bcrypt"],
+        deprecated="auto",
+        # Flag argon2 hashes with a lower time cost for upgrade too
+        argon2__min_desired_rounds=argon2.default_rounds,
+    )
+
+
+# Hashing is CPU-bound and slow by design, so it runs in a bounded pool
+# rather than on the event loop.
+password_hasher = BoundedExecutor(
+    "password-hasher",
+    kind=settings.PASSWORD_HASH_EXECUTOR,
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_QUEUE_SIZE,
+    duration_histogram=Histogram(
+        "password_hash_duration_seconds",
+        "Password hash and verify duration, including queueing",
+        labelnames=("operation",),
+        buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    ),
+)
+Gauge(
+    "password_hash_executor_in_flight",
+    "Password hashing calls in flight",
+    callback=lambda: {(): password_hasher.in_flight},
+)
+Counter(
+    "password_hash_executor_rejected_total",
+    "Password hashing calls rejected for lack of capacity",
+    callback=lambda: {(): password_hasher.rejected},
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bool(pwd_context.verify(plain_password, hashed_password))
+    return bool(get_pwd_context().verify(plain_password, hashed_password))
 
 
 def get_password_hash(password: str) -> str:
-    return str(pwd_context.hash(password))
+    return str(get_pwd_context().hash(password))
+
+
+async def verify_password_async(
+    plain_password: str, hashed_password: str
+) -> bool:
+    """Verify a password without blocking the event loop"""
+    return await password_hasher.run(
+        "verify", verify_password, plain_password, hashed_password
+    )
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password without blocking the event loop"""
+    return await password_hasher.run("hash", get_password_hash, password)
+
+
+async def get_password_hashes_async(passwords: list[str]) -> list[str]:
+    """Hash many passwords in parallel across the hashing pool"""
+    return await password_hasher.map("hash", get_password_hash, passwords)
 
 
 async def authenticate_user(
     db: AsyncSession, email: str, password: str
 ) -> Optional[User]:
     """Authenticate user with email and password"""
-    result = await db.execute(select(User).where(User.email == email))
-    user = result.scalar_one_or_none()
+    # Imported here because user_service depends on this module's hashing
+    from app.services.password_rehash import password_rehasher
+    from app.services.user_service import get_user_with_password
+
+    user = await get_user_with_password(db, email)
     if not user:
         return None
-    if not verify_password(password, str(user.hashed_password)):
+    hashed_password = str(user.hashed_password)
+    if not await verify_password_async(password, hashed_password):
         return None
+
+    if settings.PASSWORD_REHASH_ENABLED and get_pwd_context().needs_update(
+        hashed_password
+    ):
+        password_rehasher.submit(int(user.id), password, hashed_password)
     return user
 
 
@@ -37,6 +115,8 @@ def create_access_token(
     data: dict, expires_delta: Optional[timedelta] = None
 ) -> str:
     """Create JWT access token"""
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -47,6 +127,71 @@ def create_access_token(
 
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+        to_encode,
+        _signing_key(settings.SECRET_KEY, settings.ALGORITHM),
+        algorithm=settings.ALGORITHM,
     )
     return str(encoded_jwt)
+
+
+# Verified claims keyed by token digest, each kept until the token expires
+token_claims_cache = InMemoryCache(max_size=settings.TOKEN_CACHE_MAX_SIZE)
+token_decode_stats = CallStats()
+Counter(
+    "token_cache_requests_total",
+    "Token claim cache lookups by result",
+    labelnames=("result",),
+    callback=lambda: {
+        ("hit",): token_claims_cache.hits,
+        ("miss",): token_claims_cache.misses,
+    },
+)
+Counter(
+    "token_decode_seconds_total",
+    "Time spent verifying JWTs on token cache misses",
+    callback=lambda: {(): token_decode_stats.total_seconds},
+)
+# Each hit saves about one decode, valued at the mean so far
+token_decode_saved = Counter(
+    "token_decode_saved_seconds_total",
+    "Estimated JWT verification time saved by the token cache",
+)
+
+
+@lru_cache(maxsize=8)
+def _signing_key(secret_key: str, algorithm: str) -> Any:
+    """Build the key object once instead of on every encode/decode"""
+    from jose import jwk
+
+    return jwk.construct(secret_key, algorithm)
+
+
+async def decode_access_token(token: str) -> dict[str, Any]:
+    """Verify a JWT and return its claims.
+
+    Raises InvalidTokenError if the token is malformed, expired or not
+    signed with our key.
+    """
+    digest = hashlib.sha256(token.encode()).hexdigest()
+    claims = await token_claims_cache.get(digest)
+    if claims is not None:
+        token_decode_saved.inc(token_decode_stats.as_dict()["mean_seconds"])
+        return dict(claims)
+
+    from jose import JWTError, jwt
+
+    start = time.perf_counter()
+    try:
+        claims = jwt.decode(
+            token,
+            _signing_key(settings.SECRET_KEY, settings.ALGORITHM),
+            algorithms=[settings.ALGORITHM],
+        )
+    except JWTError as exc:
+        raise InvalidTokenError(str(exc)) from exc
+    token_decode_stats.record(time.perf_counter() - start)
+
+    ttl = claims.get("exp", 0) - time.time()
+    if ttl > 0:
+        await token_claims_cache.set(digest, dict(claims), ttl=ttl)
+    return dict(claims)
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from typing import Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.models.user import User
+
+# Planner statistics: reltuples is -1 until the table is first analyzed
+_POSTGRES_ESTIMATE = text(
+    "SELECT reltuples::bigint FROM pg_class "
+    "WHERE oid = to_regclass(:table_name)"
+)
+
+
+class RowCounter:
+    """Total row count of one table, exact or estimated.
+
+    Exact counts are cached for ``ttl`` seconds and adjusted in place by
+    ``adjust`` as rows are created and deleted, so most requests never
+    run ``count(*)``. Concurrent misses share one count. A count that
+    was running while an adjustment came in is not cached, since it may
+    or may not include that change.
+
+    Estimates come from planner statistics where the database keeps
+    them (Postgres), cached the same way but not adjusted. Elsewhere, or
+    before the table has statistics, they fall back to the exact count.
+
+    The cache is per process: other workers see this worker's changes
+    only once their own cached count expires.
+    """
+
+    def __init__(self, model: type, ttl: float = 10.0) -> None:
+        self.model = model
+        self.ttl = ttl
+        self.counts = {"hit": 0, "miss": 0}
+        self._cached: dict[str, tuple[float, int]] = {}
+        self._generation = 0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _get(self, mode: str) -> Optional[int]:
+        entry = self._cached.get(mode)
+        if entry is None or entry[0] <= time.monotonic():
+            self.counts["miss"] += 1
+            return None
+        self.counts["hit"] += 1
+        return entry[1]
+
+    def _set(self, mode: str, value: int, generation: int) -> None:
+        if generation == self._generation:
+            self._cached[mode] = (time.monotonic() + self.ttl, value)
+
+    def adjust(self, delta: int) -> None:
+        """Apply rows created (positive) or deleted (negative)"""
+        if not delta:
+            return
+        self._generation += 1
+        entry = self._cached.get("exact")
+        if entry is not None:
+            expires_at, value = entry
+            self._cached["exact"] = (expires_at, max(value + delta, 0))
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._cached.clear()
+
+    async def exact(self, db: AsyncSession) -> int:
+        """The table's row count, at most ``ttl`` seconds old"""
+        value = self._get("exact")
+        if value is not None:
+            return value
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Another request may have counted while this one waited
+            entry = self._cached.get("exact")
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+            generation = self._generation
+            value = await db.scalar(
+                select(func.count()).select_from(self.model)
+            )
+            self._set("exact", int(value or 0), generation)
+            return int(value or 0)
+
+    async def estimated(self, db: AsyncSession) -> int:
+        """An approximate row count from planner statistics"""
+        value = self._get("estimated")
+        if value is not None:
+            return value
+        estimate = None
+        if db.get_bind().dialect.name == "postgresql":
+            estimate = await db.scalar(
+                _POSTGRES_ESTIMATE,
+                {"table_name": self.model.__tablename__},  # type: ignore
+            )
+        if estimate is None or estimate < 0:
+            return await self.exact(db)
+        self._set("estimated", int(estimate), self._generation)
+        return int(estimate)
+
+    async def count(self, db: AsyncSession, mode: str = "exact") -> int:
+        if mode == "estimated":
+            return await self.estimated(db)
+        return await self.exact(db)
+
+
+user_counter = RowCounter(User, ttl=settings.USER_COUNT_TTL_SECONDS)
+Counter(
+    "user_count_cache_requests_total",
+    "User total count cache lookups by result",
+    labelnames=("result",),
+    callback=lambda: {
+        ("hit",): user_counter.counts["hit"],
+        ("miss",): user_counter.counts["miss"],
+    },
+)
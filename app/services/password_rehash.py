@@ -0,0 +1,186 @@
+import asyncio
+import logging
+from contextlib import suppress
+from typing import Any, Callable, Optional
+
+from sqlalchemy import bindparam, update
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.executor import ExecutorSaturatedError
+from app.core.metrics import Counter, Gauge
+from app.models.user import User
+from app.services.auth_service import get_password_hash, password_hasher
+from app.services.user_service import invalidate_user
+
+logger = logging.getLogger(__name__)
+
+users_table = User.__table__
+
+# Compare-and-set, so a password changed in the meantime is not
+# overwritten. updated_at is kept: the user's data did not change.
+_upgrade_hash = (
+    update(users_table)
+    .where(
+        users_table.c.id == bindparam("uid"),
+        users_table.c.hashed_password == bindparam("old_hash"),
+    )
+    .values(
+        hashed_password=bindparam("new_hash"),
+        updated_at=users_table.c.updated_at,
+    )
+)
+
+RehashItem = tuple[int, str, str]  # user id, password, current hash
+
+
+class PasswordRehasher:
+    """Upgrade outdated password hashes after login, in the background.
+
+    ``submit`` only puts the user on a bounded queue, so the login that
+    found the outdated hash does not wait for the new one; when the
+    queue is full the upgrade is dropped and retried on a later login.
+    A single worker task collects up to ``batch_size`` users (waiting at
+    most ``flush_seconds``), hashes them through the password hashing
+    pool with at most ``concurrency`` hashes at a time, and writes the
+    whole batch in one executemany UPDATE on its own session.
+
+    Plain-text passwords only live on the queue until they are hashed.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = 1000,
+        batch_size: int = 100,
+        flush_seconds: float = 1.0,
+        concurrency: int = 1,
+        session_factory: Optional[Callable[[], Any]] = None,
+    ) -> None:
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.concurrency = concurrency
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.counts = {"queued": 0, "dropped": 0, "upgraded": 0, "failed": 0}
+        self._pending: set[int] = set()
+        self._queue: Optional[asyncio.Queue[RehashItem]] = None
+        self._task: Optional[asyncio.Task[None]] = None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        """Start the worker task on the running event loop"""
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Finish queued upgrades, waiting at most ``timeout`` seconds"""
+        if self._task is None or self._queue is None:
+            return
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._queue.join(), timeout)
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        self._queue = None
+        self._pending.clear()
+
+    def submit(self, user_id: int, password: str, current_hash: str) -> bool:
+        """Queue an upgrade without waiting; False if it was dropped"""
+        if user_id in self._pending:
+            return True
+        if self._queue is None:
+            self.counts["dropped"] += 1
+            return False
+        try:
+            self._queue.put_nowait((user_id, password, current_hash))
+        except asyncio.QueueFull:
+            self.counts["dropped"] += 1
+            return False
+        self._pending.add(user_id)
+        self.counts["queued"] += 1
+        return True
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        while True:
+            batch = await self._next_batch(self._queue)
+            try:
+                await self._upgrade(batch)
+            except Exception:
+                logger.exception("Password rehash batch failed")
+                self.counts["failed"] += len(batch)
+            finally:
+                for user_id, _, _ in batch:
+                    self._pending.discard(user_id)
+                    self._queue.task_done()
+
+    async def _next_batch(
+        self, queue: "asyncio.Queue[RehashItem]"
+    ) -> list[RehashItem]:
+        batch = [await queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _upgrade(self, batch: list[RehashItem]) -> None:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def rehash(item: RehashItem) -> Optional[dict[str, Any]]:
+            user_id, password, old_hash = item
+            async with semaphore:
+                try:
+                    new_hash = await password_hasher.run(
+                        "rehash", get_password_hash, password
+                    )
+                except ExecutorSaturatedError:
+                    # Logins come first; this user is retried next time
+                    return None
+            return {"uid": user_id, "old_hash": old_hash, "new_hash": new_hash}
+
+        results = await asyncio.gather(*(rehash(item) for item in batch))
+        rows = [row for row in results if row is not None]
+        self.counts["failed"] += len(batch) - len(rows)
+        if not rows:
+            return
+
+        async with self.session_factory() as session:
+            await session.execute(_upgrade_hash, rows)
+            await session.commit()
+        for row in rows:
+            await invalidate_user(row["uid"])
+        self.counts["upgraded"] += len(rows)
+
+
+password_rehasher = PasswordRehasher(
+    max_queue=settings.PASSWORD_REHASH_QUEUE_SIZE,
+    batch_size=settings.PASSWORD_REHASH_BATCH_SIZE,
+    flush_seconds=settings.PASSWORD_REHASH_FLUSH_SECONDS,
+    concurrency=settings.PASSWORD_REHASH_CONCURRENCY,
+)
+
+Gauge(
+    "password_rehash_queue_depth",
+    "Outdated password hashes waiting to be upgraded",
+    callback=lambda: {(): password_rehasher.queue_depth},
+)
+Counter(
+    "password_rehash_users_total",
+    "Password hash upgrades by outcome",
+    labelnames=("result",),
+    callback=lambda: {
+        (result,): count for result, count in password_rehasher.counts.items()
+    },
+)
@@ -0,0 +1,212 @@
+import asyncio
+import contextvars
+from typing import Any, Callable, Hashable, Optional, Sequence
+from weakref import WeakKeyDictionary
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, RoutingSession, read_replicas
+from app.core.metrics import Counter
+from app.models.user import User
+
+# (route, column, value) of one lookup; see _route
+LoadKey = tuple[Any, str, Hashable]
+# Values queued for one (route, column), and the sessions that asked for
+# them with the context each asked in
+Queued = tuple[list[Hashable], dict[AsyncSession, contextvars.Context]]
+REPLICA = "replica"
+
+
+def _route(db: AsyncSession) -> Any:
+    """Where lookups made on ``db`` go: its bind, or any read replica"""
+    fallback = db.info.get("replica_fallback")
+    return db.bind if fallback is None else (REPLICA, fallback)
+
+
+class UserLoader:
+    """Batch user lookups made in the same event loop tick.
+
+    Every ``load`` in a tick is queued, and once the tick's other ready
+    callbacks have run the queue is sent as one ``WHERE id IN (...)``
+    (or ``email IN``) query per database, in chunks of ``max_batch``. A
+    lookup for a key that is already queued or in flight waits for that
+    query instead of starting its own (single-flight).
+
+    A batch asked for by a single session runs on that session, as part
+    of its request, so it takes no connection of its own. A batch shared
+    by several requests runs on a session of its own, routed like the
+    callers': to the same engine, or to a read replica when they read
+    from replicas. It sees committed rows only, and runs outside every
+    request's context, so no request is charged for the others' rows.
+    A caller whose session is in a transaction already holds a
+    connection, and its lookups run on it at once, without batching.
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[..., Any]] = None,
+        max_batch: int = 500,
+    ) -> None:
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.max_batch = max_batch
+        self.counts = {"loaded": 0, "coalesced": 0, "queries": 0}
+        self._futures: dict[LoadKey, asyncio.Future[Optional[User]]] = {}
+        self._queued: dict[tuple[Any, str], Queued] = {}
+        self._scheduled = False
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def load(self, db: AsyncSession, user_id: int) -> Optional[User]:
+        """The user with ``user_id``, or None"""
+        return await self._load(db, "id", user_id)
+
+    async def load_by_email(
+        self, db: AsyncSession, email: str
+    ) -> Optional[User]:
+        """The user with ``email``, or None"""
+        return await self._load(db, "email", email)
+
+    async def load_many(
+        self, db: AsyncSession, user_ids: list[int]
+    ) -> list[Optional[User]]:
+        """Users for ``user_ids`` in order, None where missing"""
+        if db.in_transaction():
+            found = await self._select(db, "id", user_ids)
+            return [found.get(user_id) for user_id in user_ids]
+        return list(
+            await asyncio.gather(*(self.load(db, uid) for uid in user_ids))
+        )
+
+    async def _load(
+        self, db: AsyncSession, column: str, value: Hashable
+    ) -> Optional[User]:
+        if db.in_transaction():
+            return (await self._select(db, column, [value])).get(value)
+        route = _route(db)
+        key = (route, column, value)
+        future = self._futures.get(key)
+        if future is not None:
+            self.counts["coalesced"] += 1
+        else:
+            loop = asyncio.get_running_loop()
+            future = self._futures[key] = loop.create_future()
+            queued = self._queued.setdefault((route, column), ([], {}))
+            values, callers = queued
+            values.append(value)
+            if db not in callers:
+                callers[db] = contextvars.copy_context()
+            if not self._scheduled:
+                self._scheduled = True
+                # In no request's context; _dispatch picks one per batch
+                loop.call_soon(self._dispatch, context=contextvars.Context())
+        # Other callers wait on the same future, so a cancelled caller
+        # must not cancel it
+        return await asyncio.shield(future)
+
+    def _dispatch(self) -> None:
+        queued, self._queued = self._queued, {}
+        self._scheduled = False
+        on_caller: dict[AsyncSession, tuple[contextvars.Context, list]] = {}
+        for (route, column), (values, callers) in queued.items():
+            if len(callers) == 1:
+                [(session, context)] = callers.items()
+                batches = on_caller.setdefault(session, (context, []))[1]
+                batches.append((route, column, values))
+                continue
+            for start in range(0, len(values), self.max_batch):
+                end = start + self.max_batch
+                fetch = self._fetch(route, column, values[start:end])
+                self._start(contextvars.Context(), fetch)
+        for session, (context, batches) in on_caller.items():
+            self._start(context, self._fetch_on(session, batches))
+
+    def _start(self, context: contextvars.Context, fetch: Any) -> None:
+        # The task copies the context it is created in
+        task = context.run(asyncio.create_task, fetch)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fetch_on(self, session: AsyncSession, batches: list) -> None:
+        # In turn, as a session runs one statement at a time
+        for route, column, values in batches:
+            await self._fetch(route, column, values, session)
+
+    async def _fetch(
+        self,
+        route: Any,
+        column: str,
+        values: list[Hashable],
+        session: Optional[AsyncSession] = None,
+    ) -> None:
+        futures = [self._futures.pop((route, column, v)) for v in values]
+        replicas = isinstance(route, tuple) and route[0] == REPLICA
+        try:
+            if session is not None:
+                found = await self._select(session, column, values)
+            else:
+                bind = route[1] if replicas else route
+                async with self.session_factory(bind=bind) as own:
+                    if replicas and isinstance(own, RoutingSession):
+                        own.use_replicas(read_replicas)
+                    found = await self._select(own, column, values)
+        except Exception as exc:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(exc)
+                    # Retrieved here so waiters that were all cancelled
+                    # do not leave an unretrieved exception behind
+                    future.exception()
+            return
+        for value, future in zip(values, futures):
+            if not future.done():
+                future.set_result(found.get(value))
+
+    async def _select(
+        self, session: AsyncSession, column: str, values: Sequence[Hashable]
+    ) -> dict[Hashable, User]:
+        """Users whose ``column`` is in ``values``, in chunks of max_batch"""
+        attribute = getattr(User, column)
+        found: dict[Hashable, User] = {}
+        for start in range(0, len(values), self.max_batch):
+            end = start + self.max_batch
+            chunk = values[start:end]
+            self.counts["queries"] += 1
+            self.counts["loaded"] += len(chunk)
+            result = await session.scalars(
+                select(User).where(attribute.in_(chunk))
+            )
+            found.update((getattr(user, column), user) for user in result)
+        return found
+
+
+_loaders: "WeakKeyDictionary[asyncio.AbstractEventLoop, UserLoader]" = (
+    WeakKeyDictionary()
+)
+
+
+def get_user_loader() -> UserLoader:
+    """The loader for the running event loop"""
+    loop = asyncio.get_running_loop()
+    loader = _loaders.get(loop)
+    if loader is None:
+        loader = _loaders[loop] = UserLoader(
+            max_batch=settings.USER_LOADER_MAX_BATCH
+        )
+    return loader
+
+
+def _loader_counts() -> dict[tuple[str, ...], float]:
+    totals: dict[tuple[str, ...], float] = {}
+    for loader in list(_loaders.values()):
+        for result, value in loader.counts.items():
+            totals[(result,)] = totals.get((result,), 0.0) + value
+    return totals
+
+
+Counter(
+    "user_loader_lookups_total",
+    "Batched user lookups: rows loaded, lookups coalesced, queries run",
+    labelnames=("result",),
+    callback=_loader_counts,
+)
@@ -0,0 +1,207 @@
+import re
+from typing import Any, Optional
+
+from sqlalchemy import (
+    Integer,
+    and_,
+    column,
+    event,
+    func,
+    literal_column,
+    not_,
+    table,
+    text,
+    tuple_,
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.database import Base
+from app.core.pagination import (
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+)
+from app.models.user import User
+
+# Full names are indexed for token search in an FTS5 table that reads its
+# text from ``users`` (external content) and is kept in sync by triggers.
+# On Postgres the same search uses a pg_trgm GIN index instead, created
+# by migration 002.
+SQLITE_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE users_fts USING fts5("
+    "full_name, content='users', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users "
+    "BEGIN "
+    "INSERT INTO users_fts(rowid, full_name) VALUES (new.id, new.full_name); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users "
+    "BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, full_name) "
+    "VALUES ('delete', old.id, old.full_name); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_update "
+    "AFTER UPDATE OF full_name ON users "
+    "BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, full_name) "
+    "VALUES ('delete', old.id, old.full_name); "
+    "INSERT INTO users_fts(rowid, full_name) VALUES (new.id, new.full_name); "
+    "END",
+    # Index rows that existed before the table was created
+    "INSERT INTO users_fts(users_fts) VALUES ('rebuild')",
+)
+
+users_fts = table("users_fts", column("rowid", Integer))
+
+# The highest code point sorts after every character that can follow a
+# prefix, which bounds an index range scan over the prefix
+_PREFIX_END = "\U0010ffff"
+_TOKEN = re.compile(r"\w+")
+
+
+def _create_search_index(
+    target: Any, connection: Connection, **kw: Any
+) -> None:
+    if connection.dialect.name != "sqlite":
+        return
+    exists = connection.scalar(
+        text("SELECT 1 FROM sqlite_master WHERE name = 'users_fts'")
+    )
+    if not exists:
+        for statement in SQLITE_SEARCH_DDL:
+            connection.execute(text(statement))
+
+
+def _drop_search_index(target: Any, connection: Connection, **kw: Any) -> None:
+    if connection.dialect.name == "sqlite":
+        connection.execute(text("DROP TABLE IF EXISTS users_fts"))
+
+
+# Metadata-level events fire on every create_all, so databases created
+# before search existed get the index on their next start
+event.listen(Base.metadata, "after_create", _create_search_index)
+event.listen(Base.metadata, "after_drop", _drop_search_index)
+
+
+_EMAIL_LOWER: Any = func.lower(User.email)
+
+
+def _email_prefix(dialect: str, prefix: str) -> Any:
+    """Emails starting with ``prefix``, ignoring case.
+
+    Both sides are lowercased by the database, so they fold case the
+    same way, and the match is a scan of ix_users_email_lower.
+    """
+    if dialect == "postgresql":
+        # LIKE 'prefix%' can use the text_pattern_ops index
+        return _EMAIL_LOWER.startswith(prefix.lower(), autoescape=True)
+    # SQLite compares text bytewise, so a range scan on the index finds
+    # exactly the rows starting with the prefix
+    low = func.lower(prefix)
+    return and_(_EMAIL_LOWER >= low, _EMAIL_LOWER < low + _PREFIX_END)
+
+
+def _name_match(dialect: str, tokens: list[str]) -> Any:
+    """Subquery of (id, rank) for names containing every token.
+
+    Lower ranks are better matches.
+    """
+    if dialect == "sqlite":
+        match = " ".join(f'"{token}"*' for token in tokens)
+        fts: Any = literal_column("users_fts")
+        query = select(
+            users_fts.c.rowid.label("id"),
+            func.bm25(fts).label("rank"),
+        ).where(fts.op("MATCH")(match))
+        return query.subquery()
+
+    similarity = func.word_similarity(" ".join(tokens), User.full_name)
+    query = select(User.id.label("id"), (-similarity).label("rank")).where(
+        *(User.full_name.icontains(token, autoescape=True) for token in tokens)
+    )
+    return query.subquery()
+
+
+def _search_cursor(query: str, user: User, rank: Optional[float]) -> str:
+    if rank is None:
+        return encode_cursor({"q": query, "p": "email", "e": user.email})
+    return encode_cursor({"q": query, "p": "name", "r": rank, "id": user.id})
+
+
+def _decode_search_cursor(cursor: str, query: str) -> dict[str, Any]:
+    values = decode_cursor(cursor)
+    valid = values.get("q") == query and (
+        (values.get("p") == "email" and isinstance(values.get("e"), str))
+        or (
+            values.get("p") == "name"
+            and isinstance(values.get("r"), (int, float))
+            and isinstance(values.get("id"), int)
+        )
+    )
+    if not valid:
+        raise InvalidCursorError("Invalid cursor")
+    return values
+
+
+async def search_users(
+    db: AsyncSession, query: str, limit: int = 20, cursor: Optional[str] = None
+) -> tuple[list[User], Optional[str]]:
+    """Find users by email prefix or by the words of their full name.
+
+    Email prefix matches come first, in email order (so an exact match
+    leads), then name matches by relevance. Both phases are keyset
+    paginated: the cursor records the phase and the last row's key.
+
+    Emails are stored as typed, so they are matched ignoring case, as
+    names are. The query's whitespace is collapsed, and queries with a
+    space cannot be an email prefix, so they skip the email phase.
+    """
+    query = " ".join(query.split())
+    after = _decode_search_cursor(cursor, query) if cursor else None
+    dialect = db.get_bind().dialect.name
+    by_email = " " not in query
+    prefix = _email_prefix(dialect, query)
+
+    users: list[User] = []
+    ranks: list[Optional[float]] = []
+    if by_email and (after is None or after["p"] == "email"):
+        email_query = select(User).where(prefix)
+        if after is not None:
+            email_query = email_query.where(
+                tuple_(_EMAIL_LOWER, User.email)
+                > tuple_(func.lower(after["e"]), after["e"])
+            )
+        email_query = email_query.order_by(_EMAIL_LOWER, User.email)
+        email_query = email_query.limit(limit)
+        users = list((await db.scalars(email_query)).all())
+        ranks = [None] * len(users)
+        after = None
+
+    # Queries that look like an email only match by prefix
+    tokens = [] if "@" in query else _TOKEN.findall(query)
+    remaining = limit - len(users)
+    if tokens and remaining:
+        matches = _name_match(dialect, tokens)
+        name_query = select(User, matches.c.rank).join(
+            matches, matches.c.id == User.id
+        )
+        if by_email:
+            name_query = name_query.where(not_(prefix))
+        if after is not None:
+            name_query = name_query.where(
+                tuple_(matches.c.rank, matches.c.id)
+                > tuple_(after["r"], after["id"])
+            )
+        result_rows = await db.execute(
+            name_query.order_by(matches.c.rank, matches.c.id).limit(remaining)
+        )
+        for user, rank in result_rows:
+            users.append(user)
+            ranks.append(float(rank))
+
+    next_cursor = None
+    if users and len(users) == limit:
+        next_cursor = _search_cursor(query, users[-1], ranks[-1])
+    return users, next_cursor
@@ -1,70 +1,459 @@
-from typing import Optional
+from datetime import datetime
+from importlib import import_module
+from typing import Any, Optional
 
+from sqlalchemy import delete, func, insert, tuple_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.orm import make_transient_to_detached
 
+from app.core.cache import build_cache
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.core.pagination import (
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+)
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
-from app.services.auth_service import get_password_hash
+from app.services.auth_service import (
+    get_password_hash_async,
+    get_password_hashes_async,
+)
+from app.services.count_service import user_counter
+from app.services.user_loader import get_user_loader
+
+# Users are cached as plain column snapshots under "user:id:<id>", and
+# emails map to ids under "user:email:<email>". Writes only need to drop
+# the id key: a stale email entry is detected because the snapshot it
+# points to has gone or carries a different email.
+user_cache = build_cache(
+    settings.USER_CACHE_BACKEND,
+    url=settings.USER_CACHE_URL,
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+    prefix="users:",
+)
+Counter(
+    "user_cache_requests_total",
+    "User cache lookups by result",
+    labelnames=("result",),
+    callback=lambda: {
+        ("hit",): user_cache.hits,
+        ("miss",): user_cache.misses,
+    },
+)
+
+# Password hashes are left out, as the cache may be shared (redis); users
+# rebuilt from a snapshot raise on access to hashed_password
+SNAPSHOT_COLUMNS = ("id", "email", "full_name", "version")
+
+
+def _user_key(user_id: int) -> str:
+    return f"user:id:{user_id}"
+
+
+def _email_key(email: str) -> str:
+    return f"user:email:{email}"
+
+
+def _user_snapshot(user: User) -> dict[str, Any]:
+    snapshot = {name: getattr(user, name) for name in SNAPSHOT_COLUMNS}
+    for name in ("created_at", "updated_at"):
+        value = getattr(user, name)
+        snapshot[name] = value.isoformat() if value else None
+    return snapshot
+
+
+def _user_from_snapshot(snapshot: dict[str, Any]) -> User:
+    data = dict(snapshot)
+    for name in ("created_at", "updated_at"):
+        if data[name]:
+            data[name] = datetime.fromisoformat(data[name])
+    user = User(**data)
+    make_transient_to_detached(user)
+    return user
+
+
+async def _cache_user(user: User) -> None:
+    user_id = int(user.id)
+    await user_cache.set(_user_key(user_id), _user_snapshot(user))
+    await user_cache.set(_email_key(str(user.email)), user_id)
+
+
+async def invalidate_user(user_id: int) -> None:
+    """Drop a user from the cache after it was changed"""
+    await user_cache.delete(_user_key(user_id))
+
+
+class UserAlreadyExistsError(Exception):
+    """Raised when a write would duplicate an existing user's email"""
+
+    def __init__(self, email: str) -> None:
+        super().__init__(f"User with email {email} already exists")
+        self.email = email
+
+
+def _is_duplicate_email(exc: IntegrityError) -> bool:
+    """Whether ``exc`` is a unique violation on the email column"""
+    orig = exc.orig
+    message = str(orig)
+    code = getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+    if code is not None:
+        # Postgres names the index: ix_users_email
+        return bool(code == "23505" and "email" in message)
+    # SQLite: "UNIQUE constraint failed: users.email"
+    return "UNIQUE" in message and "users.email" in message
 
 
 async def create_user(db: AsyncSession, user: UserCreate) -> User:
     """Create a new user"""
-    hashed_password = get_password_hash(user.password)
-    db_user = User(
-        email=user.email,
-        hashed_password=hashed_password,
-        full_name=user.full_name,
+    hashed_password = await get_password_hash_async(user.password)
+    values = {
+        "email": user.email,
+        "hashed_password": hashed_password,
+        "full_name": user.full_name,
+    }
+    try:
+        if db.get_bind().dialect.insert_returning:
+            stmt = insert(User).values(**values).returning(User)
+            db_user = (await db.scalars(stmt)).one()
+            await db.commit()
+        else:
+            db_user = User(**values)
+            db.add(db_user)
+            await db.commit()
+            await db.refresh(db_user)
+    except IntegrityError as exc:
+        await db.rollback()
+        if _is_duplicate_email(exc):
+            raise UserAlreadyExistsError(user.email) from exc
+        raise
+    user_counter.adjust(1)
+    return db_user
+
+
+async def _insert_users_chunk(
+    db: AsyncSession, rows: list[dict[str, str]]
+) -> list[User]:
+    """Insert rows in one statement, skipping emails that already exist"""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        # Only the dialect in use is imported
+        dialect_module = import_module(f"sqlalchemy.dialects.{dialect}")
+        stmt = (
+            dialect_module.insert(User)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=[User.email])
+            .returning(User)
+        )
+        return list((await db.scalars(stmt)).all())
+
+    # Dialects without ON CONFLICT: filter out existing emails first
+    emails = [row["email"] for row in rows]
+    existing: set[str] = set(
+        await db.scalars(select(User.email).where(User.email.in_(emails)))
+    )
+    rows = [row for row in rows if row["email"] not in existing]
+    if not rows:
+        return []
+    return list((await db.scalars(insert(User).returning(User), rows)).all())
+
+
+async def create_users_bulk(
+    db: AsyncSession, users: list[UserCreate]
+) -> list[Optional[User]]:
+    """Create many users at once.
+
+    Returns one entry per input: the created user, or None when its email
+    already exists (in the database or earlier in the same batch).
+    Duplicates and registered emails are filtered out before hashing, so
+    only rows that will be inserted pay for a password hash.
+    """
+    chunk_size = settings.USER_BULK_CHUNK_SIZE
+    first: dict[str, UserCreate] = {}
+    for user in users:
+        first.setdefault(user.email, user)
+    emails = list(first)
+    for start in range(0, len(emails), chunk_size):
+        end = start + chunk_size
+        existing: Any = await db.scalars(
+            select(User.email).where(User.email.in_(emails[start:end]))
+        )
+        for email in existing:
+            del first[email]
+
+    new_users = list(first.values())
+    hashed_passwords = await get_password_hashes_async(
+        [user.password for user in new_users]
     )
-    db.add(db_user)
+    # Emails registered meanwhile are still skipped by the insert
+    rows: list[dict[str, str]] = [
+        {
+            "email": user.email,
+            "hashed_password": hashed_password,
+            "full_name": user.full_name,
+        }
+        for user, hashed_password in zip(new_users, hashed_passwords)
+    ]
+
+    created: dict[str, User] = {}
+    for start in range(0, len(rows), chunk_size):
+        end = start + chunk_size
+        for db_user in await _insert_users_chunk(db, rows[start:end]):
+            created[str(db_user.email)] = db_user
     await db.commit()
-    await db.refresh(db_user)
-    return db_user
+    user_counter.adjust(len(created))
 
+    # Only the first occurrence of an email can have been inserted
+    results: list[Optional[User]] = []
+    for user in users:
+        results.append(created.pop(user.email, None))
+    return results
 
-async def get_user(db: AsyncSession, user_id: int) -> Optional[User]:
-    """Get user by ID"""
+
+async def _select_user(db: AsyncSession, user_id: int) -> Optional[User]:
     result = await db.execute(select(User).where(User.id == user_id))
     return result.scalar_one_or_none()
 
 
+async def get_user(db: AsyncSession, user_id: int) -> Optional[User]:
+    """Get user by ID"""
+    snapshot = await user_cache.get(_user_key(user_id))
+    if snapshot is not None:
+        return _user_from_snapshot(snapshot)
+
+    db_user = await get_user_loader().load(db, user_id)
+    if db_user is not None:
+        await _cache_user(db_user)
+    return db_user
+
+
+async def get_users_by_ids(db: AsyncSession, ids: list[int]) -> list[User]:
+    """Get the users with ``ids``, in order, skipping missing ones"""
+    user_ids = list(dict.fromkeys(ids))
+    users: dict[int, User] = {}
+    snapshots = await user_cache.get_many(
+        [_user_key(user_id) for user_id in user_ids]
+    )
+    for user_id, snapshot in zip(user_ids, snapshots):
+        if snapshot is not None:
+            users[user_id] = _user_from_snapshot(snapshot)
+
+    missing = [user_id for user_id in user_ids if user_id not in users]
+    loaded = await get_user_loader().load_many(db, missing)
+    for user_id, db_user in zip(missing, loaded):
+        if db_user is not None:
+            users[user_id] = db_user
+            await _cache_user(db_user)
+    return [users[user_id] for user_id in user_ids if user_id in users]
+
+
 async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
     """Get user by email"""
-    result = await db.execute(select(User).where(User.email == email))
-    return result.scalar_one_or_none()
+    user_id = await user_cache.get(_email_key(email))
+    if user_id is not None:
+        snapshot = await user_cache.get(_user_key(user_id))
+        if snapshot is not None and snapshot["email"] == email:
+            return _user_from_snapshot(snapshot)
+
+    return await get_user_with_password(db, email)
+
+
+async def get_user_with_password(
+    db: AsyncSession, email: str
+) -> Optional[User]:
+    """Get user by email from the database, with the password hash"""
+    db_user = await get_user_loader().load_by_email(db, email)
+    if db_user is not None:
+        await _cache_user(db_user)
+    return db_user
 
 
 async def get_users(
     db: AsyncSession, skip: int = 0, limit: int = 100
 ) -> list[User]:
     """Get multiple users"""
-    result = await db.execute(select(User).offset(skip).limit(limit))
+    result = await db.execute(
+        select(User).order_by(User.id).offset(skip).limit(limit)
+    )
     return list(result.scalars().all())
 
 
+def _user_cursor(user: User, order_by: str) -> str:
+    values: dict[str, Any] = {"o": order_by, "id": user.id}
+    if order_by == "created_at":
+        values["c"] = user.created_at.isoformat() if user.created_at else None
+    return encode_cursor(values)
+
+
+def _after_cursor(cursor: str, order_by: str) -> Any:
+    values = decode_cursor(cursor)
+    last_id = values.get("id")
+    if values.get("o") != order_by or not isinstance(last_id, int):
+        raise InvalidCursorError("Invalid cursor")
+    if order_by == "id":
+        return User.id > last_id
+
+    try:
+        created_at = datetime.fromisoformat(values["c"])
+    except (KeyError, TypeError, ValueError) as exc:
+        raise InvalidCursorError("Invalid cursor") from exc
+    # Compare against the anchor row's stored value so the boundary uses
+    # the column's native representation (SQLite stores text). The cursor
+    # value only matters if the anchor row has since been deleted.
+    anchor_created_at = (
+        select(User.created_at).where(User.id == last_id).scalar_subquery()
+    )
+    return tuple_(User.created_at, User.id) > tuple_(
+        func.coalesce(anchor_created_at, created_at), last_id
+    )
+
+
+def _page_query(
+    query: Any,
+    limit: int,
+    cursor: Optional[str],
+    order_by: str,
+    skip: int,
+) -> Any:
+    if order_by == "created_at":
+        query = query.order_by(User.created_at, User.id)
+    else:
+        query = query.order_by(User.id)
+
+    if cursor is not None:
+        query = query.where(_after_cursor(cursor, order_by))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+async def get_users_page(
+    db: AsyncSession,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    order_by: str = "id",
+    skip: int = 0,
+) -> tuple[list[User], Optional[str]]:
+    """Get a page of users and the cursor for the next page.
+
+    With a cursor the page is fetched by keyset (``WHERE key > last``),
+    so every page costs the same as the first. ``skip`` is only honoured
+    without a cursor, for clients still paging by offset.
+    """
+    query = _page_query(select(User), limit, cursor, order_by, skip)
+    result = await db.execute(query)
+    users = list(result.scalars().all())
+    next_cursor = None
+    if users and len(users) == limit:
+        next_cursor = _user_cursor(users[-1], order_by)
+    return users, next_cursor
+
+
+# (id, version, created_at, updated_at): the version tells whether a
+# user changed, the timestamps when
+UserVersion = tuple[int, int, Optional[datetime], Optional[datetime]]
+
+
+def user_version(user: User) -> UserVersion:
+    """The columns a user's ETag and Last-Modified are derived from"""
+    return (
+        user.id,  # type: ignore
+        user.version,  # type: ignore
+        user.created_at,  # type: ignore
+        user.updated_at,  # type: ignore
+    )
+
+
+_version_columns = (User.id, User.version, User.created_at, User.updated_at)
+
+
+async def get_user_version(
+    db: AsyncSession, user_id: int, for_update: bool = False
+) -> Optional[UserVersion]:
+    """Get a user's version without loading the rest of the row.
+
+    ``for_update`` locks the row until the transaction ends, so a
+    precondition checked against it still holds for the write that
+    follows (where the database supports row locks).
+    """
+    query: Any = select(*_version_columns).where(User.id == user_id)
+    if for_update:
+        query = query.with_for_update()
+    row = (await db.execute(query)).one_or_none()
+    return None if row is None else tuple(row)
+
+
+async def get_users_page_versions(
+    db: AsyncSession,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    order_by: str = "id",
+    skip: int = 0,
+) -> list[UserVersion]:
+    """Versions of the users ``get_users_page`` would return"""
+    result = await db.execute(
+        _page_query(select(*_version_columns), limit, cursor, order_by, skip)
+    )
+    return [tuple(row) for row in result]
+
+
 async def update_user(
     db: AsyncSession, user_id: int, user_update: UserUpdate
 ) -> Optional[User]:
     """Update user"""
-    db_user = await get_user(db, user_id)
-    if not db_user:
-        return None
+    update_data = user_update.model_dump(exclude_unset=True)
+    if not update_data:
+        return await get_user(db, user_id)
 
-    update_data = user_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_user, field, value)
+    try:
+        if db.get_bind().dialect.update_returning:
+            stmt = (
+                update(User)
+                .where(User.id == user_id)
+                # The mapper bumps the version on flushes only
+                .values(**update_data, version=User.version + 1)
+                .returning(User)
+                .execution_options(populate_existing=True)
+            )
+            db_user = (await db.scalars(stmt)).one_or_none()
+            await db.commit()
+        else:
+            db_user = await _select_user(db, user_id)
+            if db_user is None:
+                return None
+            for field, value in update_data.items():
+                setattr(db_user, field, value)
+            await db.commit()
+            await db.refresh(db_user)
+    except IntegrityError as exc:
+        await db.rollback()
+        if _is_duplicate_email(exc):
+            raise UserAlreadyExistsError(str(update_data["email"])) from exc
+        raise
 
-    await db.commit()
-    await db.refresh(db_user)
+    await invalidate_user(user_id)
     return db_user
 
 
 async def delete_user(db: AsyncSession, user_id: int) -> bool:
     """Delete user"""
-    db_user = await get_user(db, user_id)
-    if not db_user:
-        return False
-
-    await db.delete(db_user)
+    if db.get_bind().dialect.delete_returning:
+        deleted_id = await db.scalar(
+            delete(User).where(User.id == user_id).returning(User.id)
+        )
+        deleted = deleted_id is not None
+    else:
+        db_user = await _select_user(db, user_id)
+        if db_user is not None:
+            await db.delete(db_user)
+        deleted = db_user is not None
     await db.commit()
-    return True
+
+    if deleted:
+        user_counter.adjust(-1)
+        await invalidate_user(user_id)
+    return deleted
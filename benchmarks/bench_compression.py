@@ -0,0 +1,56 @@
+"""Compression ratio and CPU cost per coding and level.
+
+Compresses a page of users and the OpenAPI schema with each installed
+coding at a few levels, to pick the COMPRESSION_*_LEVEL settings.
+
+    python -m benchmarks.bench_compression --rows 100
+"""
+
+import argparse
+import json
+import timeit
+
+from app.main import app
+from app.middleware.compression import available_encoders
+from benchmarks.bench_serialization import fast_path, make_users
+
+LEVELS = {"gzip": (1, 5, 9), "br": (1, 4, 8), "zstd": (1, 3, 9)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    payloads = {
+        "users": fast_path(make_users(args.rows)),
+        "openapi": json.dumps(app.openapi()).encode(),
+    }
+    for payload_name, body in payloads.items():
+        print(f"{payload_name}: {len(body)} bytes")
+        for coding, levels in LEVELS.items():
+            for level in levels:
+                encoders = available_encoders({coding: level})
+                if not encoders:
+                    print(f"  {coding:<5} not installed")
+                    break
+                new_encoder = encoders[coding]
+
+                def compress() -> bytes:
+                    encoder = new_encoder()
+                    return encoder.compress(body) + encoder.finish()
+
+                size = len(compress())
+                seconds = min(
+                    timeit.repeat(compress, number=args.number, repeat=3)
+                )
+                print(
+                    f"  {coding:<5} level {level:<2} "
+                    f"{len(body) / size:6.1f}x "
+                    f"{seconds / args.number * 1e6:10.1f} us"
+                )
+
+
+if __name__ == "__main__":
+    main()
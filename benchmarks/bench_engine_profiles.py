@@ -0,0 +1,99 @@
+"""Throughput of the database engine profiles.
+
+Runs a mixed read/write workload against a temporary SQLite file with
+each ENVIRONMENT profile from app.core.database, plus a bare engine
+without the SQLite pragmas for comparison.
+
+    python -m benchmarks.bench_engine_profiles --seconds 5 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.core.database import Base, create_engine
+from app.models.user import User
+
+PROFILES = ("development", "production", "test")
+
+
+async def seed(db_engine: AsyncEngine, rows: int) -> None:
+    async with db_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(User),
+            [
+                {
+                    "email": f"user{i}@example.com",
+                    "hashed_password": "x",
+                    "full_name": f"User {i}",
+                }
+                for i in range(rows)
+            ],
+        )
+
+
+async def worker(
+    db_engine: AsyncEngine, rows: int, deadline: float, write_ratio: float
+) -> int:
+    operations = 0
+    while time.perf_counter() < deadline:
+        user_id = random.randint(1, rows)
+        if random.random() < write_ratio:
+            async with db_engine.begin() as conn:
+                await conn.execute(
+                    update(User)
+                    .where(User.id == user_id)
+                    .values(full_name=f"User {operations}")
+                )
+        else:
+            async with db_engine.connect() as conn:
+                await conn.execute(select(User).where(User.id == user_id))
+        operations += 1
+    return operations
+
+
+async def run_profile(
+    name: str, directory: Path, args: argparse.Namespace
+) -> float:
+    url = f"sqlite+aiosqlite:///{directory}/{name}.db"
+    if name == "no-pragmas":
+        db_engine = create_async_engine(url)
+    else:
+        db_engine = create_engine(url, environment=name)
+    try:
+        await seed(db_engine, args.rows)
+        deadline = time.perf_counter() + args.seconds
+        counts = await asyncio.gather(
+            *(
+                worker(db_engine, args.rows, deadline, args.write_ratio)
+                for _ in range(args.concurrency)
+            )
+        )
+    finally:
+        await db_engine.dispose()
+    return sum(counts) / args.seconds
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ("no-pragmas", *PROFILES):
+            ops = await run_profile(name, Path(directory), args)
+            print(f"{name:<12} {ops:>10.1f} ops/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
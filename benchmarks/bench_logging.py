@@ -0,0 +1,112 @@
+"""Cost of logging on the request path.
+
+Times one ``logger.info`` call through a blocking ``FileHandler`` and
+through the background handler (both writing JSON to a temporary file),
+then the time the access log adds to a request around a no-op ASGI app.
+
+    python -m benchmarks.bench_logging --records 100000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.logging import BackgroundHandler, JsonFormatter, RotatingWriter
+from app.middleware.access_log import AccessLogMiddleware
+
+
+class FakeRoute:
+    path = "/api/v1/users/{user_id}"
+
+
+async def noop_app(scope: Scope, receive: Receive, send: Send) -> None:
+    scope["route"] = FakeRoute()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def receive() -> dict:
+    return {"type": "http.request"}
+
+
+async def send(message: dict) -> None:
+    pass
+
+
+def time_records(handler: logging.Handler, records: int) -> float:
+    logger = logging.getLogger("benchmarks.logging")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    start = time.perf_counter()
+    for i in range(records):
+        logger.info("GET /api/v1/users/%d 200", i, extra={"status": 200})
+    elapsed = time.perf_counter() - start
+    handler.close()
+    return elapsed / records
+
+
+async def time_requests(app: ASGIApp, requests: int) -> float:
+    start = time.perf_counter()
+    for i in range(requests):
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": f"/api/v1/users/{i % 100}",
+            "headers": [],
+        }
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / requests
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        blocking = logging.FileHandler(os.path.join(directory, "sync.log"))
+        blocking.setFormatter(JsonFormatter())
+        background = BackgroundHandler(
+            RotatingWriter(os.path.join(directory, "queued.log")),
+            max_queue=args.records,
+        )
+        background.setFormatter(JsonFormatter())
+        background.start()
+
+        sync_cost = time_records(blocking, args.records)
+        queued_cost = time_records(background, args.records)
+        print(f"file handler   {sync_cost * 1e6:8.2f} us/record")
+        print(f"background     {queued_cost * 1e6:8.2f} us/record")
+        print(f"dropped        {background.counts['dropped']:8d}")
+
+        # Access records go to a background handler, as in the app
+        access = BackgroundHandler(
+            RotatingWriter(os.path.join(directory, "access.log")),
+            max_queue=args.requests,
+        )
+        access.setFormatter(JsonFormatter())
+        access.start()
+        access_logger = logging.getLogger("app.access")
+        access_logger.handlers = [access]
+        access_logger.propagate = False
+        access_logger.setLevel(logging.INFO)
+
+        bare = asyncio.run(time_requests(noop_app, args.requests))
+        logged = asyncio.run(
+            time_requests(AccessLogMiddleware(noop_app), args.requests)
+        )
+        access.close()
+        print(f"bare           {bare * 1e6:8.2f} us/request")
+        print(f"access log     {logged * 1e6:8.2f} us/request")
+        print(f"overhead       {(logged - bare) * 1e6:8.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
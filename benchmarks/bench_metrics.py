@@ -0,0 +1,64 @@
+"""Cost of request instrumentation.
+
+Measures MetricsMiddleware around a no-op ASGI app, against the bare
+app, and reports the added time per request.
+
+    python -m benchmarks.bench_metrics --requests 200000
+"""
+
+import argparse
+import asyncio
+import time
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.middleware.metrics import MetricsMiddleware
+
+
+class FakeRoute:
+    path = "/api/v1/users/{user_id}"
+
+
+async def noop_app(scope: Scope, receive: Receive, send: Send) -> None:
+    scope["route"] = FakeRoute()
+    await send({"type": "http.response.start", "status": 200})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def receive() -> dict:
+    return {"type": "http.request"}
+
+
+async def send(message: dict) -> None:
+    pass
+
+
+async def time_requests(app: ASGIApp, requests: int) -> float:
+    start = time.perf_counter()
+    for i in range(requests):
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": f"/api/v1/users/{i % 100}",
+            "path_params": {"user_id": i % 100},
+        }
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / requests
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100000)
+    args = parser.parse_args()
+
+    bare = await time_requests(noop_app, args.requests)
+    instrumented = await time_requests(
+        MetricsMiddleware(noop_app), args.requests
+    )
+    print(f"bare          {bare * 1e6:8.2f} us/request")
+    print(f"instrumented  {instrumented * 1e6:8.2f} us/request")
+    print(f"overhead      {(instrumented - bare) * 1e6:8.2f} us/request")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
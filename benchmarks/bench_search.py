@@ -0,0 +1,104 @@
+"""Latency of user search on a large table.
+
+Seeds a temporary SQLite file (or DATABASE_URL) with generated users and
+times ``search_users`` for email prefixes, single name words and
+two-word names, reporting p50/p95 per query shape.
+
+    python -m benchmarks.bench_search --rows 1000000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import insert
+
+from benchmarks.common import Summary, measure, print_results
+
+FIRST_NAMES = (
+    "ann bob carol dave erin frank grace heidi ivan judy mallory niaj "
+    "olivia peggy rupert sybil trent ursula victor walter"
+).split()
+CHUNK = 10000
+
+
+def generated_name(index: int) -> str:
+    rng = random.Random(index)
+    return " ".join(
+        [
+            rng.choice(FIRST_NAMES).title(),
+            f"Family{rng.randrange(50000)}",
+        ]
+    )
+
+
+async def seed(rows: int) -> None:
+    from app.core.database import AsyncSessionLocal, init_db
+    from app.models.user import User
+
+    await init_db()
+    async with AsyncSessionLocal() as session:
+        for start in range(0, rows, CHUNK):
+            await session.execute(
+                insert(User),
+                [
+                    {
+                        "email": f"user{index:08d}@example.com",
+                        "hashed_password": "x",
+                        "full_name": generated_name(index),
+                    }
+                    for index in range(start, min(start + CHUNK, rows))
+                ],
+            )
+        await session.commit()
+
+
+async def run(args: argparse.Namespace) -> dict[str, Summary]:
+    # Imported late so the settings pick up the environment set in main()
+    from app.core.database import AsyncSessionLocal, engine
+    from app.services.user_search import search_users
+
+    start = time.perf_counter()
+    await seed(args.rows)
+    print(f"seeded {args.rows} users in {time.perf_counter() - start:.1f} s")
+
+    rng = random.Random(0)
+    queries = {
+        "email_prefix": lambda: f"user{rng.randrange(args.rows):08d}"[:9],
+        "name_word": lambda: f"family{rng.randrange(50000)}",
+        "name_words": lambda: (
+            f"{rng.choice(FIRST_NAMES)} family{rng.randrange(50000)}"
+        ),
+    }
+    results = {}
+    async with AsyncSessionLocal() as session:
+        for name, make_query in queries.items():
+
+            async def search() -> None:
+                await search_users(session, make_query(), limit=args.limit)
+
+            results[f"search.{name}"] = await measure(search, args.iterations)
+    await engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ.setdefault(
+            "DATABASE_URL", f"sqlite+aiosqlite:///{directory}/search.db"
+        )
+        os.environ.setdefault("SQL_SLOW_QUERY_MS", "1000")
+        print_results(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Encoding cost of a page of users.
+
+Compares the path FastAPI takes for ``response_model=list[UserResponse]``
+(validate, dump to dicts, ``jsonable_encoder``, stdlib ``json``) with
+``orm_list_json_response``, which copies rows into models without
+re-validating them and writes JSON in pydantic-core.
+
+    python -m benchmarks.bench_serialization --rows 100
+"""
+
+import argparse
+import json
+import timeit
+from datetime import datetime, timezone
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.core.responses import orm_list_json_response
+from app.models.user import User
+from app.schemas.user import UserResponse
+
+adapter = TypeAdapter(list[UserResponse])
+
+
+def make_users(rows: int) -> list[User]:
+    now = datetime.now(timezone.utc)
+    return [
+        User(
+            id=i,
+            email=f"user{i}@example.com",
+            hashed_password="x",
+            full_name=f"User {i}",
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(rows)
+    ]
+
+
+def default_path(users: list[User]) -> bytes:
+    value = adapter.validate_python(users, from_attributes=True)
+    content = jsonable_encoder(adapter.dump_python(value, mode="json"))
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def fast_path(users: list[User]) -> bytes:
+    return bytes(orm_list_json_response(UserResponse, users).body)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--number", type=int, default=500)
+    args = parser.parse_args()
+
+    users = make_users(args.rows)
+    assert default_path(users) == fast_path(users)
+    for name, fn in (("default", default_path), ("fast", fast_path)):
+        seconds = min(
+            timeit.repeat(lambda: fn(users), number=args.number, repeat=5)
+        )
+        print(f"{name:<8} {seconds / args.number * 1e6:10.1f} us/page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Timing, summary statistics and baseline comparison for benchmarks"""
+
+import json
+import math
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+Summary = dict[str, float]
+
+
+def percentile(sorted_samples: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted samples"""
+    if not sorted_samples:
+        return 0.0
+    rank = math.ceil(fraction * len(sorted_samples))
+    return sorted_samples[max(rank - 1, 0)]
+
+
+def summarize(samples: list[float], elapsed: float) -> Summary:
+    """Latency percentiles (ms) and throughput for one benchmark"""
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "mean_ms": sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+        "rps": len(ordered) / elapsed if elapsed else 0.0,
+    }
+
+
+async def measure(
+    fn: Callable[[], Awaitable[Any]], iterations: int, warmup: int = 3
+) -> Summary:
+    """Time ``iterations`` sequential calls of ``fn``"""
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call_start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - call_start)
+    return summarize(samples, time.perf_counter() - start)
+
+
+def compare(
+    results: dict[str, Summary],
+    baseline: dict[str, Summary],
+    tolerance: float,
+) -> list[str]:
+    """Describe every benchmark that regressed beyond ``tolerance``.
+
+    A benchmark regresses when its p95 latency grows, or its throughput
+    drops, by more than the given fraction of the baseline.
+    """
+    regressions = []
+    for name, expected in baseline.items():
+        actual = results.get(name)
+        if actual is None:
+            continue
+        p95_limit = expected["p95_ms"] * (1 + tolerance)
+        if actual["p95_ms"] > p95_limit:
+            regressions.append(
+                f"{name}: p95 {actual['p95_ms']:.2f} ms "
+                f"> {p95_limit:.2f} ms"
+            )
+        rps_floor = expected["rps"] * (1 - tolerance)
+        if actual["rps"] < rps_floor:
+            regressions.append(
+                f"{name}: {actual['rps']:.1f} rps < {rps_floor:.1f} rps"
+            )
+    return regressions
+
+
+def load_results(path: Path) -> dict[str, Summary]:
+    return dict(json.loads(path.read_text()))
+
+
+def write_results(path: Path, results: dict[str, Summary]) -> None:
+    path.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+
+
+def print_results(results: dict[str, Summary]) -> None:
+    print(
+        f"{'benchmark':<36} {'p50 ms':>9} {'p95 ms':>9} "
+        f"{'p99 ms':>9} {'rps':>10}"
+    )
+    for name, summary in sorted(results.items()):
+        print(
+            f"{name:<36} {summary['p50_ms']:>9.2f} {summary['p95_ms']:>9.2f} "
+            f"{summary['p99_ms']:>9.2f} {summary['rps']:>10.1f}"
+        )
@@ -0,0 +1,135 @@
+"""Macro load scenarios against the API.
+
+Requests go to ``app.main:app`` in-process through httpx's ASGI
+transport, or to a running server when a base URL is given.
+"""
+
+import asyncio
+import random
+import time
+from typing import Optional
+
+import httpx
+
+from benchmarks.common import Summary, summarize
+
+SEED_USERS = 50
+PASSWORD = "benchpassword"
+
+# Request mix per scenario: operation -> weight
+SCENARIOS: dict[str, dict[str, int]] = {
+    "login": {"login": 1},
+    "list": {"list": 1},
+    "get": {"get": 1},
+    "update": {"update": 1},
+    "mixed": {"login": 5, "list": 25, "get": 60, "update": 10},
+}
+
+
+async def seed(client: httpx.AsyncClient, api: str) -> list[int]:
+    users = [
+        {
+            "email": f"load{i}@example.com",
+            "password": PASSWORD,
+            "full_name": f"Load User {i}",
+        }
+        for i in range(SEED_USERS)
+    ]
+    response = await client.post(f"{api}/users/bulk", json=users)
+    response.raise_for_status()
+
+    # Users may already exist from an earlier run, so collect their ids
+    ids: list[int] = []
+    params: dict[str, object] = {"limit": 500}
+    while True:
+        response = await client.get(f"{api}/users/", params=params)
+        response.raise_for_status()
+        ids.extend(
+            user["id"]
+            for user in response.json()
+            if user["email"].startswith("load")
+        )
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return ids
+        params["cursor"] = cursor
+
+
+async def request(
+    client: httpx.AsyncClient, api: str, operation: str, user_id: int
+) -> None:
+    if operation == "login":
+        response = await client.post(
+            f"{api}/auth/token",
+            data={
+                "username": f"load{random.randrange(SEED_USERS)}@example.com",
+                "password": PASSWORD,
+            },
+        )
+    elif operation == "list":
+        response = await client.get(f"{api}/users/", params={"limit": 100})
+    elif operation == "get":
+        response = await client.get(f"{api}/users/{user_id}")
+    else:
+        response = await client.put(
+            f"{api}/users/{user_id}",
+            json={"full_name": f"Load User {time.monotonic_ns()}"},
+        )
+    response.raise_for_status()
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    api: str,
+    ids: list[int],
+    mix: dict[str, int],
+    duration: float,
+    concurrency: int,
+) -> Summary:
+    operations = list(mix)
+    weights = list(mix.values())
+    samples: list[float] = []
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            operation = random.choices(operations, weights)[0]
+            start = time.perf_counter()
+            await request(client, api, operation, random.choice(ids))
+            samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(samples, time.perf_counter() - start)
+
+
+async def run_load(
+    scenarios: list[str],
+    duration: float,
+    concurrency: int,
+    base_url: Optional[str] = None,
+) -> dict[str, Summary]:
+    from app.core.config import settings
+
+    api = settings.API_V1_STR
+    if base_url:
+        client = httpx.AsyncClient(base_url=base_url, timeout=30)
+    else:
+        from app.core.database import init_db
+        from app.main import app
+
+        await init_db()
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://benchmark",
+            timeout=30,
+        )
+
+    results: dict[str, Summary] = {}
+    async with client:
+        ids = await seed(client, api)
+        for name in scenarios:
+            results[f"load.{name}"] = await run_scenario(
+                client, api, ids, SCENARIOS[name], duration, concurrency
+            )
+    return results
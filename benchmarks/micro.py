@@ -0,0 +1,88 @@
+"""Micro-benchmarks for hashing, tokens and the user service.
+
+The database comes from the usual settings (DATABASE_URL), so the same
+benchmarks run against SQLite or a local Postgres.
+"""
+
+from itertools import count
+
+from app.core.database import AsyncSessionLocal, init_db
+from app.schemas.user import UserCreate, UserUpdate
+from app.services import user_service
+from app.services.auth_service import (
+    create_access_token,
+    get_password_hash,
+    verify_password,
+)
+from benchmarks.common import Summary, measure
+
+SEED_USERS = 50
+
+
+async def run_micro(iterations: int) -> dict[str, Summary]:
+    await init_db()
+    results: dict[str, Summary] = {}
+
+    hashed = get_password_hash("benchpassword")
+
+    async def verify() -> None:
+        verify_password("benchpassword", hashed)
+
+    async def token() -> None:
+        create_access_token({"sub": "bench@example.com", "uid": 1})
+
+    # Hashing is deliberately slow, so it gets a smaller sample
+    results["micro.verify_password"] = await measure(
+        verify, max(iterations // 20, 5)
+    )
+    results["micro.create_access_token"] = await measure(token, iterations)
+
+    async with AsyncSessionLocal() as db:
+        users = [
+            UserCreate(
+                email=f"micro{i}@example.com",
+                password="benchpassword",
+                full_name=f"Micro User {i}",
+            )
+            for i in range(SEED_USERS)
+        ]
+        await user_service.create_users_bulk(db, users)
+        page, _ = await user_service.get_users_page(db, limit=SEED_USERS)
+        ids = [int(user.id) for user in page]
+        emails = [str(user.email) for user in page]
+        next_index = count()
+
+        async def get_user() -> None:
+            user_id = ids[next(next_index) % len(ids)]
+            await user_service.get_user(db, user_id)
+
+        async def get_user_uncached() -> None:
+            await user_service.user_cache.clear()
+            await get_user()
+
+        async def get_user_by_email() -> None:
+            email = emails[next(next_index) % len(emails)]
+            await user_service.get_user_by_email(db, email)
+
+        async def get_users_page() -> None:
+            await user_service.get_users_page(db, limit=100)
+
+        async def update_user() -> None:
+            n = next(next_index)
+            await user_service.update_user(
+                db, ids[n % len(ids)], UserUpdate(full_name=f"Renamed {n}")
+            )
+
+        results["micro.get_user"] = await measure(get_user, iterations)
+        results["micro.get_user_uncached"] = await measure(
+            get_user_uncached, iterations
+        )
+        results["micro.get_user_by_email"] = await measure(
+            get_user_by_email, iterations
+        )
+        results["micro.get_users_page"] = await measure(
+            get_users_page, iterations
+        )
+        results["micro.update_user"] = await measure(update_user, iterations)
+
+    return results
@@ -0,0 +1,158 @@
+"""Connection pool occupancy with and without DB_EAGER_RELEASE.
+
+Each mode runs in a fresh interpreter against the same temporary SQLite
+file, with a deliberately small pool, and drives the "get" and "list"
+load scenarios in-process. Reported per mode:
+
+- hold_ms: mean time a connection is checked out per request
+- mean/peak: connections checked out, sampled every millisecond
+- rps and p95 latency of the scenario
+
+    python -m benchmarks.pool_occupancy --pool-size 2 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any
+
+import httpx
+
+from benchmarks.load import SCENARIOS, run_scenario, seed
+
+MODES = {"held": "false", "eager": "true"}
+
+
+async def _measure(args: argparse.Namespace) -> dict[str, dict[str, float]]:
+    from sqlalchemy import event
+
+    from app.core.config import settings
+    from app.core.database import engine, init_db
+    from app.main import app
+
+    await init_db()
+    api = settings.API_V1_STR
+    pool = engine.sync_engine.pool
+    held = {"seconds": 0.0}
+
+    def checkout(dbapi_connection: Any, record: Any, proxy: Any) -> None:
+        record.info["checked_out_at"] = time.perf_counter()
+
+    def checkin(dbapi_connection: Any, record: Any) -> None:
+        start = record.info.pop("checked_out_at", None)
+        if start is not None:
+            held["seconds"] += time.perf_counter() - start
+
+    event.listen(engine.sync_engine, "checkout", checkout)
+    event.listen(engine.sync_engine, "checkin", checkin)
+
+    results: dict[str, dict[str, float]] = {}
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://benchmark",
+        timeout=60,
+    ) as client:
+        ids = await seed(client, api)
+        for name in args.scenarios:
+            samples: list[int] = []
+            running = True
+
+            async def sample() -> None:
+                while running:
+                    samples.append(pool.checkedout())
+                    await asyncio.sleep(0.001)
+
+            held["seconds"] = 0.0
+            sampler = asyncio.create_task(sample())
+            summary = await run_scenario(
+                client,
+                api,
+                ids,
+                SCENARIOS[name],
+                args.duration,
+                args.concurrency,
+            )
+            running = False
+            await sampler
+
+            results[name] = {
+                "hold_ms": held["seconds"] / summary["count"] * 1000,
+                "mean": sum(samples) / len(samples),
+                "peak": max(samples),
+                "rps": summary["rps"],
+                "p95_ms": summary["p95_ms"],
+            }
+    await engine.dispose()
+    return results
+
+
+def run_mode(env: dict[str, str], args: argparse.Namespace) -> Any:
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.pool_occupancy",
+        "--child",
+        "--duration",
+        str(args.duration),
+        "--concurrency",
+        str(args.concurrency),
+    ]
+    for name in args.scenarios:
+        command += ["--scenario", name]
+    output = subprocess.run(
+        command, check=True, capture_output=True, text=True, env=env
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        dest="scenarios",
+        help="load scenario to run (repeatable, default: get and list)",
+    )
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.scenarios = args.scenarios or ["get", "list"]
+
+    if args.child:
+        print(json.dumps(asyncio.run(_measure(args))))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = {
+            **os.environ,
+            "ENVIRONMENT": "development",
+            "DATABASE_URL": f"sqlite+aiosqlite:///{directory}/pool.db",
+            "DB_POOL_SIZE": str(args.pool_size),
+            "DB_MAX_OVERFLOW": "0",
+            "USER_CACHE_BACKEND": "none",
+            "LOAD_SHEDDING_ENABLED": "false",
+            "SQL_SLOW_QUERY_MS": "1000",
+        }
+        print(
+            f"{'scenario':<8} {'mode':<6} {'hold_ms':>8} {'mean':>6} "
+            f"{'peak':>5} {'rps':>8} {'p95_ms':>8}"
+        )
+        for mode, flag in MODES.items():
+            results = run_mode({**env, "DB_EAGER_RELEASE": flag}, args)
+            for name, row in results.items():
+                print(
+                    f"{name:<8} {mode:<6} {row['hold_ms']:>8.2f} "
+                    f"{row['mean']:>6.2f} {row['peak']:>5.0f} "
+                    f"{row['rps']:>8.1f} {row['p95_ms']:>8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Run the benchmark suite and compare it against a stored baseline.
+
+    python -m benchmarks.run                      # micro + load, in-process
+    python -m benchmarks.run --url http://localhost:8000 --skip-micro
+    python -m benchmarks.run --update-baseline    # record a new baseline
+
+Without DATABASE_URL a throwaway SQLite file is used. Results are
+written as JSON (p50/p95/p99 latency and requests per second); the run
+exits non-zero if any benchmark regressed beyond --tolerance.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import (
+    Summary,
+    compare,
+    load_results,
+    print_results,
+    write_results,
+)
+
+BASELINE = Path(__file__).with_name("baseline.json")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        dest="scenarios",
+        help="load scenario to run (repeatable, default: all)",
+    )
+    parser.add_argument("--url", help="benchmark a running server instead")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--update-baseline", action="store_true")
+    return parser.parse_args()
+
+
+async def run(args: argparse.Namespace) -> dict[str, Summary]:
+    # Imported late so the settings pick up the environment set in main()
+    from benchmarks.load import SCENARIOS, run_load
+    from benchmarks.micro import run_micro
+
+    results: dict[str, Summary] = {}
+    if not args.skip_micro:
+        results.update(await run_micro(args.iterations))
+    if not args.skip_load:
+        results.update(
+            await run_load(
+                args.scenarios or list(SCENARIOS),
+                args.duration,
+                args.concurrency,
+                base_url=args.url,
+            )
+        )
+    return results
+
+
+def main() -> int:
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ.setdefault(
+            "DATABASE_URL", f"sqlite+aiosqlite:///{directory}/bench.db"
+        )
+        os.environ.setdefault("SQL_SLOW_QUERY_MS", "1000")
+        results = asyncio.run(run(args))
+
+    print_results(results)
+    if args.output:
+        write_results(args.output, results)
+    if args.update_baseline:
+        write_results(args.baseline, results)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; skipping comparison")
+        return 0
+
+    regressions = compare(results, load_results(args.baseline), args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Cold start time: importing the app and serving its first requests.
+
+Each run starts a fresh interpreter, imports ``app.main`` and sends the
+first /health and OpenAPI requests in-process. Reports the median over
+``--runs`` and exits non-zero if a median exceeds its budget.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --importtime     # slowest imports too
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+METRICS = ("process_s", "import_s", "first_response_s", "openapi_s")
+
+
+async def _first_requests(start: float) -> dict[str, float]:
+    from app.main import app
+
+    timings = {"import_s": time.perf_counter() - start}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://startup"
+    ) as client:
+        (await client.get("/health")).raise_for_status()
+        timings["first_response_s"] = time.perf_counter() - start
+        openapi_start = time.perf_counter()
+        (
+            await client.get(app.openapi_url or "/openapi.json")
+        ).raise_for_status()
+        timings["openapi_s"] = time.perf_counter() - openapi_start
+    return timings
+
+
+def child() -> None:
+    import asyncio
+
+    start = time.perf_counter()
+    print(json.dumps(asyncio.run(_first_requests(start))))
+
+
+def run_once(env: dict[str, str]) -> dict[str, float]:
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child"],
+        check=True,
+        capture_output=True,
+        text=True,
+        env=env,
+    ).stdout
+    timings: dict[str, float] = json.loads(output.splitlines()[-1])
+    timings["process_s"] = time.perf_counter() - start
+    return timings
+
+
+def slowest_imports(env: dict[str, str], count: int) -> list[str]:
+    """The ``count`` imports with the largest cumulative time"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        check=True,
+        capture_output=True,
+        text=True,
+        env=env,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    rows.sort(reverse=True)
+    return [f"{micros / 1000:9.1f} ms {name}" for micros, name in rows[:count]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=2.0)
+    parser.add_argument("--first-response-budget", type=float, default=2.5)
+    parser.add_argument("--importtime", action="store_true")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+
+    env = dict(os.environ)
+    env.setdefault(
+        "DATABASE_URL",
+        "sqlite+aiosqlite:///"
+        + os.path.join(tempfile.gettempdir(), "startup-bench.db"),
+    )
+    runs = [run_once(env) for _ in range(args.runs)]
+    medians = {
+        metric: statistics.median(run[metric] for run in runs)
+        for metric in METRICS
+    }
+    for metric in METRICS:
+        print(f"{metric:<18} {medians[metric] * 1000:9.1f} ms")
+
+    if args.importtime:
+        print("\nslowest imports (cumulative):")
+        print("\n".join(slowest_imports(env, 15)))
+
+    failures = []
+    if medians["import_s"] > args.import_budget:
+        failures.append(
+            f"import {medians['import_s']:.2f} s > {args.import_budget:.2f} s"
+        )
+    if medians["first_response_s"] > args.first_response_budget:
+        failures.append(
+            f"first response {medians['first_response_s']:.2f} s "
+            f"> {args.first_response_budget:.2f} s"
+        )
+    if failures:
+        print("\nOver budget:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+Write the application's OpenAPI schema to a file.
+Run at image build time and point OPENAPI_SCHEMA_FILE at the output so
+new instances do not build the schema on their first /docs request.
+"""
+
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.openapi import write_openapi_schema  # noqa: E402
+from app.main import app  # noqa: E402
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "openapi.json"
+    write_openapi_schema(app, path)
+    print(f"Wrote OpenAPI schema to {path}")
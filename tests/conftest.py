@@ -1,10 +1,18 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
 
-from app.core.database import Base, get_db
+from app.core.database import (
+    AsyncSessionLocal,
+    Base,
+    get_db,
+    get_read_db,
+    instrument_engine,
+)
 from app.main import app
+from app.services.count_service import user_counter
+from app.services.user_service import user_cache
 
 # Test database URL
 TEST_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
@@ -14,10 +22,11 @@ test_engine = create_async_engine(
     echo=False,
     future=True,
 )
+instrument_engine(test_engine)
 
 TestSessionLocal = sessionmaker(
     test_engine,
-    class_=AsyncSession,
+    class_=AsyncSessionLocal.class_,
     expire_on_commit=False,
 )
 
@@ -27,6 +36,8 @@ async def test_db():
     """Create test database session"""
     async with test_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    await user_cache.clear()
+    user_counter.clear()
 
     async with TestSessionLocal() as session:
         try:
@@ -46,6 +57,7 @@ def client(test_db):
         return test_db
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
 
     # Use FastAPI's TestClient which is compatible with current httpx
     with TestClient(app) as test_client:
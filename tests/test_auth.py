@@ -0,0 +1,182 @@
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import select, update
+
+from app.core.executor import BoundedExecutor, ExecutorSaturatedError
+from app.models.user import User
+from app.services.auth_service import (
+    create_access_token,
+    get_pwd_context,
+    password_hasher,
+    token_claims_cache,
+)
+from app.services.password_rehash import password_rehasher
+from app.services.user_service import invalidate_user
+from tests.conftest import TestSessionLocal
+
+
+def _sample(client, name):
+    for line in client.get("/metrics").text.splitlines():
+        if line.startswith(f"{name} "):
+            return float(line.split()[1])
+    raise AssertionError(f"{name} not exported")
+
+
+def create_user(client, email="login@example.com", password="password"):
+    user_data = {
+        "email": email,
+        "password": password,
+        "full_name": "Login User",
+    }
+    response = client.post("/api/v1/users/", json=user_data)
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.asyncio
+async def test_login(client, test_db):
+    """Test obtaining an access token"""
+    create_user(client)
+
+    response = client.post(
+        "/api/v1/auth/token",
+        data={"username": "login@example.com", "password": "password"},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["token_type"] == "bearer"
+    assert data["access_token"]
+
+
+@pytest.mark.asyncio
+async def test_login_wrong_password(client, test_db):
+    """Test login with an incorrect password"""
+    create_user(client)
+
+    response = client.post(
+        "/api/v1/auth/token",
+        data={"username": "login@example.com", "password": "wrong"},
+    )
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_login_hasher_saturated(client, test_db, monkeypatch):
+    """Test that a saturated hashing pool fails fast with 503"""
+    create_user(client)
+    monkeypatch.setattr(password_hasher, "in_flight", password_hasher.capacity)
+
+    response = client.post(
+        "/api/v1/auth/token",
+        data={"username": "login@example.com", "password": "password"},
+    )
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_current_user_from_cached_claims(client, test_db):
+    """Test resolving the bearer token, decoding it only once"""
+    user = create_user(client)
+    response = client.post(
+        "/api/v1/auth/token",
+        data={"username": "login@example.com", "password": "password"},
+    )
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    hits = token_claims_cache.hits
+    saved = _sample(client, "token_decode_saved_seconds_total")
+
+    for _ in range(2):
+        response = client.get("/api/v1/auth/me", headers=headers)
+        assert response.status_code == 200
+        assert response.json() == {
+            "email": "login@example.com",
+            "user_id": user["id"],
+            "full_name": "Login User",
+        }
+    assert token_claims_cache.hits == hits + 1
+    assert _sample(client, "token_decode_seconds_total") > 0
+    assert _sample(client, "token_decode_saved_seconds_total") > saved
+
+
+@pytest.mark.asyncio
+async def test_current_user_email_only_token(client, test_db):
+    """Test tokens without id claims fall back to a user lookup"""
+    user = create_user(client)
+    token = create_access_token(data={"sub": "login@example.com"})
+
+    response = client.get(
+        "/api/v1/auth/me", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 200
+    assert response.json()["user_id"] == user["id"]
+
+    response = client.get(
+        "/api/v1/auth/me", headers={"Authorization": "Bearer invalid"}
+    )
+    assert response.status_code == 401
+
+
+async def test_bounded_executor_rejects_when_full():
+    """Test admission control and per-call timing of the executor"""
+    executor = BoundedExecutor("test", max_workers=1, max_queue=0)
+    release = threading.Event()
+    try:
+        first = executor.run("wait", release.wait, 5)
+        task = asyncio.ensure_future(first)
+        while executor.in_flight == 0:
+            await asyncio.sleep(0)
+
+        with pytest.raises(ExecutorSaturatedError):
+            await executor.run("wait", release.wait, 5)
+
+        release.set()
+        assert await task is True
+        assert executor.rejected == 1
+        assert executor.stats["wait"].count == 1
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_login_rehashes_outdated_hash(client, test_db, monkeypatch):
+    """Test an outdated hash is upgraded in the background after login"""
+    monkeypatch.setattr(password_rehasher, "session_factory", TestSessionLocal)
+    monkeypatch.setattr(password_rehasher, "flush_seconds", 0.01)
+    user_id = create_user(client, email="legacy@example.com")["id"]
+
+    weak_hash = (
+        get_pwd_context().handler("argon2").using(rounds=1).hash("password")
+    )
+    assert get_pwd_context().needs_update(weak_hash)
+    downgrade = update(User).where(User.id == user_id)
+    await test_db.execute(downgrade.values(hashed_password=weak_hash))
+    await test_db.commit()
+    await invalidate_user(user_id)
+
+    response = client.post(
+        "/api/v1/auth/token",
+        data={"username": "legacy@example.com", "password": "password"},
+    )
+    assert response.status_code == 200
+
+    for _ in range(100):
+        async with TestSessionLocal() as session:
+            stored = await session.scalar(
+                select(User.hashed_password).where(User.id == user_id)
+            )
+        if stored != weak_hash:
+            break
+        await asyncio.sleep(0.05)
+    assert stored != weak_hash
+    assert not get_pwd_context().needs_update(stored)
+    assert password_rehasher.counts["upgraded"] >= 1
+
+    response = client.post(
+        "/api/v1/auth/token",
+        data={"username": "legacy@example.com", "password": "password"},
+    )
+    assert response.status_code == 200
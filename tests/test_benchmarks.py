@@ -0,0 +1,29 @@
+import pytest
+
+from benchmarks.common import compare, summarize
+
+
+def test_summarize():
+    """Test percentile and throughput summaries"""
+    summary = summarize([0.001 * i for i in range(1, 101)], elapsed=2.0)
+    assert summary["count"] == 100
+    assert summary["p50_ms"] == pytest.approx(50)
+    assert summary["p95_ms"] == pytest.approx(95)
+    assert summary["p99_ms"] == pytest.approx(99)
+    assert summary["rps"] == pytest.approx(50)
+
+
+def test_compare_flags_regressions():
+    """Test regressions beyond the tolerance are reported"""
+    baseline = {
+        "fast": {"p95_ms": 10.0, "rps": 100.0},
+        "slow": {"p95_ms": 10.0, "rps": 100.0},
+    }
+    results = {
+        "fast": {"p95_ms": 11.0, "rps": 95.0},
+        "slow": {"p95_ms": 20.0, "rps": 40.0},
+    }
+
+    regressions = compare(results, baseline, tolerance=0.25)
+    assert len(regressions) == 2
+    assert all(regression.startswith("slow") for regression in regressions)
@@ -0,0 +1,101 @@
+import fnmatch
+
+import pytest
+
+from app.core.cache import InMemoryCache, KeyValueCache
+from app.services import user_service
+
+
+class FakeKeyValueClient:
+    """In-memory stand-in for an async Redis client"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def scan_iter(self, match=None):
+        for key in list(self.data):
+            if match is None or fnmatch.fnmatch(key, match):
+                yield key
+
+
+async def test_in_memory_cache_lru_and_ttl():
+    """Test LRU eviction, expiry and counters"""
+    cache = InMemoryCache(max_size=2, ttl=60)
+    await cache.set("a", 1)
+    await cache.set("b", 2)
+    assert await cache.get("a") == 1
+    await cache.set("c", 3)
+
+    assert await cache.get("b") is None
+    assert await cache.get("c") == 3
+    await cache.set("d", 4, ttl=0)
+    assert await cache.get("d") is None
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 2
+    assert cache.stats()["evictions"] == 2
+    assert await cache.get_many(["a", "c", "d"]) == [None, 3, None]
+    assert await cache.get_many([]) == []
+    assert cache.stats()["hits"] == 3
+
+
+async def test_key_value_cache():
+    """Test the external key/value backend against a fake client"""
+    client = FakeKeyValueClient()
+    cache = KeyValueCache(client, prefix="test:")
+    await cache.set("user", {"id": 1})
+    assert client.data == {"test:user": '{"id": 1}'}
+    assert await cache.get("user") == {"id": 1}
+    assert await cache.get_many(["user", "other"]) == [{"id": 1}, None]
+    assert cache.stats() == {"hits": 2, "misses": 1}
+
+    await cache.clear()
+    assert await cache.get("user") is None
+
+
+@pytest.mark.asyncio
+async def test_user_cache_invalidated_on_write(client, test_db, monkeypatch):
+    """Test read-through caching of users and invalidation on update"""
+    monkeypatch.setattr(
+        user_service, "user_cache", KeyValueCache(FakeKeyValueClient())
+    )
+    user_data = {
+        "email": "cached@example.com",
+        "password": "password",
+        "full_name": "Cached User",
+    }
+    user_id = client.post("/api/v1/users/", json=user_data).json()["id"]
+
+    client.get(f"/api/v1/users/{user_id}")
+    response = client.get(f"/api/v1/users/{user_id}")
+    assert response.json()["full_name"] == "Cached User"
+    assert user_service.user_cache.hits == 1
+
+    # Password hashes stay out of the shared store, and login reads them
+    # from the database
+    stored = user_service.user_cache.client.data
+    assert not any("hashed_password" in value for value in stored.values())
+    response = client.post(
+        "/api/v1/auth/token",
+        data={"username": user_data["email"], "password": "password"},
+    )
+    assert response.status_code == 200
+
+    client.put(f"/api/v1/users/{user_id}", json={"full_name": "Renamed"})
+    response = client.get(f"/api/v1/users/{user_id}")
+    assert response.json()["full_name"] == "Renamed"
+
+    client.delete(f"/api/v1/users/{user_id}")
+    assert client.get(f"/api/v1/users/{user_id}").status_code == 404
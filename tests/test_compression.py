@@ -0,0 +1,80 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from app.middleware.compression import CompressionMiddleware, choose_encoding
+
+
+def test_choose_encoding():
+    """Test Accept-Encoding negotiation with q-values"""
+    available = ["zstd", "br", "gzip"]
+    assert choose_encoding("gzip, deflate", available) == "gzip"
+    assert choose_encoding("gzip, br", available) == "br"
+    assert choose_encoding("gzip;q=1.0, br;q=0.5", available) == "gzip"
+    assert choose_encoding("*", available) == "zstd"
+    assert choose_encoding("*;q=0.1, zstd;q=0", available) == "br"
+    assert choose_encoding("identity", available) is None
+    assert choose_encoding("", available) is None
+
+
+@pytest.mark.asyncio
+async def test_compression_threshold_and_streaming():
+    """Test small bodies pass through and streams compress per chunk"""
+    app = FastAPI()
+
+    @app.get("/small")
+    async def small() -> dict[str, str]:
+        return {"status": "ok"}
+
+    @app.get("/stream")
+    async def stream() -> StreamingResponse:
+        async def lines():
+            for i in range(100):
+                yield f'{{"id": {i}, "name": "User {i}"}}\n'.encode()
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+        headers = {"Accept-Encoding": "gzip"}
+        response = await client.get("/small", headers=headers)
+        assert "content-encoding" not in response.headers
+        assert response.headers["vary"] == "Accept-Encoding"
+
+        response = await client.get("/stream", headers=headers)
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        assert response.text.count("\n") == 100
+
+
+def test_compressed_list_and_cached_openapi(client, test_db):
+    """Test list pages and the OpenAPI schema are gzip encoded"""
+    for i in range(10):
+        user_data = {
+            "email": f"gzip{i}@example.com",
+            "password": "password",
+            "full_name": f"Gzip User {i}",
+        }
+        client.post("/api/v1/users/", json=user_data)
+
+    headers = {"Accept-Encoding": "gzip"}
+    response = client.get("/api/v1/users/", headers=headers)
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()) == 10
+
+    first = client.get("/api/v1/openapi.json", headers=headers)
+    second = client.get("/api/v1/openapi.json", headers=headers)
+    assert first.headers["content-encoding"] == "gzip"
+    assert int(first.headers["content-length"]) < len(first.content)
+    assert first.content == second.content
+
+    middleware = client.app.middleware_stack
+    while not isinstance(middleware, CompressionMiddleware):
+        middleware = middleware.app
+    assert [key[:2] for key in middleware.cache] == [
+        ("/api/v1/openapi.json", "gzip")
+    ]
@@ -0,0 +1,122 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.core.limiter import GradientLimiter, LimitExceededError
+from app.middleware.load_shedding import LoadSheddingMiddleware
+
+
+@pytest.mark.asyncio
+async def test_limiter_queue_and_shed():
+    """Test requests over the limit queue, then are shed"""
+    limiter = GradientLimiter(
+        "test", initial_limit=1, max_queue=1, queue_timeout=0.05
+    )
+    await limiter.acquire()
+
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.queue_depth == 1
+    with pytest.raises(LimitExceededError) as exc_info:
+        await limiter.acquire()
+    assert exc_info.value.reason == "queue_full"
+
+    limiter.release()
+    await waiter
+    assert limiter.in_flight == 1
+    assert limiter.queue_depth == 0
+
+    with pytest.raises(LimitExceededError) as exc_info:
+        await limiter.acquire()
+    assert exc_info.value.reason == "timeout"
+    assert limiter.shed == {"queue_full": 1, "timeout": 1}
+
+
+def test_limiter_follows_latency():
+    """Test the limit grows while busy and fast, and shrinks when slow"""
+    limiter = GradientLimiter("test", initial_limit=10, min_limit=2)
+    limiter.in_flight = 10
+    for _ in range(20):
+        limiter.update(0.01)
+    grown = limiter.limit
+    assert grown > 10
+
+    for _ in range(20):
+        limiter.update(0.5)
+    assert limiter.limit < grown / 2
+    assert limiter.limit >= 2
+
+    idle = GradientLimiter("idle", initial_limit=10)
+    for _ in range(20):
+        idle.update(0.01)
+    assert idle.limit == 10
+
+
+@pytest.mark.asyncio
+async def test_middleware_sheds_with_retry_after():
+    """Test excess requests get a fast 503 and exempt paths pass"""
+    app = FastAPI()
+    release = asyncio.Event()
+
+    @app.get("/slow")
+    async def slow() -> dict[str, str]:
+        await release.wait()
+        return {"status": "done"}
+
+    @app.get("/health")
+    async def health() -> dict[str, str]:
+        return {"status": "healthy"}
+
+    app.add_middleware(
+        LoadSheddingMiddleware,
+        exempt_paths=("/health",),
+        limiter_options={"initial_limit": 1, "max_queue": 0},
+    )
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+        first = asyncio.ensure_future(client.get("/slow"))
+        await asyncio.sleep(0.05)
+
+        shed = await client.get("/slow")
+        assert shed.status_code == 503
+        assert shed.headers["Retry-After"] == "1"
+        assert (await client.get("/health")).status_code == 200
+
+        release.set()
+        assert (await first).status_code == 200
+
+
+def test_metrics_expose_limiters(client):
+    """Test limiter state appears on /metrics"""
+    client.get("/api/v1/users/12345")
+    body = client.get("/metrics").text
+    assert 'load_shedding_limit{route_class="read"}' in body
+    assert 'load_shedding_queue_depth{route_class="read"} 0' in body
+
+
+def test_cors_outside_load_shedding(client, monkeypatch):
+    """Test shed responses carry CORS headers and preflights pass"""
+
+    async def reject(self):
+        raise LimitExceededError(self.name, "queue_full")
+
+    monkeypatch.setattr(GradientLimiter, "acquire", reject)
+    origin = {"Origin": "https://app.example.com"}
+
+    response = client.get("/api/v1/users/", headers=origin)
+    assert response.status_code == 503
+    assert response.headers["access-control-allow-origin"] == (
+        "https://app.example.com"
+    )
+
+    response = client.options(
+        "/api/v1/users/",
+        headers={**origin, "Access-Control-Request-Method": "GET"},
+    )
+    assert response.status_code == 200
+    assert "access-control-allow-methods" in response.headers
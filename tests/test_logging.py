@@ -0,0 +1,163 @@
+import io
+import json
+import logging
+import os
+import sys
+
+from app.core.logging import BackgroundHandler, JsonFormatter, RotatingWriter
+from app.core.request_context import RequestContext, request_context
+
+
+def _handler(path, **options) -> BackgroundHandler:
+    writer = RotatingWriter(
+        str(path),
+        max_bytes=options.pop("max_bytes", 0),
+        backup_count=options.pop("backup_count", 0),
+    )
+    handler = BackgroundHandler(writer, **options)
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def _logger(handler: BackgroundHandler) -> logging.Logger:
+    logger = logging.getLogger("tests.logging")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def _read(path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_json_records_with_request_id(tmp_path):
+    """Test records are JSON lines with extras and the request id"""
+    path = tmp_path / "app.log"
+    handler = _handler(path)
+    logger = _logger(handler)
+    handler.start()
+
+    token = request_context.set(RequestContext(request_id="abc123"))
+    try:
+        logger.info("served %s", "/users", extra={"duration_ms": 1.5})
+    finally:
+        request_context.reset(token)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed")
+    handler.stop()
+
+    served, failed = _read(path)
+    assert served["message"] == "served /users"
+    assert served["request_id"] == "abc123"
+    assert served["duration_ms"] == 1.5
+    assert served["level"] == "INFO"
+    assert "request_id" not in failed
+    assert "ValueError: boom" in failed["exc"]
+    assert handler.counts == {"written": 2, "dropped": 0}
+
+
+def test_full_queue_drops_and_reports(tmp_path):
+    """Test the drop policy discards records and logs how many"""
+    path = tmp_path / "app.log"
+    handler = _handler(path, max_queue=2)
+    logger = _logger(handler)
+    for index in range(5):
+        logger.info("record %d", index)
+    assert handler.counts["dropped"] == 3
+
+    handler.start()
+    handler.stop()
+    messages = [record["message"] for record in _read(path)]
+    assert messages == [
+        "record 0",
+        "record 1",
+        "Dropped 3 log records: the log queue was full or a write failed",
+    ]
+
+
+def test_failed_write_keeps_writer_running(tmp_path, monkeypatch):
+    """Test a write error drops the batch but not the writer thread"""
+    path = tmp_path / "app.log"
+    handler = _handler(path, batch_size=1)
+    logger = _logger(handler)
+    write = RotatingWriter.write
+    failures = ["I/O operation on closed file"]
+
+    def flaky_write(self, text):
+        if failures:
+            raise ValueError(failures.pop())
+        write(self, text)
+
+    monkeypatch.setattr(RotatingWriter, "write", flaky_write)
+    handler.start()
+    logger.info("lost")
+    logger.info("kept")
+    handler.stop()
+
+    messages = [record["message"] for record in _read(path)]
+    assert messages == [
+        "kept",
+        "Dropped 1 log records: the log queue was full or a write failed",
+    ]
+
+
+def test_stderr_looked_up_per_write(monkeypatch):
+    """Test writes follow sys.stderr when it is replaced"""
+    writer = RotatingWriter()
+    first, second = io.StringIO(), io.StringIO()
+    monkeypatch.setattr(sys, "stderr", first)
+    writer.write("one\n")
+    monkeypatch.setattr(sys, "stderr", second)
+    writer.write("two\n")
+    writer.close()
+    assert (first.getvalue(), second.getvalue()) == ("one\n", "two\n")
+
+
+def test_rotation(tmp_path):
+    """Test the file rotates by size and keeps backup_count backups"""
+    path = tmp_path / "app.log"
+    handler = _handler(path, max_bytes=300, backup_count=2, batch_size=1)
+    logger = _logger(handler)
+    handler.start()
+    for index in range(20):
+        logger.info("record %d", index)
+    handler.stop()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "app.log",
+        "app.log.1",
+        "app.log.2",
+    ]
+    assert all(
+        (tmp_path / name).stat().st_size <= 300
+        for name in ("app.log", "app.log.1", "app.log.2")
+    )
+    assert _read(path)[-1]["message"] == "record 19"
+
+
+def test_per_process_file(tmp_path):
+    """Test per_process adds the pid to the file name"""
+    writer = RotatingWriter(str(tmp_path / "app.log"), per_process=True)
+    writer.write("line\n")
+    writer.close()
+    assert writer.path == str(tmp_path / f"app.{os.getpid()}.log")
+    assert os.listdir(tmp_path) == [f"app.{os.getpid()}.log"]
+
+
+def test_access_log_and_request_id(client, caplog):
+    """Test each request gets an id and one access record"""
+    with caplog.at_level(logging.INFO, logger="app.access"):
+        response = client.get("/health", headers={"X-Request-ID": "req-1"})
+        generated = client.get("/health", headers={"X-Request-ID": "a b"})
+
+    assert response.headers["X-Request-ID"] == "req-1"
+    assert generated.headers["X-Request-ID"] not in ("a b", "req-1")
+
+    records = [r for r in caplog.records if r.name == "app.access"]
+    assert len(records) == 2
+    assert records[0].route == "/health"
+    assert records[0].status == 200
+    assert records[0].duration_ms >= 0
@@ -1,3 +1,9 @@
+import pytest
+
+from app.core.openapi import load_openapi_schema, write_openapi_schema
+from app.main import app
+
+
 def test_root(client):
     """Test root endpoint"""
     response = client.get("/")
@@ -19,3 +25,17 @@ def test_docs(client):
 
     response = client.get("/redoc")
     assert response.status_code == 200
+
+
+def test_pregenerated_openapi_schema(client, tmp_path, monkeypatch):
+    """Test a schema written at build time is served as-is"""
+    path = tmp_path / "openapi.json"
+    write_openapi_schema(app, path)
+    monkeypatch.setattr(app, "openapi_schema", None)
+
+    assert load_openapi_schema(app, path)
+    monkeypatch.setattr("fastapi.applications.get_openapi", pytest.fail)
+    response = client.get("/api/v1/openapi.json")
+    assert response.status_code == 200
+    assert "/api/v1/users/" in response.json()["paths"]
+    assert not load_openapi_schema(app, tmp_path / "missing.json")
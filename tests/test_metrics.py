@@ -0,0 +1,102 @@
+import json
+import os
+
+import pytest
+
+from app.core.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+    SharedMetrics,
+)
+
+
+def test_registry_render():
+    """Test the Prometheus text exposition output"""
+    registry = Registry()
+    counter = Counter("jobs_total", "Jobs run", ("kind",), registry=registry)
+    Counter("runs_total", "Runs", registry=registry)
+    gauge = Gauge("queue", "Queue depth", registry=registry)
+    histogram = Histogram(
+        "latency_seconds", "Latency", buckets=(0.1, 1.0), registry=registry
+    )
+    counter.inc(labels=("a",))
+    counter.inc(2, labels=("a",))
+    gauge.set(4)
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(3)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE jobs_total counter" in lines
+    assert 'jobs_total{kind="a"} 3' in lines
+    # Unlabelled counters are exported before their first increment
+    assert "runs_total 0" in lines
+    assert "queue 4" in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1"} 2' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert "latency_seconds_sum 3.55" in lines
+    assert "latency_seconds_count 3" in lines
+
+
+def test_counter_callback():
+    """Test totals kept elsewhere are exported as counters"""
+    registry = Registry()
+    totals = {"hit": 5, "miss": 2}
+    Counter(
+        "cache_requests_total",
+        "Cache lookups",
+        ("result",),
+        registry=registry,
+        callback=lambda: {(k,): v for k, v in totals.items()},
+    )
+    totals["hit"] += 1
+
+    lines = registry.render().splitlines()
+    assert "# TYPE cache_requests_total counter" in lines
+    assert 'cache_requests_total{result="hit"} 6' in lines
+    assert 'cache_requests_total{result="miss"} 2' in lines
+
+
+@pytest.mark.asyncio
+async def test_shared_metrics(tmp_path):
+    """Test a scrape returns every worker's samples, labelled by pid"""
+    ours, theirs = Registry(), Registry()
+    for registry, count in ((ours, 3), (theirs, 5)):
+        counter = Counter(
+            "jobs_total", "Jobs run", ("kind",), registry=registry
+        )
+        counter.inc(count, labels=("a",))
+    (tmp_path / "999.json").write_text(json.dumps(theirs.collect()))
+    (tmp_path / "998.json").write_text(json.dumps(theirs.collect()))
+    os.utime(tmp_path / "998.json", (0, 0))
+
+    shared = SharedMetrics(str(tmp_path), interval=5, registry=ours)
+    lines = (await shared.render()).splitlines()
+    assert lines.count("# TYPE jobs_total counter") == 1
+    assert f'jobs_total{{kind="a",pid="{os.getpid()}"}} 3' in lines
+    assert 'jobs_total{kind="a",pid="999"} 5' in lines
+    # Files of exited workers are dropped
+    assert not any('pid="998"' in line for line in lines)
+    assert not (tmp_path / "998.json").exists()
+
+    await shared.stop()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["999.json"]
+
+
+def test_metrics_endpoint(client):
+    """Test request metrics are keyed by route template"""
+    client.get("/api/v1/users/12345")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert (
+        'http_request_duration_seconds_count{method="GET",'
+        'route="/api/v1/users/{user_id}",status="404"}'
+    ) in body
+    assert "/api/v1/users/12345" not in body
+    assert "db_pool_connections" in body
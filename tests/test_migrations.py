@@ -0,0 +1,137 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import OperationalError
+
+from app.core.migrations import (
+    PROGRESS_TABLE,
+    backfill,
+    create_index_concurrently,
+    drop_index_concurrently,
+    retry_on_lock_timeout,
+)
+
+
+@pytest.fixture
+def connection(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/migrations.db")
+    with engine.connect() as connection:
+        connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+        connection.exec_driver_sql(
+            "CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, "
+            "name_lower TEXT)"
+        )
+        connection.execute(
+            text("INSERT INTO items (id, name) VALUES (:id, :name)"),
+            [{"id": i, "name": f"Item {i}"} for i in range(1, 101)],
+        )
+        yield connection
+    engine.dispose()
+
+
+def _pending(connection) -> int:
+    return connection.scalar(
+        text("SELECT count(*) FROM items WHERE name_lower IS NULL")
+    )
+
+
+def test_backfill_in_batches(connection):
+    """Test a backfill updates every row, one key range at a time"""
+    progress = []
+
+    rows = backfill(
+        connection,
+        "items_name_lower",
+        "items",
+        "name_lower = lower(name)",
+        where="name_lower IS NULL",
+        batch_size=30,
+        pause=0,
+        report=lambda *args: progress.append(args),
+    )
+
+    assert rows == 100
+    assert _pending(connection) == 0
+    assert [last_key for _, _, last_key, _ in progress] == [30, 60, 90, 100]
+    assert (
+        connection.scalar(text(f"SELECT count(*) FROM {PROGRESS_TABLE}")) == 0
+    )
+
+
+def test_backfill_resumes_after_failure(connection):
+    """Test an interrupted backfill continues after the last batch done"""
+
+    def fail_after_two(name, rows, last_key, max_key):
+        if last_key >= 40:
+            raise KeyboardInterrupt
+
+    options = {"where": "name_lower IS NULL", "batch_size": 20, "pause": 0}
+    with pytest.raises(KeyboardInterrupt):
+        backfill(
+            connection,
+            "items_name_lower",
+            "items",
+            "name_lower = lower(name)",
+            report=fail_after_two,
+            **options,
+        )
+    assert _pending(connection) == 60
+
+    progress = []
+    rows = backfill(
+        connection,
+        "items_name_lower",
+        "items",
+        "name_lower = lower(name)",
+        report=lambda *args: progress.append(args),
+        **options,
+    )
+    assert rows == 100
+    assert _pending(connection) == 0
+    assert [last_key for _, _, last_key, _ in progress] == [60, 80, 100]
+
+
+def test_index_helpers_are_idempotent(connection):
+    """Test indexes can be created and dropped again without errors"""
+    for _ in range(2):
+        create_index_concurrently(
+            connection, "ix_items_name", "items", ["name"]
+        )
+    indexes = inspect(connection).get_indexes("items")
+    assert [index["name"] for index in indexes] == ["ix_items_name"]
+
+    for _ in range(2):
+        drop_index_concurrently(connection, "ix_items_name")
+    assert inspect(connection).get_indexes("items") == []
+
+    # Expression indexes, which reflection does not report
+    for _ in range(2):
+        create_index_concurrently(
+            connection, "ix_items_name_lower", "items", ["lower(name)"]
+        )
+    drop_index_concurrently(connection, "ix_items_name_lower")
+
+
+def test_retry_on_lock_timeout():
+    """Test lock timeouts are retried and other errors are not"""
+    calls = []
+
+    def locked_twice():
+        calls.append(1)
+        if len(calls) < 3:
+            raise OperationalError(
+                "UPDATE", {}, Exception("database is locked")
+            )
+        return "done"
+
+    assert retry_on_lock_timeout(locked_twice, retries=3, delay=0) == "done"
+    assert len(calls) == 3
+
+    calls.clear()
+    with pytest.raises(OperationalError):
+        retry_on_lock_timeout(locked_twice, retries=1, delay=0)
+
+    def broken():
+        raise OperationalError("UPDATE", {}, Exception("no such table"))
+
+    with pytest.raises(OperationalError):
+        retry_on_lock_timeout(broken, retries=3, delay=0)
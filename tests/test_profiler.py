@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.core.config import settings
+from app.core.profiler import WAITING, SamplingProfiler
+from app.middleware.profiling import ProfilingMiddleware
+
+
+def _busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _profiled_app(profiler: SamplingProfiler, **options) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/work/{item}")
+    async def work(item: int) -> dict[str, int]:
+        _busy(0.03)
+        await asyncio.sleep(0.03)
+        return {"item": item}
+
+    app.add_middleware(ProfilingMiddleware, profiler=profiler, **options)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_profiles_sampled_and_token_requests():
+    """Test 1-in-N sampling, token requests and the exported stacks"""
+    profiler = SamplingProfiler(interval=0.002)
+    app = _profiled_app(profiler, sample_every=3, token="secret")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+        for item in range(3):
+            await client.get(f"/work/{item}")
+        assert profiler.profile.requests == 1
+
+        await client.get("/work/1", headers={"X-Profile-Token": "wrong"})
+        assert profiler.profile.requests == 1
+        await client.get("/work/1", headers={"X-Profile-Token": "secret"})
+        assert profiler.profile.requests == 2
+
+    stacks = profiler.profile.stacks
+    assert all(stack[0] == "GET /work/{item}" for stack in stacks)
+    running = sum(n for stack, n in stacks.items() if "_busy" in stack[-1])
+    waiting = sum(n for stack, n in stacks.items() if stack[-1] == WAITING)
+    assert running and waiting
+
+    line = profiler.profile.collapsed().splitlines()[0]
+    assert line.startswith("GET /work/{item};")
+    assert int(line.rsplit(" ", 1)[1]) > 0
+
+    speedscope = profiler.profile.speedscope(profiler.interval)
+    frames = speedscope["shared"]["frames"]
+    sample = speedscope["profiles"][0]["samples"][0]
+    assert frames[sample[0]]["name"] == "GET /work/{item}"
+    named = [frame for frame in frames if ":" in frame["name"]]
+    assert named and all("file" in frame for frame in named)
+
+
+def test_profile_export_requires_token(client, monkeypatch):
+    """Test the admin export is hidden without the profiler token"""
+    assert client.get("/admin/profile").status_code == 404
+
+    monkeypatch.setattr(settings, "PROFILER_TOKEN", "secret")
+    headers = {"X-Profile-Token": "secret"}
+    assert client.get("/admin/profile").status_code == 404
+    response = client.get("/admin/profile", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+
+    response = client.get(
+        "/admin/profile",
+        params={"format": "speedscope", "reset": "true"},
+        headers=headers,
+    )
+    assert response.json()["profiles"][0]["type"] == "sampled"
@@ -0,0 +1,80 @@
+import os
+
+from app.core.config import settings
+from app.server import (
+    _log_per_process,
+    _share_metrics,
+    available_cpus,
+    cgroup_cpu_limit,
+    uvicorn_options,
+    worker_count,
+)
+
+
+def test_cgroup_cpu_limit(tmp_path):
+    """Test CFS quotas are read from cgroup v2 and v1 files"""
+    assert cgroup_cpu_limit(tmp_path) is None
+
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert cgroup_cpu_limit(tmp_path) is None
+    (tmp_path / "cpu.max").write_text("250000 100000\n")
+    assert cgroup_cpu_limit(tmp_path) == 2.5
+    assert available_cpus(tmp_path) <= 3
+
+    v1 = tmp_path / "v1"
+    (v1 / "cpu").mkdir(parents=True)
+    (v1 / "cpu" / "cpu.cfs_quota_us").write_text("-1\n")
+    (v1 / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+    assert cgroup_cpu_limit(v1) is None
+    (v1 / "cpu" / "cpu.cfs_quota_us").write_text("50000\n")
+    assert cgroup_cpu_limit(v1) == 0.5
+    assert available_cpus(v1) == 1
+
+
+def test_worker_count_and_options(monkeypatch):
+    """Test worker sizing and recycling only under the supervisor"""
+    assert worker_count(3, cpus=16) == 3
+    assert worker_count(0, cpus=16, maximum=8) == 8
+    assert worker_count(0, cpus=2) == 2
+
+    monkeypatch.setattr(settings, "SERVER_WORKERS", 1)
+    assert uvicorn_options()["limit_max_requests"] is None
+
+    monkeypatch.setattr(settings, "SERVER_WORKERS", 4)
+    monkeypatch.setattr(settings, "SERVER_MAX_REQUESTS", 100)
+    monkeypatch.setattr(settings, "SERVER_MAX_REQUESTS_JITTER", 10)
+    options = uvicorn_options()
+    assert options["workers"] == 4
+    assert 100 <= options["limit_max_requests"] <= 110
+
+
+def test_log_per_process(monkeypatch):
+    """Test several workers sharing a LOG_FILE each get their own"""
+    monkeypatch.setattr(settings, "LOG_FILE", "/tmp/app.log")
+    monkeypatch.setattr(settings, "LOG_FILE_PER_PROCESS", False)
+    monkeypatch.setenv("LOG_FILE_PER_PROCESS", "false")
+    _log_per_process(1)
+    assert not settings.LOG_FILE_PER_PROCESS
+
+    _log_per_process(4)
+    assert settings.LOG_FILE_PER_PROCESS
+    assert os.environ["LOG_FILE_PER_PROCESS"] == "true"
+
+
+def test_share_metrics(monkeypatch, tmp_path):
+    """Test several workers get a shared metrics directory"""
+    monkeypatch.setattr(settings, "METRICS_MULTIPROC_DIR", None)
+    monkeypatch.setenv("METRICS_MULTIPROC_DIR", "")
+    _share_metrics(1)
+    assert settings.METRICS_MULTIPROC_DIR is None
+
+    _share_metrics(4)
+    directory = settings.METRICS_MULTIPROC_DIR
+    assert directory and os.path.isdir(directory)
+    assert os.environ["METRICS_MULTIPROC_DIR"] == directory
+    os.rmdir(directory)
+
+    # A configured directory is kept
+    monkeypatch.setattr(settings, "METRICS_MULTIPROC_DIR", str(tmp_path))
+    _share_metrics(4)
+    assert settings.METRICS_MULTIPROC_DIR == str(tmp_path)
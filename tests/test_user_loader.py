@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+from sqlalchemy import insert
+
+from app.core.request_context import RequestContext, request_context
+from app.models.user import User
+from app.services.user_loader import UserLoader
+from tests.conftest import TestSessionLocal
+
+
+async def _add_users(db, count):
+    await db.execute(
+        insert(User),
+        [
+            {
+                "email": f"loader{i}@example.com",
+                "hashed_password": "x",
+                "full_name": f"Loader {i}",
+            }
+            for i in range(count)
+        ],
+    )
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_loader_batches_one_tick(test_db):
+    """Test lookups made together become one query per chunk"""
+    await _add_users(test_db, 5)
+    loader = UserLoader(session_factory=TestSessionLocal, max_batch=3)
+
+    users = await asyncio.gather(
+        *(loader.load(test_db, user_id) for user_id in (1, 2, 3, 4, 99)),
+        loader.load_by_email(test_db, "loader2@example.com"),
+    )
+    assert [user.id if user else None for user in users] == [
+        1,
+        2,
+        3,
+        4,
+        None,
+        3,
+    ]
+    # Ids in chunks of three, emails in one more
+    assert loader.counts["queries"] == 3
+    assert loader.counts["loaded"] == 6
+
+    # The next tick starts a new batch
+    assert (await loader.load(test_db, 5)).email == "loader4@example.com"
+    assert loader.counts["queries"] == 4
+
+
+@pytest.mark.asyncio
+async def test_loader_single_flight(test_db):
+    """Test identical in-flight lookups share a query and survive cancel"""
+    await _add_users(test_db, 2)
+    loader = UserLoader(session_factory=TestSessionLocal)
+
+    first = asyncio.create_task(loader.load(test_db, 1))
+    second = asyncio.create_task(loader.load(test_db, 1))
+    third = asyncio.create_task(loader.load(test_db, 1))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert (await second).id == 1
+    assert (await third).id == 1
+    assert first.cancelled()
+    assert loader.counts == {"loaded": 1, "coalesced": 2, "queries": 1}
+
+
+@pytest.mark.asyncio
+async def test_loader_reuses_open_transaction(test_db):
+    """Test a session in a transaction is queried directly, not twice"""
+    await _add_users(test_db, 3)
+
+    def no_session(**kwargs):
+        raise AssertionError("the loader opened a second session")
+
+    loader = UserLoader(session_factory=no_session, max_batch=2)
+    test_db.add(
+        User(email="pending@example.com", hashed_password="x", full_name="P")
+    )
+    await test_db.flush()
+
+    # Sees the caller's uncommitted row, on the caller's connection
+    pending = await loader.load_by_email(test_db, "pending@example.com")
+    assert pending is not None
+    users = await loader.load_many(test_db, [3, 99, 1])
+    assert [user.id if user else None for user in users] == [3, None, 1]
+    assert loader.counts["queries"] == 3
+    await test_db.rollback()
+
+
+@pytest.mark.asyncio
+async def test_loader_batch_session_and_context(test_db):
+    """Test who runs a batch and which request it is charged to"""
+    await _add_users(test_db, 3)
+    opened = []
+
+    def session_factory(**kwargs):
+        opened.append(kwargs)
+        return TestSessionLocal(**kwargs)
+
+    loader = UserLoader(session_factory=session_factory)
+
+    async def lookup(db, user_id):
+        context = RequestContext()
+        request_context.set(context)
+        user = await loader.load(db, user_id)
+        return user.id, context.query_count
+
+    # Asked for by one session: runs on it, as part of its request
+    assert await lookup(test_db, 1) == (1, 1)
+    assert opened == []
+
+    # Shared by two: runs on the loader's session, charged to neither
+    async with TestSessionLocal() as other:
+        results = await asyncio.gather(lookup(test_db, 2), lookup(other, 3))
+    assert results == [(2, 0), (3, 0)]
+    assert len(opened) == 1
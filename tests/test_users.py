@@ -1,5 +1,11 @@
+import json
+
 import pytest
 
+from app.core.config import settings
+from app.services import user_service
+from app.services.count_service import user_counter
+
 
 @pytest.mark.asyncio
 async def test_create_user(client, test_db):
@@ -61,3 +67,474 @@ async def test_get_users(client, test_db):
     assert response.status_code == 200
     data = response.json()
     assert len(data) == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("order_by", ["id", "created_at"])
+async def test_get_users_cursor_pagination(client, test_db, order_by):
+    """Test walking the user list with keyset cursors"""
+    for i in range(5):
+        user_data = {
+            "email": f"page{i}@example.com",
+            "password": "password",
+            "full_name": f"Page User {i}",
+        }
+        client.post("/api/v1/users/", json=user_data)
+
+    seen = []
+    params = {"limit": 2, "order_by": order_by}
+    while True:
+        response = client.get("/api/v1/users/", params=params)
+        assert response.status_code == 200
+        seen.extend(user["email"] for user in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            break
+        assert 'rel="next"' in response.headers["Link"]
+        params = {**params, "cursor": next_cursor}
+
+    assert seen == [f"page{i}@example.com" for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_get_users_skip_and_invalid_cursor(client, test_db):
+    """Test offset paging compatibility and cursor validation"""
+    for i in range(3):
+        user_data = {
+            "email": f"skip{i}@example.com",
+            "password": "password",
+            "full_name": f"Skip User {i}",
+        }
+        client.post("/api/v1/users/", json=user_data)
+
+    response = client.get("/api/v1/users/", params={"skip": 1, "limit": 1})
+    assert [user["email"] for user in response.json()] == ["skip1@example.com"]
+
+    response = client.get("/api/v1/users/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_create_users_bulk(client, test_db, monkeypatch):
+    """Test bulk creation with duplicates and invalid rows"""
+    client.post(
+        "/api/v1/users/",
+        json={
+            "email": "taken@example.com",
+            "password": "password",
+            "full_name": "Taken",
+        },
+    )
+    users = [
+        {"email": "bulk1@example.com", "password": "pw", "full_name": "B1"},
+        {"email": "taken@example.com", "password": "pw", "full_name": "Dup"},
+        {"email": "not-an-email", "password": "pw", "full_name": "Bad"},
+        {"email": "bulk1@example.com", "password": "pw", "full_name": "Dup"},
+        {"email": "bulk2@example.com", "password": "pw", "full_name": "B2"},
+    ]
+
+    hashed = []
+    hash_passwords = user_service.get_password_hashes_async
+
+    async def counting_hashes(passwords):
+        hashed.extend(passwords)
+        return await hash_passwords(passwords)
+
+    monkeypatch.setattr(
+        user_service, "get_password_hashes_async", counting_hashes
+    )
+    response = client.post("/api/v1/users/bulk", json=users)
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["created"], data["conflicts"], data["invalid"]) == (2, 2, 1)
+    # Duplicate and registered emails are not hashed
+    assert len(hashed) == 2
+    statuses = [result["status"] for result in data["results"]]
+    assert statuses == [
+        "created",
+        "conflict",
+        "invalid",
+        "conflict",
+        "created",
+    ]
+    assert data["results"][4]["user"]["email"] == "bulk2@example.com"
+
+    response = client.get("/api/v1/users/")
+    assert len(response.json()) == 3
+
+
+@pytest.mark.asyncio
+async def test_create_users_bulk_ndjson(client, test_db, monkeypatch):
+    """Test bulk creation from an NDJSON body"""
+    rows = [
+        {"email": "nd1@example.com", "password": "pw", "full_name": "N1"},
+        {"email": "nd2@example.com", "password": "pw", "full_name": "N2"},
+    ]
+    body = "\n".join([json.dumps(rows[0]), "{broken", json.dumps(rows[1])])
+
+    response = client.post(
+        "/api/v1/users/bulk",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["created"], data["conflicts"], data["invalid"]) == (2, 0, 1)
+
+    monkeypatch.setattr(settings, "USER_BULK_MAX_BYTES", len(body) - 1)
+    response = client.post(
+        "/api/v1/users/bulk",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_write_paths_single_statement(client, test_db):
+    """Test create, update and delete each run a single statement"""
+    user_data = {
+        "email": "single@example.com",
+        "password": "password",
+        "full_name": "Single",
+    }
+    response = client.post("/api/v1/users/", json=user_data)
+    assert 'desc="1 queries"' in response.headers["Server-Timing"]
+    user_id = response.json()["id"]
+
+    response = client.put(
+        f"/api/v1/users/{user_id}", json={"full_name": "Renamed"}
+    )
+    assert response.status_code == 200
+    assert response.json()["full_name"] == "Renamed"
+    assert response.json()["updated_at"] is not None
+    assert 'desc="1 queries"' in response.headers["Server-Timing"]
+
+    response = client.delete(f"/api/v1/users/{user_id}")
+    assert response.status_code == 200
+    assert 'desc="1 queries"' in response.headers["Server-Timing"]
+
+    assert client.delete(f"/api/v1/users/{user_id}").status_code == 404
+    response = client.put(f"/api/v1/users/{user_id}", json={"full_name": "X"})
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_duplicate_email_conflict(client, test_db):
+    """Test duplicate emails are rejected with 409"""
+    for email in ("first@example.com", "second@example.com"):
+        user_data = {"email": email, "password": "pw", "full_name": "Dup"}
+        client.post("/api/v1/users/", json=user_data)
+
+    user_data = {
+        "email": "first@example.com",
+        "password": "pw",
+        "full_name": "X",
+    }
+    response = client.post("/api/v1/users/", json=user_data)
+    assert response.status_code == 409
+
+    response = client.get("/api/v1/users/", params={"limit": 2})
+    second_id = response.json()[1]["id"]
+    response = client.put(
+        f"/api/v1/users/{second_id}", json={"email": "first@example.com"}
+    )
+    assert response.status_code == 409
+
+    response = client.put(
+        f"/api/v1/users/{second_id}", json={"full_name": None}
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_fast_json_matches_default(client, test_db, monkeypatch):
+    """Test the pydantic-core encoded list matches the default encoding"""
+    for i in range(3):
+        user_data = {
+            "email": f"json{i}@example.com",
+            "password": "password",
+            "full_name": f"Jsön User {i}",
+        }
+        client.post("/api/v1/users/", json=user_data)
+
+    default = client.get("/api/v1/users/", params={"limit": 2})
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", True)
+    fast = client.get("/api/v1/users/", params={"limit": 2})
+
+    assert fast.status_code == 200
+    assert fast.content == default.content
+    assert fast.headers["content-type"] == default.headers["content-type"]
+    assert fast.headers["X-Next-Cursor"] == default.headers["X-Next-Cursor"]
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_user(client, test_db):
+    """Test ETag and Last-Modified validators on a single user"""
+    user_data = {
+        "email": "etag@example.com",
+        "password": "password",
+        "full_name": "ETag User",
+    }
+    user_id = client.post("/api/v1/users/", json=user_data).json()["id"]
+
+    response = client.get(f"/api/v1/users/{user_id}")
+    etag = response.headers["ETag"]
+    last_modified = response.headers["Last-Modified"]
+    assert etag.startswith('W/"')
+    # Unconditional reads are served from the user cache
+    response = client.get(f"/api/v1/users/{user_id}")
+    assert response.headers["ETag"] == etag
+    assert 'desc="0 queries"' in response.headers["Server-Timing"]
+
+    response = client.get(
+        f"/api/v1/users/{user_id}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    assert 'desc="1 queries"' in response.headers["Server-Timing"]
+
+    response = client.get(
+        f"/api/v1/users/{user_id}",
+        headers={"If-Modified-Since": last_modified},
+    )
+    assert response.status_code == 304
+
+    response = client.get(
+        f"/api/v1/users/{user_id}", headers={"If-None-Match": 'W/"other"'}
+    )
+    assert response.status_code == 200
+    assert response.json()["email"] == "etag@example.com"
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_users_page(client, test_db):
+    """Test list pages revalidate with If-None-Match"""
+    for i in range(2):
+        user_data = {
+            "email": f"page{i}@example.com",
+            "password": "password",
+            "full_name": f"Page {i}",
+        }
+        client.post("/api/v1/users/", json=user_data)
+
+    response = client.get("/api/v1/users/")
+    etag = response.headers["ETag"]
+    response = client.get("/api/v1/users/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    user_id = client.get("/api/v1/users/").json()[0]["id"]
+    client.delete(f"/api/v1/users/{user_id}")
+    response = client.get("/api/v1/users/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+
+
+@pytest.mark.asyncio
+async def test_if_match_on_writes(client, test_db):
+    """Test writes with a stale If-Match are rejected with 412"""
+    user_data = {
+        "email": "ifmatch@example.com",
+        "password": "password",
+        "full_name": "If Match",
+    }
+    user_id = client.post("/api/v1/users/", json=user_data).json()["id"]
+    etag = client.get(f"/api/v1/users/{user_id}").headers["ETag"]
+
+    response = client.put(
+        f"/api/v1/users/{user_id}",
+        json={"full_name": "Stale"},
+        headers={"If-Match": 'W/"stale"'},
+    )
+    assert response.status_code == 412
+
+    response = client.put(
+        f"/api/v1/users/{user_id}",
+        json={"full_name": "Fresh"},
+        headers={"If-Match": etag},
+    )
+    assert response.status_code == 200
+    new_etag = response.headers["ETag"]
+    assert new_etag != etag
+    assert client.get(f"/api/v1/users/{user_id}").json()["full_name"] == (
+        "Fresh"
+    )
+
+    # Two writes within the same second still change the ETag
+    response = client.put(
+        f"/api/v1/users/{user_id}", json={"full_name": "Fresher"}
+    )
+    latest_etag = response.headers["ETag"]
+    assert latest_etag != new_etag
+    response = client.put(
+        f"/api/v1/users/{user_id}",
+        json={"full_name": "Lost"},
+        headers={"If-Match": new_etag},
+    )
+    assert response.status_code == 412
+    response = client.get(
+        f"/api/v1/users/{user_id}", headers={"If-None-Match": new_etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["full_name"] == "Fresher"
+
+    response = client.delete(
+        f"/api/v1/users/{user_id}", headers={"If-Match": etag}
+    )
+    assert response.status_code == 412
+    response = client.delete(
+        f"/api/v1/users/{user_id}", headers={"If-Match": latest_etag}
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_search_users(client, test_db):
+    """Test search by email prefix and name words, ranked and paginated"""
+    users = [
+        ("ann@example.com", "Ann Smith"),
+        ("annabel@example.com", "Annabel Jones"),
+        ("bob@example.com", "Bob Annison"),
+        ("carol@example.com", "Carol Smith"),
+        ("dave@example.com", "Dave Brown"),
+        ("John.Doe@example.com", "John Doe"),
+        ("johnny@example.com", "Johnny Cash"),
+    ]
+    response = client.post(
+        "/api/v1/users/bulk",
+        json=[
+            {"email": email, "password": "password", "full_name": name}
+            for email, name in users
+        ],
+    )
+    assert response.json()["created"] == len(users)
+
+    def search(**params):
+        response = client.get("/api/v1/users/search", params=params)
+        assert response.status_code == 200
+        return response
+
+    # Email prefix matches first, then name matches
+    emails = [user["email"] for user in search(q="ann").json()]
+    assert emails == [
+        "ann@example.com",
+        "annabel@example.com",
+        "bob@example.com",
+    ]
+    assert [user["email"] for user in search(q="smith").json()] == [
+        "ann@example.com",
+        "carol@example.com",
+    ]
+    assert search(q="carol smith").json()[0]["email"] == "carol@example.com"
+    assert search(q="dave@").json()[0]["full_name"] == "Dave Brown"
+    assert [user["email"] for user in search(q=" ANN ").json()] == emails
+
+    # Emails keep their case but match ignoring it, in case-blind order
+    johns = ["John.Doe@example.com", "johnny@example.com"]
+    for q in ("john", "JOHN", "John"):
+        assert [user["email"] for user in search(q=q).json()] == johns
+    exact = search(q="John.Doe@example.com").json()
+    assert [user["email"] for user in exact] == johns[:1]
+    response = search(q="john", limit=1)
+    cursor = response.headers["X-Next-Cursor"]
+    assert search(q="john", limit=1, cursor=cursor).json()[0]["email"] == (
+        johns[1]
+    )
+    assert search(q="nobody").json() == []
+
+    # Pages continue across the email and name phases
+    seen = []
+    params = {"q": "ann", "limit": 1}
+    while True:
+        response = search(**params)
+        seen.extend(user["email"] for user in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params["cursor"] = cursor
+    assert seen == emails
+
+    # Renames are picked up by the index
+    bob_id = search(q="bob@").json()[0]["id"]
+    client.put(f"/api/v1/users/{bob_id}", json={"full_name": "Bob Stone"})
+    assert [user["id"] for user in search(q="stone").json()] == [bob_id]
+    assert len(search(q="ann").json()) == 2
+
+    response = client.get(
+        "/api/v1/users/search", params={"q": "ann", "cursor": "bad"}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_total_count_header(client, test_db):
+    """Test X-Total-Count is cached and adjusted by creates and deletes"""
+
+    def total(mode):
+        response = client.get("/api/v1/users/", params={"count": mode})
+        return int(response.headers["X-Total-Count"])
+
+    assert "X-Total-Count" not in client.get("/api/v1/users/").headers
+    client.post(
+        "/api/v1/users/bulk",
+        json=[
+            {
+                "email": f"count{i}@example.com",
+                "password": "password",
+                "full_name": "Count",
+            }
+            for i in range(3)
+        ],
+    )
+    assert total("exact") == 3
+    # SQLite keeps no planner estimate, so this is the exact count
+    assert total("estimated") == 3
+
+    user = {"email": "x@example.com", "password": "password", "full_name": "X"}
+    user_id = client.post("/api/v1/users/", json=user).json()["id"]
+    misses = user_counter.counts["miss"]
+    assert total("exact") == 4
+    client.delete(f"/api/v1/users/{user_id}")
+    assert total("exact") == 3
+    assert user_counter.counts["miss"] == misses
+
+    response = client.get("/api/v1/users/", params={"count": "all"})
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_read_users_by_ids(client, test_db):
+    """Test batch fetch keeps the requested order and skips missing ids"""
+    response = client.post(
+        "/api/v1/users/bulk",
+        json=[
+            {
+                "email": f"batch{i}@example.com",
+                "password": "password",
+                "full_name": f"Batch {i}",
+            }
+            for i in range(3)
+        ],
+    )
+    ids = [result["user"]["id"] for result in response.json()["results"]]
+
+    response = client.get(
+        "/api/v1/users/", params={"ids": f"{ids[2]},999,{ids[0]},{ids[2]}"}
+    )
+    assert response.status_code == 200
+    assert [user["id"] for user in response.json()] == [ids[2], ids[0]]
+
+    etag = response.headers["ETag"]
+    response = client.get(
+        "/api/v1/users/",
+        params={"ids": f"{ids[2]},{ids[0]}"},
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 304
+
+    bad = client.get("/api/v1/users/", params={"ids": "1,x"})
+    assert bad.status_code == 400
+    many = ",".join(str(i) for i in range(settings.USER_BATCH_MAX_IDS + 1))
+    response = client.get("/api/v1/users/", params={"ids": many})
+    assert response.status_code == 400